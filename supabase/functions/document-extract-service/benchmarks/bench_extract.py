@@ -0,0 +1,259 @@
+"""
+Benchmark suite: every extractor, and the full /extract path, on a synthetic corpus.
+
+    python -m benchmarks.bench_extract --sizes 1 10 50 --repeat 10 --json bench.json
+    python -m benchmarks.bench_extract --formats pdf docx --compare bench.json
+
+For each format and size a document is generated (benchmarks.corpus) and
+run through the extractor in this process ("extractor") and through POST
+/extract with the FastAPI test client ("endpoint": worker pools, markdown,
+similarity). Reported per scenario: throughput, p50/p95/p99 latency and the
+peak RSS of this process and its worker processes. The result cache is off
+unless CACHE_MEMORY_BYTES / CACHE_DISK_PATH are set, so every run does the
+work. --compare prints the p50 change against an earlier --json file.
+"""
+import os
+
+# Repeated uploads must not be answered from the result cache
+os.environ.setdefault("CACHE_MEMORY_BYTES", "0")
+
+import argparse
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks import corpus
+from core.registry import ExtractorRegistry
+
+MODES = ("extractor", "endpoint")
+
+
+def _statm_rss(pid: str) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _children(pid: str) -> List[str]:
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def process_tree_rss() -> Optional[int]:
+    """RSS of this process and all its descendants (worker pools), or None without /proc."""
+    if not os.path.exists("/proc/self/statm"):
+        return None
+    total = 0
+    pending = [str(os.getpid())]
+    while pending:
+        pid = pending.pop()
+        total += _statm_rss(pid)
+        pending.extend(_children(pid))
+    return total
+
+
+class PeakRSS:
+    """Samples process_tree_rss() in the background and keeps the maximum."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self) -> "PeakRSS":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        while True:
+            rss = process_tree_rss()
+            if rss is None:
+                # ru_maxrss is the peak of the whole run, in KiB on Linux
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            self.peak = max(self.peak, rss)
+            if self._stop.wait(self.interval):
+                return
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of sorted values."""
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def measure(run: Callable[[], Any], repeat: int, warmup: int) -> Dict[str, Any]:
+    """Time `repeat` calls of run() after `warmup` untimed ones; failures are counted, not raised."""
+    latencies: List[float] = []
+    errors = 0
+    first_error = None
+    with PeakRSS() as rss:
+        for index in range(warmup + repeat):
+            started = time.perf_counter()
+            try:
+                run()
+            except Exception as e:
+                errors += 1
+                first_error = first_error or str(e)
+                continue
+            if index >= warmup:
+                latencies.append(time.perf_counter() - started)
+
+    latencies.sort()
+    stats: Dict[str, Any] = {"runs": len(latencies), "errors": errors, "error": first_error, "peak_rss_bytes": rss.peak}
+    if latencies:
+        total = sum(latencies)
+        stats.update({
+            "mean_seconds": total / len(latencies),
+            "p50_seconds": percentile(latencies, 0.50),
+            "p95_seconds": percentile(latencies, 0.95),
+            "p99_seconds": percentile(latencies, 0.99),
+            "docs_per_second": len(latencies) / total,
+        })
+    return stats
+
+
+def run_extractor(registry: ExtractorRegistry, mime_type: str, path: str) -> Callable[[], Any]:
+    extractor = registry.get(mime_type)
+    filename = os.path.basename(path)
+    return lambda: extractor.extract_sync(path, filename)
+
+
+def run_endpoint(client, path: str) -> Callable[[], Any]:
+    filename = os.path.basename(path)
+    with open(path, "rb") as f:
+        content = f.read()
+
+    def run():
+        response = client.post("/extract", files={"file": (filename, content)})
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response
+
+    return run
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {
+            (r["format"], r["mode"], r["size"]): r for r in json.load(f)["results"]
+        }
+    print(f"\nCompared with {baseline_path} (p50, negative is faster):")
+    for result in results:
+        before = baseline.get((result["format"], result["mode"], result["size"]))
+        if not before or "p50_seconds" not in before or "p50_seconds" not in result:
+            continue
+        change = (result["p50_seconds"] - before["p50_seconds"]) / before["p50_seconds"]
+        print(f"{result['format']:>6} {result['mode']:>9} {result['size']:>5} "
+              f"{before['p50_seconds'] * 1000:>10.1f}ms -> {result['p50_seconds'] * 1000:>10.1f}ms {change:>+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--formats", nargs="+", default=list(corpus.FORMATS), choices=list(corpus.FORMATS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10],
+                        help="Pages (slides for PPTX, chapters for EPUB) per document")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--compare", help="Earlier --json results to compare against")
+    parser.add_argument("--log-level", default="CRITICAL",
+                        help="Service log level; failures are reported in the table either way")
+    args = parser.parse_args()
+
+    registry = ExtractorRegistry()
+    client = None
+    if "endpoint" in args.modes:
+        from fastapi.testclient import TestClient
+        import main as service
+
+        client = TestClient(service.app)
+        client.__enter__()
+    logging.getLogger().setLevel(args.log_level)
+
+    results = []
+    print(f"{'format':>6} {'mode':>9} {'size':>5} {'bytes':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'docs/s':>8} {'MB/s':>7} {'pages/s':>8} {'peak RSS MB':>11}")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in args.sizes:
+                paths = corpus.generate(tmp, args.formats, size, seed=args.seed)
+                for name, path in paths.items():
+                    mime_type = corpus.FORMATS[name][1]
+                    file_size = os.path.getsize(path)
+                    for mode in args.modes:
+                        try:
+                            run = run_extractor(registry, mime_type, path) if mode == "extractor" else run_endpoint(client, path)
+                        except Exception as e:
+                            stats = {"runs": 0, "errors": 1, "error": str(e), "peak_rss_bytes": None}
+                        else:
+                            stats = measure(run, args.repeat, args.warmup)
+
+                        result = {"format": name, "mode": mode, "size": size, "bytes": file_size, **stats}
+                        if "docs_per_second" in stats:
+                            result["mb_per_second"] = stats["docs_per_second"] * file_size / 1e6
+                            result["pages_per_second"] = stats["docs_per_second"] * size
+                            print(f"{name:>6} {mode:>9} {size:>5} {file_size:>9} "
+                                  f"{stats['p50_seconds'] * 1000:>9.1f} {stats['p95_seconds'] * 1000:>9.1f} "
+                                  f"{stats['p99_seconds'] * 1000:>9.1f} {stats['docs_per_second']:>8.2f} "
+                                  f"{result['mb_per_second']:>7.2f} {result['pages_per_second']:>8.1f} "
+                                  f"{(stats['peak_rss_bytes'] or 0) / 1e6:>11.1f}")
+                        else:
+                            print(f"{name:>6} {mode:>9} {size:>5} {file_size:>9}  failed: {stats['error'][:60]}")
+                        results.append(result)
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.json:
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": vars(args),
+            "results": results,
+        }
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
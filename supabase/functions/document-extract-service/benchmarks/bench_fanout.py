@@ -0,0 +1,83 @@
+"""
+Part-parallel extraction (PDF pages, PPTX slides, EPUB chapters): scaling by number of worker processes.
+
+    python -m benchmarks.bench_fanout --format pdf --size 300 --workers 1 2 4 8
+    python -m benchmarks.bench_fanout --format pptx --size 400
+
+Every run is checked against the serial extract_sync output.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import corpus
+from core.execution import ExtractionExecutor
+from extractors.epub_extractor import EPUBExtractor
+from extractors.pdf_extractor import PDFExtractor
+from extractors.pptx_extractor import PPTXExtractor
+
+EXTRACTORS = {
+    "pdf": PDFExtractor,
+    "pptx": PPTXExtractor,
+    "epub": EPUBExtractor,
+}
+
+
+async def run_with_workers(extractor, mime_type: str, path: str, workers: int, repeat: int):
+    executor = ExtractionExecutor(process_workers=workers, default_format_limit=1)
+    executor.start()
+    try:
+        filename = os.path.basename(path)
+        # Warm the pool so process start-up is not measured
+        await executor.run(mime_type, extractor, path, filename)
+        timings = []
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = await executor.run(mime_type, extractor, path, filename)
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+    finally:
+        await executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--format", default="pdf", choices=list(EXTRACTORS))
+    parser.add_argument("--size", type=int, default=300, help="Pages, slides or chapters")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    extractor = EXTRACTORS[args.format]()
+    unit = extractor.part_unit
+    with tempfile.TemporaryDirectory() as tmp:
+        path = corpus.generate(tmp, [args.format], args.size)[args.format]
+        mime_type = corpus.FORMATS[args.format][1]
+
+        start = time.perf_counter()
+        serial = extractor.extract_sync(path, os.path.basename(path))
+        serial_seconds = time.perf_counter() - start
+        print(f"{'workers':>8} {'seconds':>9} {unit + '/s':>9} {'speedup':>8}")
+        print(f"{'serial':>8} {serial_seconds:>9.3f} {args.size / serial_seconds:>9.1f} {1.0:>8.2f}")
+
+        results = [{"workers": 0, "seconds": serial_seconds}]
+        for workers in args.workers:
+            seconds, result = asyncio.run(run_with_workers(extractor, mime_type, path, workers, args.repeat))
+            assert result["text"] == serial["text"], f"output with {workers} workers differs from serial"
+            results.append({"workers": workers, "seconds": seconds})
+            print(f"{workers:>8} {seconds:>9.3f} {args.size / seconds:>9.1f} {serial_seconds / seconds:>8.2f}")
+
+    if args.json:
+        report = {"format": args.format, "size": args.size, "cpu_count": os.cpu_count(), "results": results}
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Micro-benchmark: SimilarityCalculator edit distance vs the original pure-Python loop.
+
+    python -m benchmarks.bench_levenshtein --sizes 1000 10000 100000 1000000
+
+The original implementation is O(n*m) Python steps, so it only runs up to
+--reference-max characters; beyond that its time is extrapolated quadratically.
+"""
+import argparse
+import json
+import random
+import time
+from typing import List
+
+from extractors.edit_distance import estimate_levenshtein, levenshtein
+
+WORDS = [
+    "paciente", "dose", "mg", "protocolo", "diagnóstico", "tratamento", "exame",
+    "hemograma", "glicemia", "pressão", "arterial", "conduta", "avaliação",
+    "clínica", "de", "da", "do", "com", "para", "em", "1", "2", "10", "500",
+]
+
+
+def reference_levenshtein(s1: str, s2: str) -> int:
+    """The implementation SimilarityCalculator shipped with before the bit-parallel engine."""
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+
+    distances = range(len(s1) + 1)
+    for i2, c2 in enumerate(s2):
+        distances_ = [i2 + 1]
+        for i1, c1 in enumerate(s1):
+            if c1 == c2:
+                distances_.append(distances[i1])
+            else:
+                distances_.append(1 + min((distances[i1], distances[i1 + 1], distances_[-1])))
+        distances = distances_
+    return distances[-1]
+
+
+def synthetic_pair(size: int, edit_rate: float, rng: random.Random):
+    """A normalized document and a copy with scattered insertions, deletions and substitutions."""
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        length += len(word) + 1
+    original = " ".join(parts)[:size]
+
+    mutated = list(original)
+    for _ in range(int(size * edit_rate)):
+        pos = rng.randrange(len(mutated))
+        op = rng.random()
+        if op < 0.4:
+            mutated[pos] = rng.choice("#*-xyz")
+        elif op < 0.7:
+            mutated.insert(pos, rng.choice("#*- "))
+        elif len(mutated) > 1:
+            del mutated[pos]
+    return original, "".join(mutated)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--edit-rate", type=float, default=0.01)
+    parser.add_argument("--reference-max", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    ref_point = None
+
+    print(f"{'size':>9} {'reference':>12} {'exact':>10} {'estimate':>10} {'method':>8} {'similarity':>10} {'± bound':>9}")
+    for size in args.sizes:
+        original, mutated = synthetic_pair(size, args.edit_rate, rng)
+        max_len = max(len(original), len(mutated))
+
+        row = {"size": size}
+        if size <= args.reference_max:
+            ref_distance, row["reference_seconds"] = timed(reference_levenshtein, original, mutated)
+            row["reference_distance"] = ref_distance
+            ref_point = (size, row["reference_seconds"])
+        elif ref_point:
+            row["reference_seconds_extrapolated"] = ref_point[1] * (size / ref_point[0]) ** 2
+
+        if size <= 100000:
+            row["exact_distance"], row["exact_seconds"] = timed(levenshtein, original, mutated)
+            if "reference_distance" in row:
+                assert row["exact_distance"] == row["reference_distance"], "bit-parallel result differs"
+
+        estimate, row["estimate_seconds"] = timed(estimate_levenshtein, original, mutated)
+        row.update({
+            "estimate_distance": estimate["distance"],
+            "method": estimate["method"],
+            "similarity": 1 - estimate["distance"] / max_len,
+            "error_bound": estimate["error_bound"] / max_len,
+        })
+        results.append(row)
+
+        reference = (
+            f"{row['reference_seconds']:.3f}s" if "reference_seconds" in row
+            else f"~{row['reference_seconds_extrapolated']:.0f}s" if "reference_seconds_extrapolated" in row
+            else "-"
+        )
+        exact = f"{row['exact_seconds']:.3f}s" if "exact_seconds" in row else "-"
+        print(f"{size:>9} {reference:>12} {exact:>10} {row['estimate_seconds']:>9.3f}s {row['method']:>8} "
+              f"{row['similarity']:>10.4f} {row['error_bound']:>9.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
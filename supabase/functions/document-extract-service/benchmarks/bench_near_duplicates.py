@@ -0,0 +1,68 @@
+"""
+Near-duplicate index: lookup time as the indexed corpus grows.
+
+    python -m benchmarks.bench_near_duplicates --documents 100 1000 10000
+
+Each step indexes distinct documents up to the next corpus size, then looks
+up revised copies of indexed documents (every tenth sentence changed) and
+checks that the original is found.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import corpus
+from core.near_duplicates import NearDuplicateIndex
+
+
+def document(number: int, sentences: int) -> str:
+    return "\n".join(corpus.sentences(sentences, seed=number))
+
+
+def revised(text: str) -> str:
+    lines = text.split("\n")
+    for index in range(0, len(lines), 10):
+        lines[index] = "revisado " + lines[index]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--sentences", type=int, default=200, help="Sentences per document")
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NearDuplicateIndex(os.path.join(tmp, "index.sqlite"))
+        indexed = 0
+        print(f"{'documents':>10} {'index s/doc':>12} {'lookup ms':>10} {'found':>6}")
+        for size in sorted(args.documents):
+            start = time.perf_counter()
+            for number in range(indexed, size):
+                index.check(f"doc-{number}", f"doc-{number}.txt", document(number, args.sentences))
+            index_seconds = (time.perf_counter() - start) / max(1, size - indexed)
+            indexed = size
+
+            texts = [revised(document(number, args.sentences)) for number in range(0, size, max(1, size // args.lookups))]
+            found = 0
+            start = time.perf_counter()
+            for lookup, text in enumerate(texts):
+                matches = index.check(f"revision-{size}-{lookup}", "revision.txt", text)
+                found += bool(matches)
+            lookup_ms = (time.perf_counter() - start) / len(texts) * 1000
+            results.append({"documents": size, "index_seconds": index_seconds, "lookup_ms": lookup_ms, "found": found / len(texts)})
+            print(f"{size:>10} {index_seconds:>12.4f} {lookup_ms:>10.2f} {found / len(texts):>6.0%}")
+        index.close()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"sentences": args.sentences, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark: TF-IDF cosine scoring modes of SimilarityCalculator.
+
+    python -m benchmarks.bench_similarity --sizes 1000 10000 100000 --edit-rates 0.01 0.1 0.3
+
+Compares the original per-call TfidfVectorizer fit ("fit") with hashed
+TF-IDF using pairwise IDF ("hashing") and a reference IDF fitted once on a
+synthetic corpus ("reference"): time per call and the absolute difference
+of each score from the "fit" score.
+"""
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import config
+from extractors.similarity_calculator import SimilarityCalculator
+from extractors.tfidf import HashedTfidf
+from benchmarks.bench_levenshtein import synthetic_pair
+from benchmarks.corpus import sentences
+
+
+def calculator(mode: str, tfidf: HashedTfidf = None) -> SimilarityCalculator:
+    config.SIMILARITY_COSINE_MODE = mode if mode != 'reference' else 'hashing'
+    calc = SimilarityCalculator()
+    calc.cosine_mode = mode
+    if tfidf is not None:
+        calc.tfidf = tfidf
+    return calc
+
+
+def per_call(func, *args, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--edit-rates", type=float, nargs="+", default=[0.01, 0.1, 0.3])
+    parser.add_argument("--reference-docs", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    reference_corpus = (
+        SimilarityCalculator.normalize_text(" ".join(sentences(40, seed=1000 + i)))
+        for i in range(args.reference_docs)
+    )
+    start = time.perf_counter()
+    reference = HashedTfidf.fit_reference(reference_corpus, config.SIMILARITY_HASH_FEATURES)
+    print(f"Reference IDF fitted on {args.reference_docs} documents in {time.perf_counter() - start:.2f}s")
+
+    calculators = {
+        'fit': calculator('fit'),
+        'hashing': calculator('hashing'),
+        'reference': calculator('reference', reference),
+    }
+
+    rng = random.Random(args.seed)
+    results = []
+    print(f"{'size':>7} {'edits':>6} {'fit':>9} {'hashing':>9} {'reference':>9}   "
+          f"{'fit score':>9} {'Δ hashing':>9} {'Δ reference':>11}")
+    for size in args.sizes:
+        for edit_rate in args.edit_rates:
+            original, mutated = synthetic_pair(size, edit_rate, rng)
+            original = SimilarityCalculator.normalize_text(original)
+            mutated = SimilarityCalculator.normalize_text(mutated)
+
+            row = {"size": size, "edit_rate": edit_rate}
+            for mode, calc in calculators.items():
+                score, seconds = per_call(calc.cosine_similarity, original, mutated, repeat=args.repeat)
+                row[f"{mode}_score"] = score
+                row[f"{mode}_ms"] = seconds * 1000
+            results.append(row)
+
+            print(f"{size:>7} {edit_rate:>6.2f} {row['fit_ms']:>7.1f}ms {row['hashing_ms']:>7.1f}ms "
+                  f"{row['reference_ms']:>7.1f}ms   {row['fit_score']:>9.4f} "
+                  f"{abs(row['hashing_score'] - row['fit_score']):>9.4f} "
+                  f"{abs(row['reference_score'] - row['fit_score']):>11.4f}")
+
+    # The shared scorer must give the same answers when used from many threads
+    pairs = [
+        tuple(SimilarityCalculator.normalize_text(t) for t in synthetic_pair(5000, 0.05, rng))
+        for _ in range(32)
+    ]
+    hashing = calculators['hashing']
+    serial = [hashing.cosine_similarity(*pair) for pair in pairs]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        concurrent = list(pool.map(lambda pair: hashing.cosine_similarity(*pair), pairs))
+    elapsed = time.perf_counter() - start
+    assert concurrent == serial, "concurrent scores differ from serial ones"
+    print(f"{len(pairs)} pairs on {args.threads} threads: {len(pairs) / elapsed:.0f} pairs/s, identical to serial")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Synthetic documents of controlled size for the benchmarks.
+
+Everything is generated locally and deterministically from a seed, so
+results can be compared across commits.
+"""
+import os
+import random
+import unicodedata
+from typing import Callable, Dict, List, Tuple
+
+WORDS = [
+    "paciente", "dose", "protocolo", "diagnóstico", "tratamento", "exame",
+    "hemograma", "glicemia", "pressão", "arterial", "conduta", "avaliação",
+    "clínica", "internação", "prescrição", "antibiótico", "sintomas", "evolução",
+    "de", "da", "do", "com", "para", "em", "mg", "ml", "10", "500",
+]
+
+
+def sentences(count: int, seed: int = 0, words_per_sentence: int = 12) -> List[str]:
+    """Deterministic pseudo-clinical sentences."""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(words_per_sentence)]
+        result.append(" ".join(words).capitalize() + ".")
+    return result
+
+
+def _page_lines(pages: int, lines_per_page: int, seed: int) -> List[List[str]]:
+    lines = sentences(pages * lines_per_page, seed=seed)
+    return [lines[page * lines_per_page:(page + 1) * lines_per_page] for page in range(pages)]
+
+
+def _pdf_escape(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+# Lab-value rows for the ruled tables in make_pdf
+LAB_TABLE = [
+    ("Exame", "Resultado", "Referência"),
+    ("Hemoglobina", "13,2 g/dL", "12,0 - 16,0"),
+    ("Leucócitos", "7.400 /mm3", "4.000 - 11.000"),
+    ("Glicemia", "98 mg/dL", "70 - 99"),
+    ("Creatinina", "0,9 mg/dL", "0,6 - 1,2"),
+]
+
+
+def _pdf_table(rows: List[Tuple[str, ...]], top: float, left: float = 50, column_width: float = 150,
+               row_height: float = 16) -> bytes:
+    """Content stream for a table with ruling lines around every cell."""
+    columns = len(rows[0])
+    right = left + columns * column_width
+    bottom = top - len(rows) * row_height
+    ops = [b"0.5 w"]
+    for row in range(len(rows) + 1):
+        y = top - row * row_height
+        ops.append(b"%.1f %.1f m %.1f %.1f l S" % (left, y, right, y))
+    for column in range(columns + 1):
+        x = left + column * column_width
+        ops.append(b"%.1f %.1f m %.1f %.1f l S" % (x, top, x, bottom))
+    for row, cells in enumerate(rows):
+        y = top - (row + 1) * row_height + 4
+        for column, cell in enumerate(cells):
+            x = left + column * column_width + 4
+            ops.append(b"BT /F1 9 Tf %.1f %.1f Td (" % (x, y) + _pdf_escape(cell) + b") Tj ET")
+    return b"\n".join(ops)
+
+
+def make_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0, table_every: int = 0):
+    """
+    Write a text PDF with `pages` pages using the standard Helvetica font.
+    With `table_every`, every table_every-th page also gets a ruled lab-value table.
+    """
+    lines = sentences(pages * lines_per_page, seed=seed, words_per_sentence=8)
+
+    objects: List[bytes] = []
+    # 1: catalog, 2: page tree, 3: font; pages and their contents follow
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects.append(b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages)
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+
+    for page in range(pages):
+        page_lines = lines[page * lines_per_page:(page + 1) * lines_per_page]
+        stream = [b"BT /F1 10 Tf 14 TL 50 800 Td"]
+        for line in page_lines:
+            stream.append(b"(" + _pdf_escape(line) + b") Tj T*")
+        stream.append(b"ET")
+        if table_every and (page + 1) % table_every == 0:
+            stream.append(_pdf_table(LAB_TABLE, top=780 - 14 * lines_per_page))
+        content = b"\n".join(stream)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_ids[page] + 1)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+def make_text(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """Plain text with a section heading every `lines_per_page` lines."""
+    with open(path, "w", encoding="utf-8") as f:
+        for number, lines in enumerate(_page_lines(pages, lines_per_page, seed), 1):
+            f.write(f"SEÇÃO {number}\n" + "\n".join(lines) + "\n\n")
+
+
+def make_html(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """An HTML page with a heading, paragraphs and a list per page."""
+    parts = ["<html><head><title>Protocolo</title></head><body>"]
+    for number, lines in enumerate(_page_lines(pages, lines_per_page, seed), 1):
+        parts.append(f"<h2>Seção {number}</h2>")
+        parts.extend(f"<p>{line}</p>" for line in lines[:-4])
+        parts.append("<ul>" + "".join(f"<li>{line}</li>" for line in lines[-4:]) + "</ul>")
+    parts.append("</body></html>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def make_docx(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """A DOCX with a heading and `lines_per_page` paragraphs per page."""
+    from docx import Document
+
+    document = Document()
+    for number, lines in enumerate(_page_lines(pages, lines_per_page, seed), 1):
+        document.add_heading(f"Seção {number}", level=2)
+        for line in lines:
+            document.add_paragraph(line)
+    document.save(path)
+
+
+def make_pptx(path: str, slides: int, lines_per_slide: int = 8, seed: int = 0):
+    """A PPTX with a title and bullet lines on every slide."""
+    from pptx import Presentation
+
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for number, lines in enumerate(_page_lines(slides, lines_per_slide, seed), 1):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {number}"
+        body = slide.placeholders[1].text_frame
+        body.text = lines[0]
+        for line in lines[1:]:
+            body.add_paragraph().text = line
+    presentation.save(path)
+
+
+def make_epub(path: str, chapters: int, lines_per_chapter: int = 40, seed: int = 0):
+    """An EPUB with one chapter per `lines_per_chapter` lines."""
+    from ebooklib import epub
+
+    book = epub.EpubBook()
+    book.set_identifier(f"bench-{seed}")
+    book.set_title("Protocolo clínico")
+    book.set_language("pt")
+    items = []
+    for number, lines in enumerate(_page_lines(chapters, lines_per_chapter, seed), 1):
+        chapter = epub.EpubHtml(title=f"Capítulo {number}", file_name=f"chapter_{number}.xhtml", lang="pt")
+        chapter.content = f"<html><body><h1>Capítulo {number}</h1>" + "".join(f"<p>{line}</p>" for line in lines) + "</body></html>"
+        book.add_item(chapter)
+        items.append(chapter)
+    book.toc = items
+    book.spine = ["nav"] + items
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    epub.write_epub(path, book)
+
+
+def _rtf_escape(text: str) -> str:
+    escaped = []
+    for char in text:
+        if char in "\\{}":
+            escaped.append("\\" + char)
+        elif ord(char) > 127:
+            escaped.append(f"\\u{ord(char)}?")
+        else:
+            escaped.append(char)
+    return "".join(escaped)
+
+
+def make_rtf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0):
+    """An RTF document with a bold heading per page and Unicode escapes for accents."""
+    parts = ["{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Helvetica;}}\\f0\\fs20"]
+    for number, lines in enumerate(_page_lines(pages, lines_per_page, seed), 1):
+        parts.append(f"{{\\b {_rtf_escape(f'Seção {number}')}}}\\par")
+        parts.extend(f"{_rtf_escape(line)}\\par" for line in lines)
+        parts.append("\\page")
+    parts.append("}")
+    with open(path, "w", encoding="ascii") as f:
+        f.write("\n".join(parts))
+
+
+def make_image(path: str, pages: int = 1, lines_per_page: int = 30, seed: int = 0, dpi: int = 200):
+    """
+    A scanned-looking PNG page of text; `pages` pages are stacked into one
+    tall image. Accents are dropped because the default font lacks them.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    font_size = max(10, dpi // 8)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        # Pillow without FreeType sizes
+        font = ImageFont.load_default()
+    line_height = int(font_size * 1.5)
+    margin = dpi // 2
+    lines = [
+        unicodedata.normalize("NFKD", line).encode("ascii", "ignore").decode()
+        for page in _page_lines(pages, lines_per_page, seed) for line in page
+    ]
+
+    width = int(8.27 * dpi)
+    height = 2 * margin + line_height * len(lines)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(lines):
+        draw.text((margin, margin + index * line_height), line, fill=0, font=font)
+    image.save(path, dpi=(dpi, dpi))
+
+
+# format -> (file extension, MIME type, generator(path, size, seed=...))
+FORMATS: Dict[str, Tuple[str, str, Callable[..., None]]] = {
+    "pdf": (".pdf", "application/pdf", make_pdf),
+    "docx": (".docx", "application/vnd.openxmlformats-officedocument.wordprocessingml.document", make_docx),
+    "pptx": (".pptx", "application/vnd.openxmlformats-officedocument.presentationml.presentation", make_pptx),
+    "html": (".html", "text/html", make_html),
+    "epub": (".epub", "application/epub+zip", make_epub),
+    "rtf": (".rtf", "application/rtf", make_rtf),
+    "txt": (".txt", "text/plain", make_text),
+    "image": (".png", "image/png", make_image),
+}
+
+
+def generate(directory: str, formats: List[str], size: int, seed: int = 0) -> Dict[str, str]:
+    """
+    Write one document per format into `directory` and return {format: path}.
+
+    `size` is in pages for paginated formats, slides for PPTX and chapters
+    for EPUB; the other formats get the same amount of text.
+    """
+    paths = {}
+    for name in formats:
+        extension, _, generator = FORMATS[name]
+        path = os.path.join(directory, f"bench_{size}{extension}")
+        generator(path, size, seed=seed)
+        paths[name] = path
+    return paths
@@ -0,0 +1 @@
+# Core service infrastructure
\ No newline at end of file
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(content_sha256: str, extractor_version: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key for an upload: content hash + extractor version + extraction options."""
+    payload = json.dumps(
+        {"sha256": content_sha256, "version": extractor_version, "options": options or {}},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _encode(value: Dict[str, Any]) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 1)
+
+
+def _decode(blob: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class _DiskTier:
+    """SQLite-backed store of compressed results with TTL and size-based eviction."""
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: int):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn.execute(
+            "SELECT value, created_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            return None
+        self._conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, blob: bytes):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, len(blob), now, now)
+        )
+        self._evict(now)
+
+    def _evict(self, now: float):
+        if self.ttl_seconds > 0:
+            self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently used entries go first
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM results ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+
+    def close(self):
+        self._conn.close()
+
+
+class ResultCache:
+    """
+    Two-tier cache of extraction responses.
+
+    The in-process tier is an LRU bounded by the compressed size of its
+    entries; the optional disk tier (SQLite) survives restarts and is shared
+    by all workers pointing at the same file. Disk hits are promoted to memory.
+    Methods are thread-safe and blocking, so call them from the thread pool.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = config.CACHE_MEMORY_BYTES,
+        disk_path: str = config.CACHE_DISK_PATH,
+        disk_bytes: int = config.CACHE_DISK_BYTES,
+        ttl_seconds: int = config.CACHE_TTL_SECONDS,
+    ):
+        self.memory_bytes = max(0, memory_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._disk: Optional[_DiskTier] = None
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        if disk_path:
+            try:
+                self._disk = _DiskTier(disk_path, disk_bytes, ttl_seconds)
+                logger.info(f"Result cache disk tier at {disk_path} ({disk_bytes} bytes)")
+            except Exception as e:
+                logger.warning(f"Result cache disk tier disabled: {e}")
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory_bytes > 0 or self._disk is not None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response and the tier it came from, or None."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self.ttl_seconds > 0 and time.time() - entry[1] > self.ttl_seconds:
+                self._drop(key)
+                entry = None
+
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return {"value": _decode(entry[0]), "tier": "memory"}
+
+            blob = None
+            if self._disk is not None:
+                try:
+                    blob = self._disk.get(key)
+                except sqlite3.Error as e:
+                    logger.warning(f"Result cache disk read failed: {e}")
+
+            if blob is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, blob)
+            return {"value": _decode(blob), "tier": "disk"}
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a response in every enabled tier."""
+        blob = _encode(value)
+        with self._lock:
+            self._remember(key, blob)
+            if self._disk is not None:
+                try:
+                    self._disk.put(key, blob)
+                except sqlite3.Error as e:
+                    logger.warning(f"Result cache disk write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_used,
+            "disk_enabled": self._disk is not None,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def _remember(self, key: str, blob: bytes):
+        if len(blob) > self.memory_bytes:
+            return
+        self._drop(key)
+        self._memory[key] = (blob, time.time())
+        self._memory_used += len(blob)
+        while self._memory_used > self.memory_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _drop(self, key: str):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_used -= len(entry[0])
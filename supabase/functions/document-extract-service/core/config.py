@@ -0,0 +1,179 @@
+import os
+import tempfile
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Invalid integer for {name}: {value!r}, using {default}")
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Invalid float for {name}: {value!r}, using {default}")
+        return default
+
+
+def env_str(name: str, default: str) -> str:
+    """Read a string setting from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip()
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/true/yes/on) from the environment."""
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_map(name: str) -> Dict[str, str]:
+    """Read a `key=value,key=value` setting from the environment."""
+    result = {}
+    for item in os.getenv(name, "").split(","):
+        if "=" not in item:
+            continue
+        key, value = item.split("=", 1)
+        if key.strip():
+            result[key.strip()] = value.strip()
+    return result
+
+
+# Worker pools (core.execution)
+PROCESS_WORKERS = env_int("EXTRACT_PROCESS_WORKERS", os.cpu_count() or 1)
+THREAD_WORKERS = env_int("EXTRACT_THREAD_WORKERS", 8)
+MP_START_METHOD = env_str("EXTRACT_MP_START_METHOD", "spawn")
+MAX_QUEUE_DEPTH = env_int("EXTRACT_MAX_QUEUE_DEPTH", 32)
+RETRY_AFTER_SECONDS = env_int("EXTRACT_RETRY_AFTER_SECONDS", 5)
+DEFAULT_FORMAT_CONCURRENCY = env_int("EXTRACT_DEFAULT_FORMAT_CONCURRENCY", PROCESS_WORKERS)
+FORMAT_CONCURRENCY = {
+    mime_type: int(limit)
+    for mime_type, limit in env_map("EXTRACT_FORMAT_CONCURRENCY").items()
+    if limit.isdigit()
+}
+
+# Extractor registry (core.registry)
+EXTRACTORS = env_map("EXTRACTORS")
+EXTRACTOR_WARMUP = [m.strip() for m in env_str("EXTRACTOR_WARMUP", "").split(",") if m.strip()]
+
+# Similarity (extractors.similarity_calculator)
+SIMILARITY_EXACT_MAX_CHARS = env_int("SIMILARITY_EXACT_MAX_CHARS", 20000)
+SIMILARITY_CHUNK_CHARS = env_int("SIMILARITY_CHUNK_CHARS", 2000)
+SIMILARITY_SAMPLE_ABOVE_CHARS = env_int("SIMILARITY_SAMPLE_ABOVE_CHARS", 1000000)
+SIMILARITY_SAMPLE_CHUNKS = env_int("SIMILARITY_SAMPLE_CHUNKS", 200)
+SIMILARITY_COSINE_MODE = env_str("SIMILARITY_COSINE_MODE", "hashing").lower()
+SIMILARITY_HASH_FEATURES = env_int("SIMILARITY_HASH_FEATURES", 2 ** 20)
+SIMILARITY_IDF_PATH = env_str("SIMILARITY_IDF_PATH", "")
+SIMILARITY_WARMUP = env_bool("SIMILARITY_WARMUP", False)
+# Verification level when the request names none: off, structural, sampled or full
+SIMILARITY_VERIFICATION = env_str("SIMILARITY_VERIFICATION", "full").lower()
+SIMILARITY_VERIFICATION_BY_TYPE = {
+    mime_type: level.lower() for mime_type, level in env_map("SIMILARITY_VERIFICATION_BY_TYPE").items()
+}
+SIMILARITY_VERIFY_SAMPLE_CHUNKS = env_int("SIMILARITY_VERIFY_SAMPLE_CHUNKS", 32)
+
+# Result cache (core.cache)
+CACHE_MEMORY_BYTES = env_int("CACHE_MEMORY_BYTES", 256 * 1024 * 1024)
+CACHE_DISK_PATH = env_str("CACHE_DISK_PATH", "")
+CACHE_DISK_BYTES = env_int("CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024)
+CACHE_TTL_SECONDS = env_int("CACHE_TTL_SECONDS", 7 * 24 * 3600)
+
+# Near-duplicate detection (core.near_duplicates): MinHash LSH index file, disabled when empty
+# Bands x rows is the signature length; more rows per band raise the match threshold
+NEAR_DUPLICATE_INDEX_PATH = env_str("NEAR_DUPLICATE_INDEX_PATH", "")
+NEAR_DUPLICATE_BANDS = env_int("NEAR_DUPLICATE_BANDS", 20)
+NEAR_DUPLICATE_ROWS = env_int("NEAR_DUPLICATE_ROWS", 6)
+NEAR_DUPLICATE_SHINGLE_WORDS = env_int("NEAR_DUPLICATE_SHINGLE_WORDS", 5)
+NEAR_DUPLICATE_THRESHOLD = env_float("NEAR_DUPLICATE_THRESHOLD", 0.8)
+NEAR_DUPLICATE_MAX_RESULTS = env_int("NEAR_DUPLICATE_MAX_RESULTS", 5)
+
+# Uploads (core.upload)
+MAX_UPLOAD_BYTES = env_int("MAX_UPLOAD_BYTES", 512 * 1024 * 1024)
+UPLOAD_CHUNK_BYTES = env_int("UPLOAD_CHUNK_BYTES", 1024 * 1024)
+SPOOL_DIR = env_str("SPOOL_DIR", "")
+
+# PDF extraction (extractors.pdf_extractor)
+PDF_PARALLEL = env_bool("PDF_PARALLEL", True)
+PDF_MIN_PAGES_PER_PART = env_int("PDF_MIN_PAGES_PER_PART", 8)
+PDF_OCR = env_bool("PDF_OCR", True)
+PDF_OCR_MIN_CHARS = env_int("PDF_OCR_MIN_CHARS", 50)
+PDF_OCR_DPI = env_int("PDF_OCR_DPI", 300)
+PDF_OCR_PAGE_TIMEOUT = env_int("PDF_OCR_PAGE_TIMEOUT", 120)
+# Pages are screened for ruling lines before the (expensive) table detection
+PDF_TABLES = env_bool("PDF_TABLES", True)
+PDF_TABLE_MIN_RULINGS = env_int("PDF_TABLE_MIN_RULINGS", 3)
+
+# OCR (extractors.ocr)
+OCR_BACKEND = env_str("OCR_BACKEND", "auto").lower()
+OCR_POOL_SIZE = env_int("OCR_POOL_SIZE", 2)
+OCR_RECYCLE_AFTER = env_int("OCR_RECYCLE_AFTER", 500)
+TESSDATA_PREFIX = env_str("TESSDATA_PREFIX", "")
+
+# EPUB and PPTX fan-out: chapters / slides per worker part
+EPUB_PARALLEL = env_bool("EPUB_PARALLEL", True)
+EPUB_MIN_CHAPTERS_PER_PART = env_int("EPUB_MIN_CHAPTERS_PER_PART", 8)
+PPTX_PARALLEL = env_bool("PPTX_PARALLEL", True)
+PPTX_MIN_SLIDES_PER_PART = env_int("PPTX_MIN_SLIDES_PER_PART", 20)
+
+# HTML and EPUB extraction (extractors.html_events)
+# "events": one streaming pass with lxml parser events; "tree": BeautifulSoup
+HTML_EXTRACTION_MODE = env_str("HTML_EXTRACTION_MODE", "events").lower()
+HTML_FEED_BYTES = env_int("HTML_FEED_BYTES", 64 * 1024)
+
+# RTF extraction (extractors.rtf_parser)
+# "native": in-process single-pass parser; "pandoc": pandoc subprocess, native when it fails
+RTF_MODE = env_str("RTF_MODE", "native").lower()
+RTF_FEED_BYTES = env_int("RTF_FEED_BYTES", 64 * 1024)
+
+# Image OCR preprocessing (extractors.image_preprocessing)
+IMAGE_OCR_TARGET_DPI = env_int("IMAGE_OCR_TARGET_DPI", 300)
+IMAGE_OCR_MAX_SIDE = env_int("IMAGE_OCR_MAX_SIDE", 4000)
+IMAGE_OCR_DESKEW = env_bool("IMAGE_OCR_DESKEW", True)
+IMAGE_OCR_MIN_CONFIDENCE = env_float("IMAGE_OCR_MIN_CONFIDENCE", 60.0)
+
+# Streaming extraction (POST /extract/stream)
+STREAM_QUEUE_CHUNKS = env_int("STREAM_QUEUE_CHUNKS", 8)
+
+# Batch extraction (POST /extract/batch)
+BATCH_CONCURRENCY = env_int("BATCH_CONCURRENCY", max(2, PROCESS_WORKERS))
+BATCH_MAX_FILES = env_int("BATCH_MAX_FILES", 5000)
+MAX_BATCH_BYTES = env_int("MAX_BATCH_BYTES", 4 * 1024 * 1024 * 1024)
+
+# Asynchronous jobs (core.jobs)
+JOBS_DIR = env_str("JOBS_DIR", os.path.join(tempfile.gettempdir(), "document-extract-jobs"))
+JOBS_WORKERS = env_int("JOBS_WORKERS", 2)
+JOBS_RETENTION_SECONDS = env_int("JOBS_RETENTION_SECONDS", 24 * 3600)
+JOBS_LEASE_SECONDS = env_int("JOBS_LEASE_SECONDS", 120)
+
+# Profiling (core.profiling)
+PROFILE_HEADER_ENABLED = env_bool("PROFILE_HEADER_ENABLED", False)
+PROFILE_SAMPLE_RATE = env_float("PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_SLOW_SECONDS = env_float("PROFILE_SLOW_SECONDS", 0.0)
+PROFILE_DIR = env_str("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "document-extract-profiles"))
+PROFILE_INTERVAL_MS = env_float("PROFILE_INTERVAL_MS", 5.0)
+PROFILE_MEMORY = env_bool("PROFILE_MEMORY", True)
+PROFILE_TOP_ALLOCATIONS = env_int("PROFILE_TOP_ALLOCATIONS", 30)
+
+# Embedding segments (core.segments, ?segments=true)
+# Token counts are estimated as words and punctuation marks
+SEGMENT_MAX_TOKENS = env_int("SEGMENT_MAX_TOKENS", 512)
+SEGMENT_OVERLAP_TOKENS = env_int("SEGMENT_OVERLAP_TOKENS", 64)
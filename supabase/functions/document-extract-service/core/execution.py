@@ -0,0 +1,514 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Callable, List, Optional
+
+from extractors.base_extractor import BaseExtractor, progress_channel
+from . import config
+from .profiling import run_profiled
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturatedError(Exception):
+    """Raised when too many extractions are already queued or running."""
+
+    def __init__(self, queue_depth: int, retry_after: int):
+        super().__init__(f"Extraction queue is full ({queue_depth} pending), retry after {retry_after}s")
+        self.queue_depth = queue_depth
+        self.retry_after = retry_after
+
+
+# progress(done, total, unit)
+ProgressCallback = Callable[[int, int, str], None]
+
+# Parts planned per process worker when an extractor fans out
+PARTS_PER_WORKER = 2
+
+
+def _run_extractor(extractor, file_path: str, filename: str, channel=None) -> Dict[str, Any]:
+    """Entry point executed inside pool workers."""
+    with progress_channel(channel):
+        return extractor.extract_sync(file_path, filename)
+
+
+def _plan_parts(extractor, file_path: str, filename: str, max_parts: int) -> Optional[List[Any]]:
+    return extractor.plan_parts(file_path, filename, max_parts)
+
+
+def _run_part(extractor, file_path: str, filename: str, part: Any, channel=None, index: int = 0) -> Any:
+    with progress_channel(channel, index):
+        return extractor.extract_part(file_path, filename, part)
+
+
+def _stream_chunks(extractor, file_path: str, filename: str, chunks, cancelled) -> None:
+    """
+    Entry point for streaming extractions: push ('chunk', chunk) messages into
+    a bounded queue, then ('done', None) or ('error', message).
+    """
+    def put(message) -> bool:
+        while not cancelled.is_set():
+            try:
+                chunks.put(message, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        for chunk in extractor.iter_chunks(file_path, filename):
+            if not put(('chunk', chunk)):
+                return
+        put(('done', None))
+    except Exception as e:
+        put(('error', str(e)))
+
+
+def _supports_parts(extractor) -> bool:
+    """Whether the extractor overrides BaseExtractor.plan_parts."""
+    return type(extractor).plan_parts is not BaseExtractor.plan_parts
+
+
+class _ProgressRelay:
+    """
+    Forwards the report_progress messages of worker calls to a progress
+    callback on the event loop, as (done, total, unit) over all parts.
+
+    `totals` holds the size of each part, or [None] for a whole-document
+    extraction whose total arrives from the extractor. Messages travel over
+    a queue served by the stream manager when the workers are processes.
+    """
+
+    def __init__(self, progress: ProgressCallback, unit: str, totals: List[Optional[int]], channel):
+        self.progress = progress
+        self.unit = unit
+        self.totals = list(totals)
+        self.done = [0] * len(totals)
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.channel is not None:
+            self._task = asyncio.create_task(self._relay())
+
+    async def stop(self):
+        if self._task is not None:
+            await asyncio.to_thread(self.channel.put, None)
+            await self._task
+
+    def part_done(self, index: int):
+        self.done[index] = self.totals[index] or self.done[index]
+        self._report()
+
+    async def _relay(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.run_in_executor(None, self.channel.get)
+            if message is None:
+                return
+            index, units, total = message
+            if total is not None:
+                self.totals[index] = total
+            self.done[index] += units
+            if self.totals[index] is not None:
+                self.done[index] = min(self.done[index], self.totals[index])
+            self._report()
+
+    def _report(self):
+        if None not in self.totals:
+            self.progress(sum(self.done), sum(self.totals), self.unit)
+
+
+class ExtractionExecutor:
+    """
+    Runs extractors off the event loop.
+
+    CPU-bound extractors (`execution_mode = 'process'`) go to a process pool,
+    I/O-bound ones (`execution_mode = 'thread'`) to a thread pool. Each MIME type
+    has its own concurrency limit, and once `max_queue_depth` extractions are
+    waiting or running new requests are rejected with ExecutorSaturatedError.
+
+    Extractors that implement plan_parts are fanned out part by part across
+    the process pool and merged back in order.
+    """
+
+    def __init__(
+        self,
+        process_workers: int = config.PROCESS_WORKERS,
+        thread_workers: int = config.THREAD_WORKERS,
+        max_queue_depth: int = config.MAX_QUEUE_DEPTH,
+        format_limits: Optional[Dict[str, int]] = None,
+        default_format_limit: int = config.DEFAULT_FORMAT_CONCURRENCY,
+        retry_after: int = config.RETRY_AFTER_SECONDS,
+        mp_start_method: str = config.MP_START_METHOD,
+    ):
+        self.process_workers = max(0, process_workers)
+        self.thread_workers = max(1, thread_workers)
+        self.max_queue_depth = max(1, max_queue_depth)
+        self.format_limits = dict(config.FORMAT_CONCURRENCY if format_limits is None else format_limits)
+        self.default_format_limit = max(1, default_format_limit)
+        self.retry_after = retry_after
+        self.mp_start_method = mp_start_method
+
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._pending = 0
+        self._manager = None
+        self._manager_lock = threading.Lock()
+
+    def start(self):
+        """Create the worker pools."""
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers,
+                thread_name_prefix="extract"
+            )
+        if self._process_pool is None and self.process_workers > 0:
+            self._process_pool = self._create_process_pool()
+        logger.info(
+            f"Extraction executor started: {self.process_workers} process workers, "
+            f"{self.thread_workers} thread workers, max queue depth {self.max_queue_depth}"
+        )
+
+    async def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the worker pools."""
+        process_pool, self._process_pool = self._process_pool, None
+        thread_pool, self._thread_pool = self._thread_pool, None
+
+        loop = asyncio.get_running_loop()
+        for pool in (process_pool, thread_pool):
+            if pool is not None:
+                await loop.run_in_executor(None, lambda p=pool: p.shutdown(wait=wait, cancel_futures=True))
+        manager, self._manager = self._manager, None
+        if manager is not None:
+            await loop.run_in_executor(None, manager.shutdown)
+        logger.info("Extraction executor stopped")
+
+    @property
+    def queue_depth(self) -> int:
+        return self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        """Current pool configuration and load, for /health."""
+        return {
+            "process_workers": self.process_workers,
+            "thread_workers": self.thread_workers,
+            "queue_depth": self._pending,
+            "max_queue_depth": self.max_queue_depth,
+            "format_limits": {
+                mime_type: self._format_limit(mime_type) for mime_type in self._semaphores
+            },
+            "running": self._thread_pool is not None,
+        }
+
+    async def run(
+        self,
+        mime_type: str,
+        extractor,
+        file_path: str,
+        filename: str,
+        progress: Optional[ProgressCallback] = None,
+        timings=None,
+        profile=None
+    ) -> Dict[str, Any]:
+        """
+        Run the extractor in the pool matching its execution mode.
+
+        `progress(done, total, unit)` is called from the event loop as work
+        completes: per unit (e.g. pages) for extractors that report progress,
+        per part for other fanned-out extractors, otherwise once for the
+        whole document. `timings` (core.metrics.StageTimings) receives the
+        time spent waiting for a slot ('queue_wait') and extracting
+        ('extract'). With a core.profiling.ProfileSession as
+        `profile`, every worker call is profiled and added to it.
+
+        If the caller is cancelled, workers already running cannot be
+        stopped; the queue slot and format slot stay taken until they finish.
+
+        Raises:
+            ExecutorSaturatedError: when the queue is already full
+        """
+        self._reserve()
+        semaphore = None
+        workers: List[asyncio.Future] = []
+        try:
+            waiting = time.perf_counter()
+            slot = self._semaphore(mime_type)
+            await slot.acquire()
+            semaphore = slot
+            started = time.perf_counter()
+            try:
+                return await self._extract(extractor, file_path, filename, progress, profile, workers)
+            finally:
+                if timings is not None:
+                    timings.add('queue_wait', started - waiting)
+                    timings.add('extract', time.perf_counter() - started)
+        finally:
+            running = [worker for worker in workers if not worker.done()]
+            if running:
+                asyncio.gather(*running, return_exceptions=True).add_done_callback(
+                    lambda future: self._release(semaphore)
+                )
+            else:
+                self._release(semaphore)
+
+    def stream(self, mime_type: str, extractor, file_path: str, filename: str) -> 'ChunkStream':
+        """
+        Run extractor.iter_chunks in the pool matching its execution mode and
+        iterate over the chunks as they are produced.
+
+        Raises:
+            ExecutorSaturatedError: when the queue is already full
+        """
+        return ChunkStream(self, mime_type, extractor, file_path, filename)
+
+    async def run_blocking(self, func: Callable, *args) -> Any:
+        """Run a blocking function in the thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread_pool, func, *args)
+
+    def _release(self, semaphore: Optional[asyncio.Semaphore]):
+        if semaphore is not None:
+            semaphore.release()
+        self._pending -= 1
+
+    async def _extract(
+        self,
+        extractor,
+        file_path: str,
+        filename: str,
+        progress: Optional[ProgressCallback],
+        profile=None,
+        workers: Optional[List[asyncio.Future]] = None
+    ) -> Dict[str, Any]:
+        if getattr(extractor, 'execution_mode', 'process') == 'process':
+            submit = self._submit_process
+            max_parts = self.process_workers * PARTS_PER_WORKER if self._process_pool else 1
+        else:
+            submit = self.run_blocking
+            max_parts = 1
+        merge = self.run_blocking
+        if profile is not None:
+            submit = self._profiled(submit, profile)
+            merge = self._profiled(merge, profile)
+        if workers is not None:
+            submit = self._tracked(submit, workers)
+            merge = self._tracked(merge, workers)
+
+        if max_parts > 1 and _supports_parts(extractor):
+            parts = await submit(_plan_parts, extractor, file_path, filename, max_parts)
+            if parts and len(parts) > 1:
+                relay = None
+                if progress:
+                    sizes = [extractor.part_size(part) for part in parts]
+                    relay = _ProgressRelay(progress, extractor.part_unit, sizes, await self._progress_queue(extractor))
+                    relay.start()
+                    progress(0, sum(sizes), extractor.part_unit)
+
+                async def run_part(index, part):
+                    channel = relay.channel if relay else None
+                    result = await submit(_run_part, extractor, file_path, filename, part, channel, index)
+                    if relay:
+                        relay.part_done(index)
+                    return result
+
+                try:
+                    results = await asyncio.gather(*[run_part(index, part) for index, part in enumerate(parts)])
+                finally:
+                    if relay:
+                        await relay.stop()
+                return await merge(extractor.merge_parts, file_path, filename, list(results))
+
+        relay = None
+        if progress:
+            progress(0, 1, 'documents')
+            relay = _ProgressRelay(progress, extractor.part_unit, [None], await self._progress_queue(extractor))
+            relay.start()
+        try:
+            channel = relay.channel if relay else None
+            result = await submit(_run_extractor, extractor, file_path, filename, channel)
+        finally:
+            if relay:
+                await relay.stop()
+        if relay and relay.totals[0] is not None:
+            relay.part_done(0)
+        elif progress:
+            progress(1, 1, 'documents')
+        return result
+
+    async def _progress_queue(self, extractor):
+        """Queue for progress messages; None when the extractor does not report any."""
+        if not getattr(extractor, 'reports_progress', False):
+            return None
+        if getattr(extractor, 'execution_mode', 'process') == 'process' and self._process_pool is not None:
+            manager = await self.run_blocking(self._stream_manager)
+            return await self.run_blocking(manager.Queue)
+        return queue.Queue()
+
+    @staticmethod
+    def _tracked(submit: Callable, workers: List[asyncio.Future]) -> Callable:
+        """Wrap a submit function so its calls outlive a cancelled caller and are collected in `workers`."""
+        async def submit_tracked(func: Callable, *args) -> Any:
+            worker = asyncio.ensure_future(submit(func, *args))
+            workers.append(worker)
+            return await asyncio.shield(worker)
+        return submit_tracked
+
+    @staticmethod
+    def _profiled(submit: Callable, profile) -> Callable:
+        """Wrap a submit function so the call runs under run_profiled and its profile is collected."""
+        async def submit_profiled(func: Callable, *args) -> Any:
+            result, worker_profile = await submit(run_profiled, profile.options, func, *args)
+            profile.add(worker_profile)
+            return result
+        return submit_profiled
+
+    def _reserve(self):
+        if self._pending >= self.max_queue_depth:
+            raise ExecutorSaturatedError(self._pending, self.retry_after)
+        self._pending += 1
+
+    def _format_limit(self, mime_type: str) -> int:
+        return max(1, self.format_limits.get(mime_type, self.default_format_limit))
+
+    def _semaphore(self, mime_type: str) -> asyncio.Semaphore:
+        if mime_type not in self._semaphores:
+            self._semaphores[mime_type] = asyncio.Semaphore(self._format_limit(mime_type))
+        return self._semaphores[mime_type]
+
+    def _stream_manager(self):
+        """Manager process that serves the chunk and progress queues of worker processes."""
+        with self._manager_lock:
+            if self._manager is None:
+                self._manager = multiprocessing.get_context(self.mp_start_method).Manager()
+            return self._manager
+
+    def _create_process_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=multiprocessing.get_context(self.mp_start_method)
+        )
+
+    async def _submit_process(self, func: Callable, *args) -> Any:
+        # Without a process pool (EXTRACT_PROCESS_WORKERS=0) everything runs on threads
+        if self._process_pool is None:
+            return await self.run_blocking(func, *args)
+
+        loop = asyncio.get_running_loop()
+        pool = self._process_pool
+        try:
+            return await loop.run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            # Several in-flight tasks fail together; only the first one replaces the pool
+            if self._process_pool is pool:
+                logger.error("Extraction worker process died, recreating process pool")
+                self._process_pool = self._create_process_pool()
+                pool.shutdown(wait=False, cancel_futures=True)
+            raise Exception("Extraction worker process crashed")
+
+
+class ChunkStream:
+    """
+    Chunks of one streaming extraction, in document order, as they are produced.
+
+    Creating the stream takes a slot in the extraction queue (raising
+    ExecutorSaturatedError when it is full); aclose() stops the extractor,
+    which gives the slot back once its worker returns, and must always be
+    called. At most STREAM_QUEUE_CHUNKS
+    chunks wait between the worker and the consumer, so a slow client slows
+    the extraction down instead of buffering the document.
+    """
+
+    def __init__(self, executor: ExtractionExecutor, mime_type: str, extractor, file_path: str, filename: str):
+        executor._reserve()
+        self._executor = executor
+        self._semaphore = executor._semaphore(mime_type)
+        self._extractor = extractor
+        self._file_path = file_path
+        self._filename = filename
+        self._queue = None
+        self._cancelled = None
+        self._producer: Optional[asyncio.Future] = None
+        self._holding_semaphore = False
+        self._closed = False
+
+    def __aiter__(self) -> 'ChunkStream':
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        if self._closed:
+            raise StopAsyncIteration
+        if self._producer is None:
+            await self._start()
+
+        while True:
+            message = await asyncio.to_thread(self._get, 0.5)
+            if message is None and self._producer.done():
+                # The producer always sends a final message unless its worker died
+                message = self._get(0)
+                if message is None:
+                    await self.aclose()
+                    self._producer.result()
+                    raise Exception("Extraction stopped without finishing")
+            if message is None:
+                continue
+
+            kind, payload = message
+            if kind == 'chunk':
+                return payload
+            await self.aclose()
+            if kind == 'error':
+                raise Exception(payload)
+            raise StopAsyncIteration
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._cancelled is not None:
+            await asyncio.to_thread(self._cancelled.set)
+        # A worker still busy with the current chunk keeps its slot until it notices
+        if self._producer is None or self._producer.done():
+            self._release()
+        else:
+            self._producer.add_done_callback(lambda future: self._release())
+
+    def _release(self):
+        if self._holding_semaphore:
+            self._semaphore.release()
+            self._holding_semaphore = False
+        self._executor._pending -= 1
+
+    async def _start(self):
+        await self._semaphore.acquire()
+        self._holding_semaphore = True
+
+        executor = self._executor
+        size = max(1, config.STREAM_QUEUE_CHUNKS)
+        if getattr(self._extractor, 'execution_mode', 'process') == 'process' and executor._process_pool is not None:
+            manager = await executor.run_blocking(executor._stream_manager)
+            self._queue = await asyncio.to_thread(manager.Queue, size)
+            self._cancelled = await asyncio.to_thread(manager.Event)
+            submit = executor._submit_process
+        else:
+            self._queue = queue.Queue(size)
+            self._cancelled = threading.Event()
+            submit = executor.run_blocking
+
+        self._producer = asyncio.ensure_future(submit(
+            _stream_chunks, self._extractor, self._file_path, self._filename, self._queue, self._cancelled
+        ))
+        # Failures surface through the queue; don't warn about unretrieved exceptions
+        self._producer.add_done_callback(lambda future: future.cancelled() or future.exception())
+
+    def _get(self, timeout: float):
+        try:
+            return self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait()
+        except queue.Empty:
+            return None
@@ -0,0 +1,251 @@
+import codecs
+import logging
+import mmap
+import os
+import re
+import zipfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DOCX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+PPTX_MIME_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+EPUB_MIME_TYPE = 'application/epub+zip'
+
+# Extension fallback for content without a recognizable signature
+EXTENSION_MIME_TYPES = {
+    'pdf': 'application/pdf',
+    'docx': DOCX_MIME_TYPE,
+    'pptx': PPTX_MIME_TYPE,
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'htm': 'text/html',
+    'rtf': 'application/rtf',
+    'epub': EPUB_MIME_TYPE,
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'tiff': 'image/tiff',
+    'tif': 'image/tiff',
+    'bmp': 'image/bmp'
+}
+
+# Main document part content types declared in [Content_Types].xml
+OOXML_MAIN_PARTS = {
+    b'wordprocessingml.document.main+xml': DOCX_MIME_TYPE,
+    b'presentationml.presentation.main+xml': PPTX_MIME_TYPE,
+}
+
+# How far into the file the HTML markers and PDF header are looked for
+HTML_SNIFF_BYTES = 2000
+PDF_SNIFF_BYTES = 1024
+
+# Bytes examined to choose an encoding before the single full decode
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Bytes cp1252 leaves undefined; text containing them is decoded as latin-1
+CP1252_UNDEFINED = b'\x81\x8d\x8f\x90\x9d'
+
+# PDF header; readers accept it after a binary preamble (e.g. a MacBinary header)
+PDF_HEADER = re.compile(rb'%PDF-\d')
+
+# Control bytes that do not occur in text, marking a preamble as binary
+BINARY_BYTES = re.compile(rb'[\x00-\x08\x0e-\x1a\x1c-\x1f]')
+
+HTML_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+
+@contextmanager
+def mapped(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    The file memory-mapped read-only (b'' for an empty file).
+
+    Slicing copies only the slice, and str(data, encoding) decodes straight
+    from the page cache. Views must not outlive the block.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def zip_document_type(path: str) -> Optional[str]:
+    """
+    DOCX, PPTX or EPUB MIME type of a ZIP container from its central
+    directory and package metadata, without decompressing the documents.
+    `application/zip` for other ZIPs, None when the ZIP cannot be read.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+            if 'mimetype' in names:
+                with archive.open('mimetype') as f:
+                    if f.read(64).strip() == EPUB_MIME_TYPE.encode():
+                        return EPUB_MIME_TYPE
+            if 'META-INF/container.xml' in names:
+                return EPUB_MIME_TYPE
+            if '[Content_Types].xml' in names:
+                content_types = archive.read('[Content_Types].xml')
+                for marker, mime_type in OOXML_MAIN_PARTS.items():
+                    if marker in content_types:
+                        return mime_type
+            return 'application/zip'
+    except (zipfile.BadZipFile, OSError, KeyError) as e:
+        logger.warning(f"Could not inspect ZIP container {path}: {e}")
+        return None
+
+
+def is_pdf_header(file_content: bytes) -> bool:
+    """
+    Whether the file starts with a PDF header, allowing leading whitespace
+    or a binary preamble within PDF_SNIFF_BYTES, but not text mentioning it.
+    """
+    match = PDF_HEADER.search(file_content, 0, PDF_SNIFF_BYTES)
+    if match is None:
+        return False
+    preamble = file_content[:match.start()]
+    return not preamble.strip() or BINARY_BYTES.search(preamble) is not None
+
+
+def detect_mime_type(file_content: bytes, filename: str, path: Optional[str] = None) -> str:
+    """
+    MIME type from the leading bytes of a file, then its extension.
+
+    ZIP containers are identified from their contents when `path` is given;
+    a readable ZIP that is not DOCX/PPTX/EPUB is `application/zip` whatever
+    its name.
+    """
+    try:
+        # Magic number detection with enhanced patterns
+        if is_pdf_header(file_content):
+            return 'application/pdf'
+        elif file_content[:2] == b'PK':  # ZIP-based formats
+            mime_type = zip_document_type(path) if path is not None else None
+            if mime_type is not None:
+                return mime_type
+        elif file_content[:3] == b'\xff\xd8\xff':
+            return 'image/jpeg'
+        elif file_content[:8] == b'\x89PNG\r\n\x1a\n':
+            return 'image/png'
+        elif file_content[:2] == b'BM':
+            return 'image/bmp'
+        elif file_content[:4] in [b'II*\x00', b'MM\x00*']:
+            return 'image/tiff'
+        elif file_content[:5] == b'{\\rtf':
+            return 'application/rtf'
+        else:
+            prefix = file_content[:HTML_SNIFF_BYTES].lower()
+            if b'<html' in prefix or b'<!doctype' in prefix:
+                return 'text/html'
+
+        # Enhanced extension fallback
+        ext = filename.lower().rsplit('.', 1)[-1] if '.' in filename else ''
+        return EXTENSION_MIME_TYPES.get(ext, 'application/octet-stream')
+    except Exception as e:
+        logger.warning(f"MIME detection error: {e}")
+        return 'application/octet-stream'
+
+
+def detect_encoding(sample: bytes, complete: bool = False) -> str:
+    """
+    Encoding of text from a sample of its first bytes: a BOM, else UTF-8 if
+    the sample is valid UTF-8 (a sequence cut at the end is fine unless
+    `complete`), else cp1252, or latin-1 for bytes cp1252 does not define.
+    """
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if any(byte in sample for byte in CP1252_UNDEFINED):
+        return 'latin-1'
+    return 'cp1252'
+
+
+def html_charset(sample: bytes) -> Optional[str]:
+    """Encoding declared by a <meta charset> in an HTML prefix, if Python knows it."""
+    match = HTML_CHARSET.search(sample[:4096])
+    if not match:
+        return None
+    try:
+        return codecs.lookup(match.group(1).decode('ascii')).name
+    except (LookupError, UnicodeDecodeError):
+        return None
+
+
+def _choose_encoding(data, declared_encoding: Optional[Callable[[bytes], Optional[str]]]) -> str:
+    sample = data[:ENCODING_SAMPLE_BYTES]
+    return (declared_encoding and declared_encoding(sample)) or detect_encoding(
+        sample, complete=len(data) <= ENCODING_SAMPLE_BYTES
+    )
+
+
+def read_text(
+    path: str,
+    declared_encoding: Optional[Callable[[bytes], Optional[str]]] = None
+) -> Tuple[str, str]:
+    """
+    Decode a text file with one pass over a memory map. Returns the text,
+    with newlines normalized to '\\n', and the encoding used.
+
+    The encoding is the one `declared_encoding(sample)` finds (e.g.
+    html_charset), else detected from the first ENCODING_SAMPLE_BYTES. If
+    the rest of the file turns out not to match, it is decoded again as
+    cp1252, then latin-1, which cannot fail.
+    """
+    with mapped(path) as data:
+        encoding = _choose_encoding(data, declared_encoding)
+        for candidate in dict.fromkeys((encoding, 'cp1252', 'latin-1')):
+            try:
+                text = str(data, candidate)
+                encoding = candidate
+                break
+            except UnicodeDecodeError:
+                logger.info(f"Text is not valid {candidate} past the sampled prefix, decoding again")
+
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, encoding
+
+
+def file_encoding(
+    path: str,
+    declared_encoding: Optional[Callable[[bytes], Optional[str]]] = None
+) -> str:
+    """The encoding read_text would try first, from the first ENCODING_SAMPLE_BYTES of a file."""
+    with open(path, 'rb') as f:
+        sample = f.read(ENCODING_SAMPLE_BYTES + 1)
+    return (declared_encoding and declared_encoding(sample[:ENCODING_SAMPLE_BYTES])) or detect_encoding(
+        sample[:ENCODING_SAMPLE_BYTES], complete=len(sample) <= ENCODING_SAMPLE_BYTES
+    )
+
+
+def iter_text(path: str, encoding: str, chunk_bytes: int = ENCODING_SAMPLE_BYTES) -> Iterator[str]:
+    """
+    A text file decoded incrementally, `chunk_bytes` at a time, for parsers
+    that consume text as a stream (see file_encoding). Unlike read_text,
+    bytes that do not fit the encoding are replaced rather than decoded again.
+    """
+    with mapped(path) as data:
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        for offset in range(0, len(data), chunk_bytes):
+            text = decoder.decode(data[offset:offset + chunk_bytes])
+            if text:
+                yield text
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text
@@ -0,0 +1,379 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import config
+from .upload import SpooledUpload
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# processor(upload, start_time, progress) -> /extract response
+JobProcessor = Callable[[SpooledUpload, float, Callable[[int, int, str], None]], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """
+    SQLite-backed job queue. Blocking and thread-safe; call from the thread pool.
+
+    Several processes may share the file: claims are a single UPDATE, and
+    running jobs carry their owner and a heartbeat, so only jobs whose owner
+    stopped heartbeating are requeued.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, filename TEXT NOT NULL, status TEXT NOT NULL,"
+            " spool_path TEXT, file_size INTEGER, sha256 TEXT, head BLOB,"
+            " progress_done INTEGER DEFAULT 0, progress_total INTEGER DEFAULT 0, progress_unit TEXT,"
+            " result BLOB, error TEXT, cancel_requested INTEGER DEFAULT 0,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL,"
+            " owner TEXT, heartbeat_at REAL)"
+        )
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (('owner', 'TEXT'), ('heartbeat_at', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def add(self, job_id: str, upload: SpooledUpload):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, filename, status, spool_path, file_size, sha256, head, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, upload.filename, QUEUED, upload.path, upload.size, upload.sha256, upload.head, time.time())
+            )
+
+    def claim_next(self, owner: str) -> Optional[sqlite3.Row]:
+        """Mark the oldest queued job as running for `owner` and return it, atomically across processes."""
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, owner = ?, heartbeat_at = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1) AND status = ?"
+                " RETURNING *",
+                (RUNNING, now, owner, now, QUEUED, QUEUED)
+            ).fetchone()
+
+    def heartbeat(self, owner: str) -> List[str]:
+        """Renew the lease of the jobs `owner` is running; returns those flagged for cancellation."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?", (time.time(), owner, RUNNING)
+            )
+            return [row['id'] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE owner = ? AND status = ? AND cancel_requested = 1", (owner, RUNNING)
+            )]
+
+    def requeue_stale(self, lease_seconds: float) -> int:
+        """Running jobs whose owner has not heartbeaten within the lease go back to the queue."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress_done = 0, owner = NULL"
+                " WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (QUEUED, RUNNING, time.time() - lease_seconds)
+            ).rowcount
+
+    def release(self, owner: str) -> int:
+        """Put the jobs `owner` is running back in the queue."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress_done = 0, owner = NULL"
+                " WHERE status = ? AND owner = ?",
+                (QUEUED, RUNNING, owner)
+            ).rowcount
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def update_progress(self, job_id: str, owner: str, done: int, total: int, unit: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress_done = ?, progress_total = ?, progress_unit = ?"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (done, total, unit, job_id, owner, RUNNING)
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job right away, flag a running one. Returns the new status."""
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row['status'] == QUEUED:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, cancel_requested = 1 WHERE id = ?",
+                    (CANCELLED, time.time(), job_id)
+                )
+                return CANCELLED
+            if row['status'] == RUNNING:
+                self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            return row['status']
+
+    def finish(
+        self,
+        job_id: str,
+        owner: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        """Record the outcome of a job `owner` is running. False if it was requeued for someone else."""
+        blob = zlib.compress(json.dumps(result, ensure_ascii=False).encode('utf-8'), 1) if result is not None else None
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?"
+                " WHERE id = ? AND owner = ? AND status = ?",
+                (status, blob, error, time.time(), job_id, owner, RUNNING)
+            ).rowcount > 0
+
+    def expired(self, retention_seconds: int):
+        """Finished jobs older than the retention period."""
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, spool_path FROM jobs WHERE status IN ({','.join('?' * len(FINISHED_STATES))})"
+                " AND finished_at < ?",
+                (*FINISHED_STATES, time.time() - retention_seconds)
+            ).fetchall()
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                row['status']: row['n']
+                for row in self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Asynchronous extraction jobs backed by a local SQLite queue.
+
+    Uploads are moved into JOBS_DIR and processed by `workers` background
+    tasks regardless of whether the submitting client is still connected.
+    Running jobs are heartbeaten every quarter of `lease_seconds`; jobs of a
+    process that stopped heartbeating (crashed, killed) are requeued by any
+    manager sharing JOBS_DIR, and a clean shutdown requeues its own right
+    away.
+    """
+
+    def __init__(
+        self,
+        processor: JobProcessor,
+        jobs_dir: str = config.JOBS_DIR,
+        workers: int = config.JOBS_WORKERS,
+        retention_seconds: int = config.JOBS_RETENTION_SECONDS,
+        lease_seconds: float = config.JOBS_LEASE_SECONDS,
+    ):
+        self.processor = processor
+        self.jobs_dir = jobs_dir
+        self.workers = max(1, workers)
+        self.retention_seconds = retention_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._store: Optional[JobStore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+        self._running: Dict[str, asyncio.Task] = {}
+
+    async def start(self):
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._store = await asyncio.to_thread(JobStore, os.path.join(self.jobs_dir, "jobs.db"))
+        requeued = await asyncio.to_thread(self._store.requeue_stale, self.lease_seconds)
+        if requeued:
+            logger.info(f"[JOBS] Requeued {requeued} interrupted jobs")
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._janitor()))
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+        logger.info(f"[JOBS] Started {self.workers} job workers in {self.jobs_dir}")
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._store is not None:
+            # Interrupted jobs go back to the queue for whichever process runs next
+            released = await asyncio.to_thread(self._store.release, self.owner)
+            if released:
+                logger.info(f"[JOBS] Requeued {released} running jobs on shutdown")
+            self._store.close()
+            self._store = None
+
+    async def submit(self, upload: SpooledUpload) -> str:
+        """Queue a spooled upload; the job takes ownership of the spool file."""
+        job_id = uuid.uuid4().hex
+        job_path = os.path.join(self.jobs_dir, f"{job_id}_{os.path.basename(upload.filename)}")
+        await asyncio.to_thread(shutil.move, upload.path, job_path)
+        upload.path = job_path
+        await asyncio.to_thread(self._store.add, job_id, upload)
+        self._wakeup.set()
+        logger.info(f"[JOBS] Queued job {job_id} for {upload.filename}")
+        return job_id
+
+    async def get(self, job_id: str, include_result: bool = True) -> Optional[Dict[str, Any]]:
+        row = await asyncio.to_thread(self._store.get, job_id)
+        if row is None:
+            return None
+        job = {
+            'job_id': row['id'],
+            'filename': row['filename'],
+            'status': row['status'],
+            'progress': {
+                'done': row['progress_done'],
+                'total': row['progress_total'],
+                'unit': row['progress_unit'],
+            },
+            'file_size': row['file_size'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'error': row['error'],
+        }
+        if include_result and row['result'] is not None:
+            job['result'] = json.loads(zlib.decompress(row['result']).decode('utf-8'))
+        return job
+
+    async def cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a job. Returns its status afterwards, or None if unknown."""
+        status = await asyncio.to_thread(self._store.request_cancel, job_id)
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+        return status
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'running': len(self._running),
+            'counts': self._store.counts() if self._store else {},
+        }
+
+    async def _worker(self):
+        while True:
+            row = await asyncio.to_thread(self._store.claim_next, self.owner)
+            if row is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._run(row))
+            self._running[row['id']] = task
+            try:
+                await asyncio.shield(task)
+            except asyncio.CancelledError:
+                if not task.done():
+                    # The worker itself is shutting down
+                    task.cancel()
+                    raise
+            finally:
+                self._running.pop(row['id'], None)
+
+    async def _run(self, row: sqlite3.Row):
+        job_id = row['id']
+        upload = SpooledUpload(row['spool_path'], row['filename'], row['file_size'], row['sha256'], row['head'])
+        start_time = time.time()
+        latest = None
+        writer: Optional[asyncio.Task] = None
+
+        async def write_progress():
+            # One write in flight at a time; reports arriving meanwhile collapse into the newest
+            nonlocal latest
+            while latest is not None:
+                values, latest = latest, None
+                await asyncio.to_thread(self._store.update_progress, job_id, self.owner, *values)
+
+        def progress(done: int, total: int, unit: str):
+            nonlocal latest, writer
+            latest = (done, total, unit)
+            if writer is None or writer.done():
+                writer = asyncio.create_task(write_progress())
+
+        logger.info(f"[JOBS] Running job {job_id} ({row['filename']})")
+        try:
+            if row['cancel_requested']:
+                raise asyncio.CancelledError()
+            result = await self.processor(upload, start_time, progress)
+            if writer is not None:
+                await writer
+            if await asyncio.to_thread(self._store.finish, job_id, self.owner, SUCCEEDED, result):
+                logger.info(f"[JOBS] Job {job_id} succeeded in {time.time() - start_time:.2f}s")
+            else:
+                # Our lease lapsed and the job was requeued; its new run owns the file
+                logger.warning(f"[JOBS] Job {job_id} finished after it was requeued, result dropped")
+                return
+        except asyncio.CancelledError:
+            current = await asyncio.to_thread(self._store.get, job_id)
+            if current is not None and current['cancel_requested']:
+                await asyncio.to_thread(self._store.finish, job_id, self.owner, CANCELLED)
+                logger.info(f"[JOBS] Job {job_id} cancelled")
+            else:
+                raise
+        except Exception as e:
+            detail = getattr(e, 'detail', None) or str(e)
+            if not await asyncio.to_thread(self._store.finish, job_id, self.owner, FAILED, None, str(detail)):
+                return
+            logger.error(f"[JOBS] Job {job_id} failed: {detail}")
+        upload.cleanup()
+
+    async def _heartbeat(self):
+        """Renew the leases of running jobs, stop those cancelled elsewhere, requeue stale ones."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 4)
+            try:
+                for job_id in await asyncio.to_thread(self._store.heartbeat, self.owner):
+                    task = self._running.get(job_id)
+                    if task is not None:
+                        task.cancel()
+                requeued = await asyncio.to_thread(self._store.requeue_stale, self.lease_seconds)
+                if requeued:
+                    logger.info(f"[JOBS] Requeued {requeued} jobs of stopped workers")
+                    self._wakeup.set()
+            except Exception as e:
+                logger.warning(f"[JOBS] Heartbeat failed: {e}")
+
+    async def _janitor(self):
+        """Drop finished jobs (and their files) after the retention period."""
+        while True:
+            try:
+                for row in await asyncio.to_thread(self._store.expired, self.retention_seconds):
+                    if row['spool_path'] and os.path.exists(row['spool_path']):
+                        os.unlink(row['spool_path'])
+                    await asyncio.to_thread(self._store.delete, row['id'])
+            except Exception as e:
+                logger.warning(f"[JOBS] Cleanup failed: {e}")
+            await asyncio.sleep(600)
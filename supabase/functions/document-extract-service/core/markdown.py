@@ -0,0 +1,144 @@
+import re
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+# Keywords are matched as substrings of the lowercased line
+HEADER_KEYWORDS = re.compile(
+    'capítulo|seção|item|artigo|anexo|apêndice|introdução|conclusão|resumo|abstract|título'
+)
+CHAPTER_KEYWORDS = re.compile('capítulo|chapter')
+SECTION_KEYWORDS = re.compile('seção|section')
+
+BULLETS = ('•', '-', '*', '◦', '▪', '▫')
+BULLET_STRIP = '•-*◦▪▫ '
+
+# EPUB chapter markers (see EpubExtractor._chapter_text), markdown already
+CHAPTER_MARKER = re.compile(r'## (\S+\.x?html?)$')
+
+# Lines this long or longer are never headers
+MAX_HEADER_LENGTH = 150
+
+# Numbered sections have at most this many words
+MAX_NUMBERED_HEADER_WORDS = 8
+
+
+def document_title(filename: str) -> str:
+    title = filename.replace('_', ' ').replace('-', ' ')
+    if '.' in title:
+        title = title.rsplit('.', 1)[0]
+    return title
+
+
+def _after(text: str, separator: str) -> str:
+    """Text after the first separator, or all of it (same as text.split(separator, 1)[-1])."""
+    index = text.find(separator)
+    return text if index < 0 else text[index + 1:]
+
+
+def convert_line(line: str) -> str:
+    """Markdown for one line of extracted text."""
+    line = line.strip()
+    if not line:
+        return ""
+
+    # Table rows (e.g. PDF tables) and chapter markers are markdown already;
+    # the header and list rules would rewrite names like "01-capitulo.xhtml"
+    if line.startswith('|') or CHAPTER_MARKER.match(line):
+        return line
+
+    # Headers: short lines that are upper case, end with a colon, contain a
+    # section keyword or look like a numbered section
+    if len(line) < MAX_HEADER_LENGTH:
+        lowered = line.lower()
+        if (
+            line.isupper()
+            or line.endswith(':')
+            or HEADER_KEYWORDS.search(lowered)
+            or (
+                any(map(str.isdigit, line[:5]))
+                and len(line.split(None, MAX_NUMBERED_HEADER_WORDS)) <= MAX_NUMBERED_HEADER_WORDS
+            )
+        ):
+            if CHAPTER_KEYWORDS.search(lowered):
+                return f"# {line}"
+            if SECTION_KEYWORDS.search(lowered):
+                return f"## {line}"
+            return f"### {line}"
+
+    first = line[0]
+    if first.isdigit():
+        if (len(line) > 2 and line[1] in '.)') or (len(line) > 3 and line[2] in '.)' and line[1].isdigit()):
+            # Numbered list
+            number = ''.join(filter(str.isdigit, line.split(None, 1)[0]))
+            content = _after(_after(line, ')'), '.').strip()
+            return f"{number}. {content}"
+    elif line.startswith(BULLETS):
+        return f"- {line.lstrip(BULLET_STRIP)}"
+
+    # Regular paragraph
+    return line
+
+
+class MarkdownConverter:
+    """
+    Incremental text-to-markdown conversion.
+
+    feed() takes consecutive pieces of the text (for instance one page at a
+    time) and returns the markdown lines completed so far; close() returns
+    the rest. Joined with '\\n', the lines equal convert_to_markdown() of the
+    whole text, including the empty result for blank input.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._partial = ""
+        self._started = False
+        self._blank_lines = 0
+
+    def feed(self, text: str) -> List[str]:
+        if not text:
+            return []
+        text = self._partial + text
+        end = text.rfind('\n')
+        if end < 0:
+            self._partial = text
+            return []
+        self._partial = text[end + 1:]
+        return list(self._convert(text[:end]))
+
+    def close(self) -> List[str]:
+        text, self._partial = self._partial, ""
+        return list(self._convert(text))
+
+    def _convert(self, text: str) -> Iterator[str]:
+        lines = text.split('\n')
+        index = 0
+        if not self._started:
+            # Nothing is emitted until the text turns out not to be blank
+            for index, line in enumerate(lines, 1):
+                converted = convert_line(line)
+                if converted:
+                    self._started = True
+                    yield f"# {document_title(self.filename)}\n"
+                    for _ in range(self._blank_lines):
+                        yield ""
+                    yield converted
+                    break
+                self._blank_lines += 1
+            else:
+                return
+
+        yield from map(convert_line, islice(lines, index, None))
+
+
+def iter_markdown(chunks: Iterable[str], filename: str) -> Iterator[str]:
+    """Markdown lines for text arriving in chunks."""
+    converter = MarkdownConverter(filename)
+    for chunk in chunks:
+        yield from converter.feed(chunk)
+    yield from converter.close()
+
+
+def convert_to_markdown(text: str, filename: str) -> str:
+    """Enhanced markdown conversion with better structure preservation."""
+    return '\n'.join(iter_markdown((text,), filename))
@@ -0,0 +1,252 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; extraction ranges from milliseconds (text) to minutes (OCR)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+PAGES_PER_SECOND_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def expose(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """
+    Values read from a callback at scrape time, as {label values: value}.
+
+    `kind='counter'` exposes totals kept elsewhere (e.g. cache hit counts).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+                 kind: str = 'gauge'):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def _samples(self) -> List[str]:
+        try:
+            values = self.callback() if self.callback else {}
+        except Exception:
+            return []
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in sorted(values.items())
+            if value is not None
+        ]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total[0]) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of this process, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback=None, kind: str = 'gauge') -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback, kind))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimings:
+    """
+    Wall-clock time per processing stage of one document.
+
+    Stages are measured with `with timings.stage('markdown'): ...`, or added
+    directly when they were measured elsewhere (e.g. while spooling).
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def rounded(self) -> Dict[str, float]:
+        """Timings for response metadata, in seconds."""
+        return {name: round(seconds, 4) for name, seconds in self.timings.items()}
+
+
+# Metrics of the extraction service. Each process (uvicorn worker) keeps its own.
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'document_extract_stage_seconds',
+    'Time spent in each processing stage of a document.',
+    ('stage', 'mime_type')
+)
+DOCUMENTS = REGISTRY.counter(
+    'document_extract_documents_total',
+    'Documents processed, by outcome (success, cache_hit, error, rejected, unsupported).',
+    ('mime_type', 'outcome')
+)
+BYTES = REGISTRY.counter(
+    'document_extract_bytes_total',
+    'Bytes of uploaded documents processed.',
+    ('mime_type',)
+)
+PAGES = REGISTRY.counter(
+    'document_extract_pages_total',
+    'Pages extracted from paginated documents.',
+    ('mime_type',)
+)
+PAGES_PER_SECOND = REGISTRY.histogram(
+    'document_extract_pages_per_second',
+    'Extraction throughput of paginated documents.',
+    ('mime_type',),
+    buckets=PAGES_PER_SECOND_BUCKETS
+)
+OCR_DOCUMENTS = REGISTRY.counter(
+    'document_extract_ocr_documents_total',
+    'Documents whose text came at least partly from OCR.',
+    ('mime_type',)
+)
+OCR_PAGES = REGISTRY.counter(
+    'document_extract_ocr_pages_total',
+    'Pages that needed OCR.',
+    ('mime_type',)
+)
+
+
+def record_document(
+    mime_type: str,
+    outcome: str,
+    timings: Optional[StageTimings] = None,
+    size: int = 0,
+    pages: int = 0,
+    ocr_used: bool = False,
+    ocr_pages: int = 0,
+):
+    """Count one processed document and observe its stage timings."""
+    DOCUMENTS.inc(mime_type=mime_type, outcome=outcome)
+    if timings is not None:
+        for stage, seconds in timings.timings.items():
+            STAGE_SECONDS.observe(seconds, stage=stage, mime_type=mime_type)
+    if outcome != 'success':
+        return
+
+    BYTES.inc(size, mime_type=mime_type)
+    if pages:
+        PAGES.inc(pages, mime_type=mime_type)
+        extract_seconds = timings.timings.get('extract') if timings is not None else None
+        if extract_seconds:
+            PAGES_PER_SECOND.observe(pages / extract_seconds, mime_type=mime_type)
+    if ocr_used:
+        OCR_DOCUMENTS.inc(mime_type=mime_type)
+    if ocr_pages:
+        OCR_PAGES.inc(ocr_pages, mime_type=mime_type)
@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from extractors.similarity_calculator import SimilarityCalculator
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Shingles are hashed in blocks of this many rows against all permutations
+HASH_BLOCK_SHINGLES = 4096
+
+# Seed of the permutations; changing it invalidates stored signatures
+PERMUTATION_SEED = 1
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles of normalized text.
+
+    Words are hashed once (CRC32) and combined into shingle hashes, and
+    each permutation is a multiply-shift hash of those, so a signature
+    costs one vectorized pass over the shingles.
+    """
+
+    def __init__(self, num_perm: int, shingle_words: int):
+        self.num_perm = num_perm
+        self.shingle_words = max(1, shingle_words)
+        rng = np.random.default_rng(PERMUTATION_SEED)
+        # Odd multipliers keep the multiply-shift family universal
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self._word_weights = rng.integers(1, 2 ** 63, size=self.shingle_words, dtype=np.uint64) | np.uint64(1)
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """64-bit hashes of the word shingles of the text, repeats included."""
+        words = SimilarityCalculator.normalize_text(text).split()
+        if not words:
+            return np.zeros(0, dtype=np.uint64)
+        word_hashes = np.fromiter(
+            (zlib.crc32(word.encode('utf-8')) for word in words), dtype=np.uint64, count=len(words)
+        )
+        k = min(self.shingle_words, len(words))
+        count = len(words) - k + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for offset in range(k):
+            shingles += word_hashes[offset:offset + count] * self._word_weights[offset]
+        return shingles
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Signature of num_perm 32-bit minimums, or None for text without words."""
+        shingles = self.shingle_hashes(text)
+        if not len(shingles):
+            return None
+        minimums = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(shingles), HASH_BLOCK_SHINGLES):
+            hashes = shingles[start:start + HASH_BLOCK_SHINGLES, None] * self._a
+            hashes += self._b
+            np.minimum(minimums, hashes.min(axis=0), out=minimums)
+        # The high bits of the smallest hash are the smallest high bits
+        return (minimums >> np.uint64(32)).astype(np.uint32)
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash LSH index of extracted documents.
+
+    Signatures are cut into `bands` bands of `rows` rows; documents sharing
+    a band are candidates, so a lookup touches the band index rather than
+    the corpus and only candidates are compared. Candidates whose estimated
+    Jaccard similarity reaches `threshold` are reported, most similar first.
+    The index is a SQLite file shared by all workers pointing at it.
+    Methods are thread-safe and blocking, so call them from the thread pool.
+    """
+
+    def __init__(
+        self,
+        path: str = config.NEAR_DUPLICATE_INDEX_PATH,
+        bands: int = config.NEAR_DUPLICATE_BANDS,
+        rows: int = config.NEAR_DUPLICATE_ROWS,
+        shingle_words: int = config.NEAR_DUPLICATE_SHINGLE_WORDS,
+        threshold: float = config.NEAR_DUPLICATE_THRESHOLD,
+        max_results: int = config.NEAR_DUPLICATE_MAX_RESULTS,
+    ):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.max_results = max_results
+        self.hasher = MinHasher(bands * rows, shingle_words)
+        self.lookups = 0
+        self.matches = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        if path:
+            try:
+                self._conn = self._open(path, shingle_words)
+                logger.info(f"Near-duplicate index at {path} ({bands}x{rows} bands)")
+            except Exception as e:
+                logger.warning(f"Near-duplicate index disabled: {e}")
+
+    def _open(self, path: str, shingle_words: int) -> sqlite3.Connection:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY, sha256 TEXT UNIQUE NOT NULL, filename TEXT NOT NULL,"
+            " signature BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bands ("
+            " band INTEGER NOT NULL, hash INTEGER NOT NULL, document INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, hash)")
+
+        # Signatures only compare under the same hashing settings
+        layout = f"{self.bands}x{self.rows}:{shingle_words}:{PERMUTATION_SEED}"
+        row = conn.execute("SELECT value FROM settings WHERE name = 'layout'").fetchone()
+        if row is not None and row[0] != layout:
+            raise ValueError(f"index was built with layout {row[0]}, configured {layout}")
+        conn.execute("INSERT OR IGNORE INTO settings (name, value) VALUES ('layout', ?)", (layout,))
+        return conn
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def _band_hashes(self, signature: np.ndarray) -> List[int]:
+        hashes = []
+        for band in signature.reshape(self.bands, self.rows):
+            digest = hashlib.blake2b(band.tobytes(), digest_size=8).digest()
+            hashes.append(int.from_bytes(digest, 'big', signed=True))
+        return hashes
+
+    def check(self, sha256: str, filename: str, text: str) -> List[Dict[str, Any]]:
+        """
+        Near duplicates of a document among those indexed before it, then
+        index it. Each match has sha256, filename and the estimated Jaccard
+        similarity of the shingle sets.
+        """
+        if self._conn is None:
+            return []
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return []
+        band_hashes = self._band_hashes(signature)
+
+        with self._lock:
+            self.lookups += 1
+            candidates = set()
+            for band, band_hash in enumerate(band_hashes):
+                candidates.update(row[0] for row in self._conn.execute(
+                    "SELECT document FROM bands WHERE band = ? AND hash = ?", (band, band_hash)
+                ))
+
+            matches = []
+            for document in candidates:
+                row = self._conn.execute(
+                    "SELECT sha256, filename, signature FROM documents WHERE id = ?", (document,)
+                ).fetchone()
+                if row is None or row[0] == sha256:
+                    continue
+                similarity = estimated_jaccard(signature, np.frombuffer(row[2], dtype=np.uint32))
+                if similarity >= self.threshold:
+                    matches.append({'sha256': row[0], 'filename': row[1], 'similarity': round(similarity, 4)})
+            matches.sort(key=lambda match: -match['similarity'])
+            if matches:
+                self.matches += 1
+
+            self._add(sha256, filename, signature, band_hashes)
+        return matches[:self.max_results]
+
+    def _add(self, sha256: str, filename: str, signature: np.ndarray, band_hashes: List[int]):
+        # Another worker may index the same document concurrently; the first insert wins
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO documents (sha256, filename, signature, created_at) VALUES (?, ?, ?, ?)",
+                (sha256, filename, signature.tobytes(), time.time())
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute("COMMIT")
+                return
+            document = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO bands (band, hash, document) VALUES (?, ?, ?)",
+                [(band, band_hash, document) for band, band_hash in enumerate(band_hashes)]
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        if self._conn is None:
+            return {'enabled': False}
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {
+            'enabled': True,
+            'documents': documents,
+            'bands': self.bands,
+            'rows': self.rows,
+            'threshold': self.threshold,
+            'lookups': self.lookups,
+            'matches': self.matches
+        }
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
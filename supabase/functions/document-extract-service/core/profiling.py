@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Header that asks for a profile of one /extract request (needs PROFILE_HEADER_ENABLED)
+PROFILE_HEADER = 'x-profile'
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread at a fixed interval.
+
+    Stacks are counted in the collapsed format used by flamegraph.pl,
+    speedscope and inferno: `root;caller;callee` -> number of samples.
+    Frames from `root_code` outwards (the worker machinery) are left out.
+    """
+
+    def __init__(self, thread_id: int, interval: float, root_code=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks: Counter = Counter()
+        self._names: Dict[Any, str] = {}
+        self._prefixes = sorted({os.getcwd(), *filter(None, sys.path)}, key=len, reverse=True)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None and frame.f_code is not self.root_code:
+                frames.append(self._name(frame.f_code))
+                frame = frame.f_back
+            if frames:
+                self.stacks[';'.join(reversed(frames))] += 1
+
+    def _name(self, code) -> str:
+        name = self._names.get(code)
+        if name is None:
+            # ';' separates frames in the collapsed format
+            filename = code.co_filename.replace(';', '_')
+            for prefix in self._prefixes:
+                if filename.startswith(prefix + os.sep):
+                    filename = filename[len(prefix) + 1:]
+                    break
+            name = self._names[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return name
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc(top: int) -> Tuple[Dict[str, list], int]:
+    """{location: [bytes, blocks]} of the largest allocation sites still alive, and the peak."""
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+    allocations = {}
+    for stat in snapshot.statistics('lineno')[:top]:
+        frame = stat.traceback[0]
+        allocations[f"{frame.filename}:{frame.lineno}"] = [stat.size, stat.count]
+    return allocations, peak
+
+
+def run_profiled(options: Dict[str, Any], func: Callable, *args) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Call func(*args) under the stack sampler (and tracemalloc if
+    options['memory']) and return its result with the profile. Runs inside
+    the extraction workers. Exceptions from func propagate without a profile.
+
+    tracemalloc is process-wide, so in thread workers the allocations of
+    concurrent extractions are included.
+    """
+    sampler = StackSampler(threading.get_ident(), options['interval'], run_profiled.__code__)
+    if options['memory']:
+        _start_tracemalloc()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        result = func(*args)
+    finally:
+        sampler.stop()
+        elapsed = time.perf_counter() - started
+        allocations, peak = _stop_tracemalloc(options['top']) if options['memory'] else ({}, None)
+
+    profile = {
+        'stacks': sampler.stacks,
+        'allocations': allocations,
+        'peak_bytes': peak,
+        'seconds': elapsed,
+        'pid': os.getpid(),
+    }
+    return result, profile
+
+
+class ProfileSession:
+    """
+    The profiles of one request's extraction, merged across fanned-out parts.
+
+    `reason` is why it is profiled: 'header', 'sampled' or 'slow' (sampled
+    on every request, kept only above PROFILE_SLOW_SECONDS).
+    """
+
+    def __init__(self, reason: str, memory: bool):
+        self.reason = reason
+        self.options = {
+            'interval': max(0.001, config.PROFILE_INTERVAL_MS / 1000),
+            'memory': memory,
+            'top': config.PROFILE_TOP_ALLOCATIONS,
+        }
+        self.stacks: Counter = Counter()
+        self.allocations: Dict[str, list] = {}
+        self.peak_bytes: Optional[int] = None
+        self.calls = 0
+        self.worker_seconds = 0.0
+
+    def add(self, profile: Dict[str, Any]):
+        self.calls += 1
+        self.worker_seconds += profile['seconds']
+        self.stacks.update(profile['stacks'])
+        for location, (size, count) in profile['allocations'].items():
+            totals = self.allocations.setdefault(location, [0, 0])
+            totals[0] += size
+            totals[1] += count
+        if profile['peak_bytes'] is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, profile['peak_bytes'])
+
+    def write(self, name: str, details: Dict[str, Any], directory: str = config.PROFILE_DIR) -> Dict[str, Any]:
+        """
+        Write `<name>.collapsed` (flamegraph input), `<name>.alloc.txt` when
+        memory was traced, and `<name>.json` with the summary, which is returned.
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, name)
+        summary = {
+            'reason': self.reason,
+            'samples': sum(self.stacks.values()),
+            'interval_ms': self.options['interval'] * 1000,
+            'worker_calls': self.calls,
+            'worker_seconds': round(self.worker_seconds, 4),
+            'peak_traced_bytes': self.peak_bytes,
+            'created': datetime.utcnow().isoformat(),
+            **details,
+            'files': {'stacks': base + '.collapsed'},
+        }
+
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        if self.options['memory']:
+            summary['files']['allocations'] = base + '.alloc.txt'
+            with open(base + '.alloc.txt', 'w') as f:
+                f.write(f"Peak traced memory: {self.peak_bytes or 0} bytes\n")
+                f.write("Largest allocation sites still alive at the end of each worker call:\n\n")
+                ranked = sorted(self.allocations.items(), key=lambda item: item[1][0], reverse=True)
+                for location, (size, count) in ranked[:self.options['top']]:
+                    f.write(f"{size:>14} B {count:>10} blocks  {location}\n")
+
+        with open(base + '.json', 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"[PROFILE] Wrote {summary['samples']} samples ({self.reason}) to {base}.*")
+        return summary
+
+
+def start_session(header_value: Optional[str] = None) -> Optional[ProfileSession]:
+    """
+    The profile session for a request, if any: asked for with the header,
+    picked by PROFILE_SAMPLE_RATE, or a memory-less one for slow-request
+    capture when PROFILE_SLOW_SECONDS is set.
+    """
+    if config.PROFILE_HEADER_ENABLED and header_value and header_value.strip().lower() in ('1', 'true', 'yes', 'on'):
+        return ProfileSession('header', config.PROFILE_MEMORY)
+    if config.PROFILE_SAMPLE_RATE > 0 and random.random() < config.PROFILE_SAMPLE_RATE:
+        return ProfileSession('sampled', config.PROFILE_MEMORY)
+    if config.PROFILE_SLOW_SECONDS > 0:
+        return ProfileSession('slow', memory=False)
+    return None
+
+
+def should_keep(session: ProfileSession, extract_seconds: float) -> bool:
+    return session.reason != 'slow' or extract_seconds >= config.PROFILE_SLOW_SECONDS
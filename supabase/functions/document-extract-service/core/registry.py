@@ -0,0 +1,189 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Built-in extractors as `module:Class`, imported on first use
+DEFAULT_EXTRACTORS = {
+    'application/pdf': 'extractors.pdf_extractor:PDFExtractor',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'extractors.docx_extractor:DOCXExtractor',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'extractors.pptx_extractor:PPTXExtractor',
+    'text/html': 'extractors.html_extractor:HTMLExtractor',
+    'text/plain': 'extractors.text_extractor:TextExtractor',
+    'image/jpeg': 'extractors.image_extractor:ImageExtractor',
+    'image/png': 'extractors.image_extractor:ImageExtractor',
+    'image/tiff': 'extractors.image_extractor:ImageExtractor',
+    'image/bmp': 'extractors.image_extractor:ImageExtractor',
+    'application/epub+zip': 'extractors.epub_extractor:EPUBExtractor',
+    'application/rtf': 'extractors.rtf_extractor:RTFExtractor',
+}
+
+# What the built-in extractors read, for /formats
+FORMAT_DESCRIPTIONS = {
+    'application/pdf': 'PDF documents; pages without a text layer are OCR\'d',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'Word documents (DOCX)',
+    'application/vnd.openxmlformats-officedocument.presentationml.presentation': 'PowerPoint presentations (PPTX)',
+    'text/html': 'HTML pages',
+    'text/plain': 'Plain text, encoding detected',
+    'image/jpeg': 'JPEG images, OCR',
+    'image/png': 'PNG images, OCR',
+    'image/tiff': 'TIFF images, OCR',
+    'image/bmp': 'BMP images, OCR',
+    'application/epub+zip': 'EPUB e-books',
+    'application/rtf': 'Rich Text Format documents',
+}
+
+# Packages can add extractors with entry points in this group: `<mime type> = module:Class`
+ENTRY_POINT_GROUP = 'document_extract.extractors'
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size, where /proc is available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ExtractorRegistry:
+    """
+    MIME type -> extractor, with each extractor module imported on first use.
+
+    Targets are `module:Class` strings; MIME types sharing a target share one
+    instance. Import time and the RSS growth seen while importing are kept
+    per target. Both are attributed to whichever extractor first pulled in
+    a shared dependency (numpy, cv2, ...).
+    """
+
+    def __init__(self, targets: Optional[Dict[str, str]] = None):
+        self._targets: Dict[str, str] = dict(DEFAULT_EXTRACTORS if targets is None else targets)
+        self._instances: Dict[str, Any] = {}
+        self._load_stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> 'ExtractorRegistry':
+        """Built-in extractors, then entry points, then EXTRACTORS overrides (`mime=` disables one)."""
+        registry = cls()
+        registry.load_entry_points()
+        for mime_type, target in config.EXTRACTORS.items():
+            if target:
+                registry.register(mime_type, target)
+            else:
+                registry.unregister(mime_type)
+        return registry
+
+    def register(self, mime_type: str, target: str):
+        if ':' not in target:
+            raise ValueError(f"Extractor target must look like 'module:Class', got {target!r}")
+        with self._lock:
+            self._targets[mime_type] = target
+
+    def unregister(self, mime_type: str):
+        with self._lock:
+            self._targets.pop(mime_type, None)
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP):
+        from importlib.metadata import entry_points
+
+        for entry_point in entry_points(group=group):
+            try:
+                self.register(entry_point.name, entry_point.value)
+                logger.info(f"Registered extractor {entry_point.value} for {entry_point.name}")
+            except ValueError as e:
+                logger.warning(f"Ignoring extractor entry point {entry_point.name}: {e}")
+
+    def __contains__(self, mime_type: str) -> bool:
+        return mime_type in self._targets
+
+    def keys(self) -> List[str]:
+        return list(self._targets)
+
+    def target(self, mime_type: str) -> str:
+        return self._targets[mime_type]
+
+    def __getitem__(self, mime_type: str):
+        return self.get(mime_type)
+
+    def get(self, mime_type: str):
+        """The extractor instance, importing its module if needed. Raises KeyError for unknown types."""
+        target = self._targets[mime_type]
+        instance = self._instances.get(target)
+        if instance is not None:
+            return instance
+
+        # One import at a time keeps the timings and RSS deltas attributable
+        with self._lock:
+            instance = self._instances.get(target)
+            if instance is None:
+                instance = self._load(target)
+                self._instances[target] = instance
+        return instance
+
+    def _load(self, target: str):
+        module_name, class_name = target.split(':', 1)
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        try:
+            extractor_class = getattr(importlib.import_module(module_name), class_name)
+            instance = extractor_class()
+        except Exception as e:
+            self._load_stats[target] = {'loaded': False, 'error': str(e)}
+            logger.error(f"Could not load extractor {target}: {e}")
+            raise
+        elapsed = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        self._load_stats[target] = {
+            'loaded': True,
+            'import_seconds': round(elapsed, 4),
+            'rss_delta_bytes': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        }
+        logger.info(f"Loaded extractor {target} in {elapsed:.3f}s")
+        return instance
+
+    def warm_up(self, mime_types: Iterable[str]):
+        """Import the given formats now (`all` for every registered one); failures are logged."""
+        mime_types = list(mime_types)
+        if 'all' in mime_types:
+            mime_types = self.keys()
+        for mime_type in mime_types:
+            if mime_type not in self:
+                logger.warning(f"Cannot warm up unregistered format {mime_type}")
+                continue
+            try:
+                self[mime_type]
+            except Exception:
+                pass
+
+    def class_name(self, mime_type: str) -> str:
+        return self._targets[mime_type].split(':', 1)[1]
+
+    def supported(self) -> Dict[str, Dict[str, str]]:
+        """Per registered MIME type: extractor class and description, without importing anything."""
+        return {
+            mime_type: {
+                'extractor': target.split(':', 1)[1],
+                'description': (
+                    FORMAT_DESCRIPTIONS.get(mime_type) if target == DEFAULT_EXTRACTORS.get(mime_type) else None
+                ) or 'No description available',
+            }
+            for mime_type, target in list(self._targets.items())
+        }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per MIME type: target, whether it is loaded, and its import time and RSS growth."""
+        return {
+            mime_type: {
+                'extractor': target,
+                **self._load_stats.get(target, {'loaded': False}),
+            }
+            for mime_type, target in list(self._targets.items())
+        }
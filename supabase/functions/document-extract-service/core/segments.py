@@ -0,0 +1,224 @@
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import config
+from .markdown import CHAPTER_MARKER
+
+# Tokens are estimated as words and punctuation marks, without a tokenizer
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+HEADING_PATTERN = re.compile(r'(#{1,6}) +(.*)')
+
+# Over-long lines are split after sentence ends, then into token windows
+SENTENCE_BREAK = re.compile(r'(?<=[.!?;])\s+')
+
+# Page, slide and chapter markers of the extractors, after markdown conversion
+# (which passes chapter markers through unchanged)
+LOCATION_MARKERS = (
+    ('page', re.compile(r'- (?:Tabela )?Página (\d+) ---$')),
+    ('slide', re.compile(r'- Slide (\d+) ---$')),
+    ('chapter', CHAPTER_MARKER),
+)
+
+# (start, end, tokens, location) of a line or part of a line
+Piece = Tuple[int, int, int, Optional[Tuple[str, Any]]]
+
+
+def count_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def _location(line: str) -> Optional[Tuple[str, Any]]:
+    for unit, pattern in LOCATION_MARKERS:
+        match = pattern.match(line)
+        if match:
+            value = match.group(1)
+            return unit, int(value) if value.isdigit() else value
+    return None
+
+
+class Segmenter:
+    """
+    Incremental markdown-to-segment splitting for embeddings.
+
+    feed() takes consecutive markdown lines (as produced by MarkdownConverter)
+    and returns the segments completed so far; close() returns the rest.
+    Segments hold whole lines up to `max_tokens` estimated tokens; longer
+    lines are split at sentence ends. Headings always start a new segment,
+    and each segment records the heading path it falls under. Segments in
+    the same section repeat up to `overlap_tokens` of the previous one.
+
+    Each segment has 'index', 'text', 'start' and 'end' (character offsets
+    in the markdown, text == markdown[start:end]), 'tokens', 'headings',
+    'unit' and 'locations': the pages, slides or chapters (by document name)
+    it spans, taken from the extractor markers, or unit 'document' and no
+    locations for formats without them. Only the lines of the segment being
+    built are held in memory.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap_tokens: Optional[int] = None):
+        self.max_tokens = max(1, max_tokens if max_tokens is not None else config.SEGMENT_MAX_TOKENS)
+        overlap_tokens = overlap_tokens if overlap_tokens is not None else config.SEGMENT_OVERLAP_TOKENS
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens - 1))
+        # Over-long sentences are cut into windows small enough to carry as overlap
+        self._window = self.overlap_tokens or self.max_tokens
+        self._index = 0
+        self._offset = 0
+        self._line_start = 0
+        self._lines = deque()
+        self._lines_start = 0
+        self._pieces: List[Piece] = []
+        self._tokens = 0
+        self._fresh = False
+        self._has_content = False
+        self._headings: List[Tuple[int, str]] = []
+        self._segment_headings: Optional[List[str]] = None
+        self._location: Optional[Tuple[str, Any]] = None
+
+    def feed(self, lines: Iterable[str]) -> List[Dict[str, Any]]:
+        segments = []
+        for line in lines:
+            self._line_start = self._offset
+            self._offset += len(line) + 1
+            if not self._lines:
+                self._lines_start = self._line_start
+            self._lines.append(line)
+
+            text = line.strip()
+            if not text:
+                continue
+            self._location = _location(text) or self._location
+
+            heading = HEADING_PATTERN.match(text)
+            if heading:
+                if self._has_content:
+                    segments.append(self._flush(overlap=False))
+                elif not self._fresh:
+                    # No overlap across headings
+                    self._drop_pieces()
+                level = len(heading.group(1))
+                while self._headings and self._headings[-1][0] >= level:
+                    self._headings.pop()
+                self._headings.append((level, heading.group(2).strip()))
+
+            for start, end, tokens in self._line_pieces(line):
+                segments.extend(self._add(start, end, tokens, content=not heading))
+        return segments
+
+    def close(self) -> List[Dict[str, Any]]:
+        if not self._fresh:
+            return []
+        return [self._flush(overlap=False)]
+
+    def _line_pieces(self, line: str) -> Iterator[Tuple[int, int, int]]:
+        start = self._line_start
+        tokens = count_tokens(line)
+        if tokens <= self.max_tokens:
+            stripped = line.strip()
+            begin = start + line.find(stripped)
+            yield begin, begin + len(stripped), tokens
+            return
+
+        position = 0
+        for match in (*SENTENCE_BREAK.finditer(line), None):
+            end = match.start() if match else len(line)
+            spans = [token.span() for token in TOKEN_PATTERN.finditer(line, position, end)]
+            position = match.end() if match else end
+            if len(spans) <= self.max_tokens:
+                if spans:
+                    yield start + spans[0][0], start + spans[-1][1], len(spans)
+                continue
+            for first in range(0, len(spans), self._window):
+                window = spans[first:first + self._window]
+                yield start + window[0][0], start + window[-1][1], len(window)
+
+    def _add(self, start: int, end: int, tokens: int, content: bool) -> List[Dict[str, Any]]:
+        segments = []
+        if self._fresh and self._tokens + tokens > self.max_tokens:
+            segments.append(self._flush(overlap=True))
+        while self._pieces and self._tokens + tokens > self.max_tokens:
+            self._tokens -= self._pieces.pop(0)[2]
+
+        self._pieces.append((start, end, tokens, self._location))
+        self._tokens += tokens
+        self._fresh = True
+        if content and not self._has_content:
+            self._has_content = True
+            self._segment_headings = [text for _, text in self._headings]
+        return segments
+
+    def _flush(self, overlap: bool) -> Dict[str, Any]:
+        start, end = self._pieces[0][0], self._pieces[-1][1]
+        unit = 'document'
+        locations = []
+        for location in (piece[3] for piece in self._pieces):
+            if location is not None and location[1] not in locations:
+                unit = location[0]
+                locations.append(location[1])
+        headings = self._segment_headings
+        if headings is None:
+            headings = [text for _, text in self._headings]
+
+        text = "\n".join(self._lines)
+        segment = {
+            'index': self._index,
+            'text': text[start - self._lines_start:end - self._lines_start],
+            'start': start,
+            'end': end,
+            'tokens': self._tokens,
+            'headings': headings,
+            'unit': unit,
+            'locations': locations
+        }
+        self._index += 1
+
+        # Carry trailing pieces as overlap, never the whole segment
+        kept = []
+        carried = 0
+        if overlap:
+            for piece in reversed(self._pieces[1:]):
+                if carried + piece[2] > self.overlap_tokens:
+                    break
+                kept.insert(0, piece)
+                carried += piece[2]
+        self._pieces = kept
+        self._tokens = carried
+        self._fresh = False
+        self._has_content = False
+        self._segment_headings = None
+        self._trim_lines(kept[0][0] if kept else self._line_start)
+        return segment
+
+    def _drop_pieces(self):
+        self._pieces = []
+        self._tokens = 0
+        self._trim_lines(self._line_start)
+
+    def _trim_lines(self, needed: int):
+        """Forget lines that end before offset `needed`."""
+        while self._lines and self._lines_start + len(self._lines[0]) < needed:
+            self._lines_start += len(self._lines.popleft()) + 1
+
+
+def iter_segments(
+    lines: Iterable[str],
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None
+) -> Iterator[Dict[str, Any]]:
+    """Segments of a document arriving as markdown lines."""
+    segmenter = Segmenter(max_tokens, overlap_tokens)
+    for line in lines:
+        yield from segmenter.feed((line,))
+    yield from segmenter.close()
+
+
+def segment_markdown(
+    markdown: str,
+    max_tokens: Optional[int] = None,
+    overlap_tokens: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Segments of a whole markdown document."""
+    if not markdown:
+        return []
+    return list(iter_segments(markdown.split('\n'), max_tokens, overlap_tokens))
@@ -0,0 +1,323 @@
+import hashlib
+import logging
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+from typing import AsyncIterator, BinaryIO, Iterator, List, Optional, Tuple
+
+import aiofiles
+from multipart.multipart import MultipartParser, parse_options_header
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Bytes kept in memory for magic-number sniffing
+SNIFF_BYTES = 4096
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tgz', '.tar.gz', '.tar.bz2', '.tar.xz')
+
+# Room for multipart boundaries and part headers on top of the files themselves
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised while streaming an upload that exceeds the configured limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Upload exceeds the maximum size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class InvalidUploadError(Exception):
+    """Raised for a request body that is not a usable multipart upload."""
+
+
+class SpooledUpload:
+    """An upload written to a local spool file, with its hash and leading bytes."""
+
+    def __init__(self, path: str, filename: str, size: int, sha256: str, head: bytes):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.head = head
+        # Seconds spent receiving and writing the upload, when it was spooled here
+        self.spool_seconds = 0.0
+
+    def cleanup(self):
+        """Delete the spool file."""
+        try:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+        except OSError as e:
+            logger.warning(f"Could not remove spool file {self.path}: {e}")
+
+
+class _Spool:
+    """Hash, size and sniffing prefix accumulated while a spool file is written."""
+
+    def __init__(self, filename: str, max_bytes: int, spool_dir: Optional[str]):
+        self.filename = filename
+        self.max_bytes = max_bytes
+        safe_name = os.path.basename(filename or "upload")
+        fd, self.path = tempfile.mkstemp(suffix=f"_{safe_name}", dir=spool_dir or config.SPOOL_DIR or None)
+        os.close(fd)
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._head = bytearray()
+
+    def update(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.max_bytes > 0 and self.size > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+        self._digest.update(chunk)
+        if len(self._head) < SNIFF_BYTES:
+            self._head.extend(chunk[:SNIFF_BYTES - len(self._head)])
+
+    def result(self) -> SpooledUpload:
+        return SpooledUpload(self.path, self.filename, self.size, self._digest.hexdigest(), bytes(self._head))
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class _MultipartEvents:
+    """
+    python-multipart callbacks that queue part starts, data and ends, so
+    the (async) spool writes happen outside the parser.
+    """
+
+    def __init__(self):
+        self.events: List[tuple] = []
+        self._headers = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self):
+        return {
+            'on_part_begin': self._part_begin,
+            'on_header_field': self._header_field,
+            'on_header_value': self._header_value,
+            'on_header_end': self._header_end,
+            'on_headers_finished': self._headers_finished,
+            'on_part_data': self._part_data,
+            'on_part_end': self._part_end,
+        }
+
+    def take(self) -> List[tuple]:
+        events, self.events = self.events, []
+        return events
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int):
+        self._field += data[start:end]
+
+    def _header_value(self, data: bytes, start: int, end: int):
+        self._value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode('utf-8', errors='replace')
+        filename = options.get(b'filename')
+        if filename is not None:
+            filename = filename.decode('utf-8', errors='replace')
+        self.events.append(('part', name, filename))
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        self.events.append(('data', data[start:end]))
+
+    def _part_end(self):
+        self.events.append(('end',))
+
+
+async def spool_multipart(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    field: str,
+    max_bytes: int = config.MAX_UPLOAD_BYTES,
+    max_total_bytes: int = 0,
+    single: bool = True,
+    spool_dir: Optional[str] = None,
+) -> List[Tuple[str, Optional[SpooledUpload], Optional[str]]]:
+    """
+    Parse a multipart request body as it arrives and spool its `field` files.
+
+    Each file part is written, hashed and sniffed straight into its own
+    spool file, so the body is never buffered or copied elsewhere first,
+    and sizes are counted as the bytes arrive, with or without a
+    Content-Length. Returns `(filename, upload, error)` per file part, as
+    iter_archive does. With `single`, only the first file is read and a
+    file over `max_bytes` raises; otherwise such files come back with an
+    error and the rest of the body is still read. The caller owns (and
+    must clean up) every returned upload.
+
+    Raises:
+        UploadTooLargeError: when the single file is larger than `max_bytes`,
+            or the body is larger than `max_total_bytes` (when positive)
+        InvalidUploadError: when the body is not multipart/form-data
+    """
+    content_kind, options = parse_options_header(content_type or '')
+    boundary = options.get(b'boundary')
+    if content_kind != b'multipart/form-data' or not boundary:
+        raise InvalidUploadError("Expected a multipart/form-data upload")
+
+    events = _MultipartEvents()
+    parser = MultipartParser(boundary, events.callbacks())
+    results: List[Tuple[str, Optional[SpooledUpload], Optional[str]]] = []
+    spool: Optional[_Spool] = None
+    out = None
+    error: Optional[str] = None
+    started = 0.0
+    received = 0
+    try:
+        async for chunk in chunks:
+            received += len(chunk)
+            if max_total_bytes > 0 and received > max_total_bytes + MULTIPART_OVERHEAD_BYTES:
+                raise UploadTooLargeError(max_total_bytes)
+            parser.write(chunk)
+            for event in events.take():
+                if event[0] == 'part':
+                    _, name, filename = event
+                    if name == field and filename is not None:
+                        started = time.perf_counter()
+                        spool = _Spool(filename, max_bytes, spool_dir)
+                        out = await aiofiles.open(spool.path, "wb")
+                        error = None
+                elif spool is None:
+                    continue
+                elif event[0] == 'data':
+                    if error is not None:
+                        continue
+                    try:
+                        spool.update(event[1])
+                    except UploadTooLargeError as e:
+                        if single:
+                            raise
+                        # Skip the rest of this file, keep reading the others
+                        error = str(e)
+                        await out.close()
+                        spool.discard()
+                        continue
+                    await out.write(event[1])
+                else:
+                    if error is None:
+                        await out.close()
+                        upload = spool.result()
+                        upload.spool_seconds = time.perf_counter() - started
+                        results.append((spool.filename, upload, None))
+                    else:
+                        results.append((spool.filename, None, error))
+                    spool = out = None
+                    if single:
+                        return results
+        parser.finalize()
+    except BaseException:
+        if out is not None:
+            await out.close()
+        if spool is not None:
+            spool.discard()
+        for _, upload, _ in results:
+            if upload is not None:
+                upload.cleanup()
+        raise
+
+    if spool is not None:
+        # The body ended inside a file part
+        await out.close()
+        spool.discard()
+        for _, upload, _ in results:
+            if upload is not None:
+                upload.cleanup()
+        raise InvalidUploadError("Upload ended before the file was complete")
+    return results
+
+
+def spool_stream(
+    stream: BinaryIO,
+    filename: str,
+    max_bytes: int = config.MAX_UPLOAD_BYTES,
+    chunk_size: int = config.UPLOAD_CHUNK_BYTES,
+    spool_dir: Optional[str] = None,
+) -> SpooledUpload:
+    """Spool a file-like object (e.g. an archive member), blocking."""
+    spool = _Spool(filename, max_bytes, spool_dir)
+    try:
+        with open(spool.path, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                spool.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        spool.discard()
+        raise
+
+    return spool.result()
+
+
+def is_archive(upload: SpooledUpload) -> bool:
+    """ZIP or tar bundles of documents. DOCX/PPTX/EPUB are ZIPs too, so the name decides."""
+    name = upload.filename.lower()
+    if not name.endswith(ARCHIVE_SUFFIXES):
+        return False
+    if name.endswith('.zip'):
+        return zipfile.is_zipfile(upload.path)
+    return tarfile.is_tarfile(upload.path)
+
+
+def _skip_member(name: str) -> bool:
+    base = os.path.basename(name)
+    return not base or base.startswith('.') or name.startswith('__MACOSX/')
+
+
+def _spool_member(stream: Optional[BinaryIO], name: str) -> Tuple[str, Optional[SpooledUpload], Optional[str]]:
+    if stream is None:
+        return name, None, "Archive member could not be read"
+    try:
+        with stream:
+            return name, spool_stream(stream, name), None
+    except UploadTooLargeError as e:
+        return name, None, str(e)
+
+
+def iter_archive(
+    upload: SpooledUpload,
+    max_files: int = config.BATCH_MAX_FILES
+) -> Iterator[Tuple[str, Optional[SpooledUpload], Optional[str]]]:
+    """
+    Spool the regular files of a ZIP or tar archive one at a time.
+
+    Yields `(member_name, upload, error)`; members over the per-file size
+    limit come back with an error instead of stopping the iteration. The
+    caller owns (and must clean up) every yielded upload.
+    """
+    count = 0
+    if upload.filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(upload.path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or _skip_member(info.filename):
+                    continue
+                count += 1
+                if count > max_files:
+                    raise ValueError(f"Archive has more than {max_files} files")
+                yield _spool_member(archive.open(info), info.filename)
+    else:
+        with tarfile.open(upload.path, mode='r:*') as archive:
+            for info in archive:
+                if not info.isfile() or _skip_member(info.name):
+                    continue
+                count += 1
+                if count > max_files:
+                    raise ValueError(f"Archive has more than {max_files} files")
+                yield _spool_member(archive.extractfile(info), info.name)
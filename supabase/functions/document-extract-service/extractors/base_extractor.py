@@ -1,19 +1,150 @@
+import asyncio
+import math
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+# Seconds between progress messages sent by one worker call
+PROGRESS_INTERVAL = 0.5
+
+# Progress sink of the extraction running on the current thread
+_progress = threading.local()
+
+
+def split_ranges(count: int, max_parts: int, min_per_part: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Split units 1..count into at most `max_parts` contiguous, inclusive
+    (first, last) ranges of at least `min_per_part` units, for plan_parts.
+    None when that leaves fewer than two ranges.
+    """
+    part_count = min(max_parts, count // max(1, min_per_part))
+    if part_count < 2:
+        return None
+
+    per_part = math.ceil(count / part_count)
+    return [(first, min(count, first + per_part - 1)) for first in range(1, count + 1, per_part)]
+
+
+class _ProgressSink:
+    """Collects report_progress calls and sends them as (part, units, total) messages."""
+
+    def __init__(self, channel, part: int):
+        self.channel = channel
+        self.part = part
+        self.units = 0
+        self.total: Optional[int] = None
+        self.sent = 0.0
+
+    def add(self, units: int, total: Optional[int]):
+        self.units += units
+        if total is not None:
+            self.total = total
+        if time.monotonic() - self.sent >= PROGRESS_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if self.units or self.total is not None:
+            self.channel.put((self.part, self.units, self.total))
+            self.units = 0
+            self.total = None
+        self.sent = time.monotonic()
+
+
+@contextmanager
+def progress_channel(channel, part: int = 0):
+    """
+    Send the report_progress calls made on this thread while the block runs
+    to `channel` (a queue), tagged with `part`. No-op without a channel.
+    """
+    if channel is None:
+        yield
+        return
+    sink = _ProgressSink(channel, part)
+    _progress.sink = sink
+    try:
+        yield
+    finally:
+        _progress.sink = None
+        sink.flush()
+
+
+def report_progress(units: int = 1, total: Optional[int] = None):
+    """
+    Report `units` more work units (see part_unit) done by the extraction
+    running on this thread, and the total once known (extract_sync only;
+    parts have theirs from part_size). Cheap when nobody listens.
+    """
+    sink = getattr(_progress, 'sink', None)
+    if sink is not None:
+        sink.add(units, total)
+
 
 class BaseExtractor(ABC):
     """Base class for all document extractors."""
-    
+
+    # Pool used by core.execution: 'process' for CPU-bound parsing,
+    # 'thread' for extractors that mostly wait on files or external binaries
+    execution_mode = 'process'
+
+    # What one unit of part_size counts, for progress reporting
+    part_unit = 'parts'
+
+    # Whether extract_sync and extract_part call report_progress as units complete
+    reports_progress = False
+
+    # Bump when output for the same input changes, to invalidate cached results
+    version = '1'
+
     @abstractmethod
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
         """
-        Extract text from a document file.
-        
+        Extract text from a document file. Blocking; runs inside a worker.
+
         Args:
             file_path: Path to the temporary file
             filename: Original filename
-            
+
         Returns:
             Dict with 'text', 'method', and optionally 'ocr_used'
         """
-        pass
\ No newline at end of file
+        pass
+
+    def plan_parts(self, file_path: str, filename: str, max_parts: int) -> Optional[List[Any]]:
+        """
+        Split the document into parts that can be extracted independently.
+
+        Extractors that support fan-out return at most `max_parts` picklable
+        part descriptors; each is passed to extract_part in a separate worker
+        and the results are combined by merge_parts in the original order.
+        Returning None extracts the document whole with extract_sync.
+        """
+        return None
+
+    def iter_chunks(self, file_path: str, filename: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the text piece by piece (pages, slides, chapters) as it is extracted.
+
+        Each chunk has 'text', 'unit' and 'number'; other keys ('method',
+        'ocr_used', ...) describe the chunk. Chunk texts joined with blank
+        lines give the extract_sync text. Blocking; runs inside a worker.
+        The default yields the whole extract_sync result as one chunk.
+        """
+        yield {**self.extract_sync(file_path, filename), 'unit': 'document', 'number': 1}
+
+    def extract_part(self, file_path: str, filename: str, part: Any) -> Any:
+        """Extract one part returned by plan_parts. Blocking; runs inside a worker."""
+        raise NotImplementedError
+
+    def part_size(self, part: Any) -> int:
+        """Work units (see part_unit) covered by a part, used for progress."""
+        return 1
+
+    def merge_parts(self, file_path: str, filename: str, results: List[Any]) -> Dict[str, Any]:
+        """Combine extract_part results, in plan order, into the extract_sync result."""
+        raise NotImplementedError
+
+    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """Run extract_sync on a thread so the event loop is never blocked."""
+        return await asyncio.to_thread(self.extract_sync, file_path, filename)
\ No newline at end of file
@@ -9,7 +9,7 @@ logger = logging.getLogger(__name__)
 class DOCXExtractor(BaseExtractor):
     """Extract text from DOCX files using mammoth and python-docx."""
     
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Extract text from DOCX using mammoth (preserves structure)."""
         
         try:
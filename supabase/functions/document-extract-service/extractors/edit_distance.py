@@ -0,0 +1,179 @@
+import math
+import random
+import logging
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _strip_common_affixes(s1: str, s2: str) -> Tuple[str, str]:
+    """Drop the shared prefix and suffix, which never contribute to the distance."""
+    start = 0
+    limit = min(len(s1), len(s2))
+    while start < limit and s1[start] == s2[start]:
+        start += 1
+
+    end1, end2 = len(s1), len(s2)
+    while end1 > start and end2 > start and s1[end1 - 1] == s2[end2 - 1]:
+        end1 -= 1
+        end2 -= 1
+
+    return s1[start:end1], s2[start:end2]
+
+
+def levenshtein(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+    """
+    Exact Levenshtein distance using Myers/Hyyrö bit-parallel rows.
+
+    The shorter string is encoded as a bit vector (a Python int of any width),
+    so each character of the longer string costs a handful of big-int
+    operations instead of a Python loop over the whole row. Memory is linear.
+
+    When `max_distance` is given the scan stops as soon as the result is known
+    to exceed it, and `max_distance + 1` is returned.
+    """
+    s1, s2 = _strip_common_affixes(s1, s2)
+    if len(s1) > len(s2):
+        s1, s2 = s2, s1
+
+    m, n = len(s1), len(s2)
+    if m == 0:
+        return n if max_distance is None else min(n, max_distance + 1)
+    if max_distance is not None and n - m > max_distance:
+        return max_distance + 1
+
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(s1):
+        peq[char] = peq.get(char, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high_bit = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+
+    for j, char in enumerate(s2):
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+
+        if ph & high_bit:
+            score += 1
+        elif mh & high_bit:
+            score -= 1
+
+        # The score can drop by at most one per remaining character
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+
+    return score
+
+
+def frequency_lower_bound(s1: str, s2: str) -> int:
+    """Cheap lower bound on the edit distance from character counts."""
+    c1, c2 = Counter(s1), Counter(s2)
+    surplus = sum((c1 - c2).values())
+    deficit = sum((c2 - c1).values())
+    return max(surplus, deficit)
+
+
+def aligned_chunks(s1: str, s2: str, chunk_size: int, anchor_size: int = 24) -> List[Tuple[str, str]]:
+    """
+    Split both strings into the same number of aligned chunks.
+
+    Chunk boundaries in `s1` are fixed; the matching boundary in `s2` is the
+    nearest occurrence of the text following the `s1` boundary, searched
+    around the position predicted by the previous boundary. Without a match
+    the boundary is placed proportionally.
+    """
+    count = max(1, math.ceil(len(s1) / chunk_size))
+    ratio = len(s2) / len(s1) if s1 else 0.0
+    window = chunk_size // 4
+
+    boundaries = [0]
+    for i in range(1, count):
+        a_pos = i * chunk_size
+        expected = boundaries[-1] + round(chunk_size * ratio)
+        anchor = s1[a_pos:a_pos + anchor_size]
+        lo = max(boundaries[-1], expected - window)
+        hi = min(len(s2), expected + window + len(anchor))
+        found = s2.find(anchor, lo, hi) if anchor else -1
+        if found >= 0:
+            # Prefer the occurrence closest to the prediction
+            later = s2.find(anchor, found + 1, hi)
+            while later >= 0 and abs(later - expected) < abs(found - expected):
+                found, later = later, s2.find(anchor, later + 1, hi)
+            boundaries.append(found)
+        else:
+            boundaries.append(max(boundaries[-1], min(len(s2), round(a_pos * ratio))))
+    boundaries.append(len(s2))
+
+    return [
+        (s1[i * chunk_size:(i + 1) * chunk_size], s2[boundaries[i]:boundaries[i + 1]])
+        for i in range(count)
+    ]
+
+
+def estimate_levenshtein(
+    s1: str,
+    s2: str,
+    exact_max_chars: int = 20000,
+    chunk_size: int = 2000,
+    sample_above_chars: int = 1000000,
+    sample_chunks: int = 200,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Levenshtein distance that stays tractable on very large documents.
+
+    - up to `exact_max_chars` (after trimming shared affixes): exact distance
+    - above that: sum of distances over proportionally aligned chunks, which is
+      an upper bound of the true distance (edit distance is subadditive)
+    - above `sample_above_chars`: only `sample_chunks` random chunks are
+      measured and the sum is extrapolated
+
+    Returns:
+        Dict with 'distance', 'method' ('exact', 'chunked' or 'sampled') and
+        'error_bound', the largest absolute error the estimate can have
+        (sampled estimates use a 95% confidence interval)
+    """
+    a, b = _strip_common_affixes(s1, s2)
+    if len(a) > len(b):
+        a, b = b, a
+
+    if len(b) <= exact_max_chars or not a:
+        return {'distance': levenshtein(a, b), 'method': 'exact', 'error_bound': 0.0}
+
+    lower_bound = frequency_lower_bound(a, b)
+    chunks = aligned_chunks(b, a, chunk_size)
+
+    if len(b) <= sample_above_chars or len(chunks) <= sample_chunks:
+        distance = sum(levenshtein(x, y) for x, y in chunks)
+        return {
+            'distance': distance,
+            'method': 'chunked',
+            'error_bound': float(max(0, distance - lower_bound)),
+        }
+
+    rng = random.Random(seed)
+    sample = [levenshtein(x, y) for x, y in rng.sample(chunks, sample_chunks)]
+    total = len(chunks)
+    mean = sum(sample) / len(sample)
+    variance = sum((d - mean) ** 2 for d in sample) / max(1, len(sample) - 1)
+    # 95% interval with finite population correction
+    margin = 1.96 * math.sqrt(variance / len(sample)) * math.sqrt(1 - len(sample) / total) * total
+    distance = max(float(lower_bound), mean * total)
+
+    return {
+        'distance': distance,
+        'method': 'sampled',
+        'error_bound': max(margin, distance - lower_bound),
+    }
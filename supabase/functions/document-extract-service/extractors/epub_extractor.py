@@ -2,70 +2,160 @@ import ebooklib
 from ebooklib import epub
 from bs4 import BeautifulSoup
 import logging
-from typing import Dict, Any
-from .base_extractor import BaseExtractor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from .base_extractor import BaseExtractor, split_ranges
+from .html_events import html_blocks
+from core import config
 
 logger = logging.getLogger(__name__)
 
 class EPUBExtractor(BaseExtractor):
-    """Extract text from EPUB files using ebooklib."""
+    """Extract text from EPUB files using ebooklib, fanning long books out by chapter range."""
     
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+    part_unit = 'chapters'
+    
+    # Chapter text depends on HTML_EXTRACTION_MODE
+    version = f"2-{config.HTML_EXTRACTION_MODE}"
+    
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Extract text from EPUB chapters."""
         
         try:
             book = epub.read_epub(file_path)
-            chapters = []
+            chapters = [self._chapter_text(item) for item in self._documents(book)]
+            return self._build_result(self._title(book), chapters)
             
-            # Get book title
-            title = book.get_metadata('DC', 'title')
-            if title:
-                chapters.append(f"# {title[0][0]}")
+        except Exception as e:
+            logger.error(f"EPUB extraction failed: {str(e)}")
+            raise Exception(f"EPUB extraction failed: {str(e)}")
+    
+    def plan_parts(self, file_path: str, filename: str, max_parts: int) -> Optional[List[Tuple[int, int]]]:
+        """Split long books into contiguous chapter ranges, one per worker."""
+        
+        if not config.EPUB_PARALLEL:
+            return None
+        
+        chapter_count = len(self._documents(epub.read_epub(file_path)))
+        return split_ranges(chapter_count, max_parts, config.EPUB_MIN_CHAPTERS_PER_PART)
+    
+    def extract_part(self, file_path: str, filename: str, part: Tuple[int, int]) -> Dict[str, Any]:
+        """Chapter texts for one chapter range (and the title); every worker reads the book independently."""
+        
+        first_chapter, last_chapter = part
+        try:
+            book = epub.read_epub(file_path)
+            documents = self._documents(book)[first_chapter - 1:last_chapter]
+            return {
+                'title': self._title(book),
+                'chapters': [self._chapter_text(item) for item in documents]
+            }
+        except Exception as e:
+            logger.error(f"EPUB extraction failed on chapters {first_chapter}-{last_chapter}: {str(e)}")
+            raise Exception(f"EPUB extraction failed: {str(e)}")
+    
+    def part_size(self, part: Tuple[int, int]) -> int:
+        return part[1] - part[0] + 1
+    
+    def merge_parts(self, file_path: str, filename: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Concatenate chapter ranges in reading order."""
+        
+        try:
+            chapters = [chapter for part in results for chapter in part['chapters']]
+            return self._build_result(results[0]['title'], chapters)
+        except Exception as e:
+            logger.error(f"EPUB extraction failed: {str(e)}")
+            raise Exception(f"EPUB extraction failed: {str(e)}")
+    
+    def _documents(self, book) -> List[Any]:
+        """Chapter documents in the order they are stored."""
+        return [item for item in book.get_items() if item.get_type() == ebooklib.ITEM_DOCUMENT]
+    
+    def _title(self, book) -> Optional[str]:
+        title = book.get_metadata('DC', 'title')
+        return f"# {title[0][0]}" if title else None
+    
+    def _build_result(self, title: Optional[str], chapter_texts: List[str]) -> Dict[str, Any]:
+        chapters = [title] if title else []
+        chapters.extend(chapter_text for chapter_text in chapter_texts if chapter_text)
+        
+        full_text = '\n\n'.join(chapters)
+        
+        if len(full_text.strip()) < 50:
+            raise Exception("No meaningful text content found in EPUB")
+        
+        logger.info(f"Extracted {len(full_text)} characters from EPUB")
+        
+        return {
+            'text': full_text,
+            'method': 'ebooklib',
+            'ocr_used': False
+        }
+    
+    def iter_chunks(self, file_path: str, filename: str) -> Iterator[Dict[str, Any]]:
+        """The book title, then one chunk per chapter document."""
+        
+        try:
+            book = epub.read_epub(file_path)
+            extracted_chars = 0
             
-            # Extract text from each chapter
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    content = item.get_body_content()
-                    
-                    if content:
-                        # Parse HTML content
-                        soup = BeautifulSoup(content, 'html.parser')
-                        
-                        # Remove scripts and styles
-                        for script in soup(["script", "style"]):
-                            script.decompose()
-                        
-                        # Extract text
-                        text = soup.get_text()
-                        
-                        # Clean up text
-                        lines = text.split('\n')
-                        cleaned_lines = []
-                        
-                        for line in lines:
-                            line = line.strip()
-                            if line and len(line) > 3:
-                                cleaned_lines.append(line)
-                        
-                        chapter_text = '\n'.join(cleaned_lines)
-                        
-                        if chapter_text:
-                            chapters.append(f"## {item.get_name()}")
-                            chapters.append(chapter_text)
+            title_text = self._title(book)
+            if title_text:
+                extracted_chars += len(title_text)
+                yield {'unit': 'title', 'number': 0, 'text': title_text, 'method': 'ebooklib', 'ocr_used': False}
             
-            full_text = '\n\n'.join(chapters)
+            for chapter_num, item in enumerate(self._documents(book), 1):
+                chapter_text = self._chapter_text(item)
+                extracted_chars += len(chapter_text)
+                yield {
+                    'unit': 'chapter',
+                    'number': chapter_num,
+                    'name': item.get_name(),
+                    'text': chapter_text,
+                    'method': 'ebooklib',
+                    'ocr_used': False
+                }
             
-            if len(full_text.strip()) < 50:
+            if extracted_chars < 50:
                 raise Exception("No meaningful text content found in EPUB")
             
-            logger.info(f"Extracted {len(full_text)} characters from EPUB")
-            
-            return {
-                'text': full_text,
-                'method': 'ebooklib',
-                'ocr_used': False
-            }
-            
         except Exception as e:
             logger.error(f"EPUB extraction failed: {str(e)}")
-            raise Exception(f"EPUB extraction failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"EPUB extraction failed: {str(e)}")
+    
+    def _chapter_text(self, item) -> str:
+        """Text of one chapter document under its name, or "" when it has none."""
+        content = item.get_body_content()
+        if not content:
+            return ""
+        
+        if config.HTML_EXTRACTION_MODE != 'tree':
+            # Headings, paragraphs, list items and table rows in one pass
+            blocks = html_blocks([content.decode('utf-8', errors='replace')]).blocks
+            if not blocks:
+                return ""
+            return f"## {item.get_name()}\n\n" + "\n\n".join(blocks)
+        
+        # Parse HTML content
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Remove scripts and styles
+        for script in soup(["script", "style"]):
+            script.decompose()
+        
+        # Extract text
+        text = soup.get_text()
+        
+        # Clean up text
+        lines = text.split('\n')
+        cleaned_lines = []
+        
+        for line in lines:
+            line = line.strip()
+            if line and len(line) > 3:
+                cleaned_lines.append(line)
+        
+        chapter_text = '\n'.join(cleaned_lines)
+        
+        if not chapter_text:
+            return ""
+        return f"## {item.get_name()}\n\n{chapter_text}"
\ No newline at end of file
@@ -0,0 +1,180 @@
+"""
+Single-pass HTML text extraction driven by parser events.
+
+lxml's HTML parser calls a target object back for every start tag, end tag
+and piece of text as the markup is fed in chunks, so no tree is built and
+memory stays bounded by the output. Each piece of text goes to the nearest
+enclosing block exactly once, in document order:
+
+- h1-h6 become markdown headings one level deeper (h1 -> '##'), as in the
+  BeautifulSoup extraction
+- list items become '- item'
+- table rows become 'cell | cell'
+- everything else (p, div, section, loose body text, ...) becomes a paragraph
+
+Text before and after a nested block is kept as separate paragraphs instead
+of being repeated at every ancestor level.
+"""
+import re
+from typing import Iterable, List, Optional
+
+from lxml import etree
+
+# Content that is never text
+SKIP_TAGS = frozenset({'script', 'style', 'meta', 'link', 'noscript', 'template'})
+
+# Elements that start a new paragraph
+BLOCK_TAGS = frozenset({
+    'p', 'div', 'article', 'section', 'main', 'header', 'footer', 'aside', 'nav',
+    'blockquote', 'pre', 'figure', 'figcaption', 'address', 'form', 'fieldset',
+    'dl', 'dt', 'dd', 'ul', 'ol', 'table', 'caption', 'body', 'html', 'hr',
+})
+
+HEADING_TAGS = {f'h{level}': level for level in range(1, 7)}
+
+WHITESPACE = re.compile(r'\s+')
+
+# Paragraphs and headings this short are dropped, as in the BeautifulSoup extraction
+MIN_BLOCK_CHARS = 4
+
+
+class _Context:
+    __slots__ = ('kind', 'level', 'parts', 'cells')
+
+    def __init__(self, kind: str, level: int = 0):
+        self.kind = kind
+        self.level = level
+        self.parts: List[str] = []
+        self.cells: List[str] = []
+
+    def take_text(self) -> str:
+        text = WHITESPACE.sub(' ', ''.join(self.parts)).strip()
+        self.parts = []
+        return text
+
+
+class BlockCollector:
+    """lxml parser target that turns markup events into text blocks."""
+
+    def __init__(self):
+        self.blocks: List[str] = []
+        self.title: Optional[str] = None
+        self._title_parts: Optional[List[str]] = None
+        self._skip_depth = 0
+        # One entry per open element: the context it opened, or None
+        self._open: List[Optional[_Context]] = []
+        self._contexts: List[_Context] = [_Context('paragraph')]
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ''
+        if self._skip_depth:
+            self._skip_depth += 1
+            self._open.append(None)
+            return
+        if tag == 'title' and self.title is None:
+            self._title_parts = []
+            self._open.append(None)
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth = 1
+            self._open.append(None)
+            return
+
+        top = self._contexts[-1]
+        context = None
+        if tag in HEADING_TAGS:
+            self._flush(top)
+            context = _Context('heading', HEADING_TAGS[tag])
+        elif tag == 'li':
+            # Text of an outer item comes before its nested items
+            self._flush(top)
+            context = _Context('item')
+        elif tag == 'tr':
+            self._flush(top)
+            context = _Context('row')
+        elif tag in ('td', 'th'):
+            context = _Context('cell')
+        elif tag == 'br':
+            top.parts.append(' ')
+        elif tag in BLOCK_TAGS and top.kind == 'paragraph':
+            # Inside headings, items and cells, blocks are inline content
+            self._flush(top)
+            context = _Context('paragraph')
+
+        if context is not None:
+            self._contexts.append(context)
+        self._open.append(context)
+
+    def end(self, tag):
+        if not self._open:
+            return
+        context = self._open.pop()
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if self._title_parts is not None and (tag.lower() if isinstance(tag, str) else '') == 'title':
+            self.title = WHITESPACE.sub(' ', ''.join(self._title_parts)).strip()
+            self._title_parts = None
+            return
+        if context is None:
+            return
+
+        self._contexts.pop()
+        if context.kind == 'cell':
+            row = next((c for c in reversed(self._contexts) if c.kind == 'row'), None)
+            if row is not None:
+                row.cells.append(context.take_text())
+            else:
+                self._contexts[-1].parts.append(' ' + context.take_text() + ' ')
+        elif context.kind == 'row':
+            row_text = " | ".join(context.cells)
+            if row_text.strip():
+                self.blocks.append(row_text)
+        else:
+            self._flush(context)
+
+    def data(self, text):
+        if self._skip_depth:
+            return
+        if self._title_parts is not None:
+            self._title_parts.append(text)
+        else:
+            self._contexts[-1].parts.append(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self) -> List[str]:
+        # The parser closes unclosed elements itself; this covers a collector used on its own
+        while self._open:
+            self.end(None)
+        self._flush(self._contexts[0])
+        return self.blocks
+
+    def _flush(self, context: _Context):
+        text = context.take_text()
+        if not text:
+            return
+        if context.kind == 'item':
+            self.blocks.append(f"- {text}")
+        elif len(text) >= MIN_BLOCK_CHARS:
+            if context.kind == 'heading':
+                self.blocks.append('#' * (context.level + 1) + f" {text}")
+            else:
+                self.blocks.append(text)
+
+
+def html_blocks(chunks: Iterable[str]) -> BlockCollector:
+    """Feed HTML text chunks through the parser; returns the collector with `blocks` and `title`."""
+    collector = BlockCollector()
+    parser = etree.HTMLParser(target=collector, remove_comments=True)
+    fed = False
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            fed = True
+    if fed:
+        parser.close()
+    else:
+        collector.close()
+    return collector
@@ -1,61 +1,29 @@
 from bs4 import BeautifulSoup
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from .base_extractor import BaseExtractor
+from .html_events import html_blocks
+from core import config
+from core.fileaccess import file_encoding, html_charset, iter_text, read_text
 
 logger = logging.getLogger(__name__)
 
 class HTMLExtractor(BaseExtractor):
-    """Extract text from HTML files using BeautifulSoup."""
+    """Extract text from HTML files in one streaming pass, or with BeautifulSoup."""
+
+    # The two modes order the text differently, so each has its own cache entries
+    version = f"3-{config.HTML_EXTRACTION_MODE}"
     
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Extract clean text from HTML."""
         
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-                html_content = file.read()
-            
-            soup = BeautifulSoup(html_content, 'lxml')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style", "meta", "link"]):
-                script.decompose()
-            
-            # Extract text with structure
-            text_parts = []
-            
-            # Extract title
-            title = soup.find('title')
-            if title and title.text.strip():
-                text_parts.append(f"# {title.text.strip()}")
-            
-            # Extract headings and content
-            for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div', 'article', 'section']):
-                text = element.get_text(strip=True)
-                if text and len(text) > 3:
-                    if element.name.startswith('h'):
-                        level = int(element.name[1])
-                        text_parts.append('#' * (level + 1) + f" {text}")
-                    else:
-                        text_parts.append(text)
-            
-            # Extract lists
-            for ul in soup.find_all(['ul', 'ol']):
-                for li in ul.find_all('li'):
-                    text = li.get_text(strip=True)
-                    if text:
-                        text_parts.append(f"- {text}")
-            
-            # Extract tables
-            for table in soup.find_all('table'):
-                for row in table.find_all('tr'):
-                    cells = row.find_all(['td', 'th'])
-                    if cells:
-                        row_text = " | ".join([cell.get_text(strip=True) for cell in cells])
-                        if row_text.strip():
-                            text_parts.append(row_text)
-            
-            full_text = "\n\n".join(text_parts)
+            if config.HTML_EXTRACTION_MODE == 'tree':
+                full_text, encoding = self._extract_tree(file_path)
+                method = 'beautifulsoup'
+            else:
+                full_text, encoding = self._extract_events(file_path)
+                method = 'lxml-events'
             
             if len(full_text.strip()) < 10:
                 raise Exception("No meaningful text content found in HTML")
@@ -64,10 +32,75 @@ class HTMLExtractor(BaseExtractor):
             
             return {
                 'text': full_text,
-                'method': 'beautifulsoup',
-                'ocr_used': False
+                'method': method,
+                'ocr_used': False,
+                'encoding': encoding
             }
             
         except Exception as e:
             logger.error(f"HTML extraction failed: {str(e)}")
-            raise Exception(f"HTML extraction failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"HTML extraction failed: {str(e)}")
+    
+    def _extract_events(self, file_path: str) -> Tuple[str, str]:
+        """
+        Title, then headings, paragraphs, list items and table rows in
+        document order, parsed HTML_FEED_BYTES at a time without a tree.
+        """
+        # A <meta charset> wins over detection from the content
+        encoding = file_encoding(file_path, html_charset)
+        collector = html_blocks(iter_text(file_path, encoding, config.HTML_FEED_BYTES))
+        
+        text_parts = []
+        if collector.title:
+            text_parts.append(f"# {collector.title}")
+        text_parts.extend(collector.blocks)
+        
+        return "\n\n".join(text_parts), encoding
+    
+    def _extract_tree(self, file_path: str) -> Tuple[str, str]:
+        """Title, headings and blocks, then lists, then tables, from a BeautifulSoup tree."""
+        
+        # A <meta charset> wins over detection from the content
+        html_content, encoding = read_text(file_path, html_charset)
+        
+        soup = BeautifulSoup(html_content, 'lxml')
+        
+        # Remove script and style elements
+        for script in soup(["script", "style", "meta", "link"]):
+            script.decompose()
+        
+        # Extract text with structure
+        text_parts = []
+        
+        # Extract title
+        title = soup.find('title')
+        if title and title.text.strip():
+            text_parts.append(f"# {title.text.strip()}")
+        
+        # Extract headings and content
+        for element in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'div', 'article', 'section']):
+            text = element.get_text(strip=True)
+            if text and len(text) > 3:
+                if element.name.startswith('h'):
+                    level = int(element.name[1])
+                    text_parts.append('#' * (level + 1) + f" {text}")
+                else:
+                    text_parts.append(text)
+        
+        # Extract lists
+        for ul in soup.find_all(['ul', 'ol']):
+            for li in ul.find_all('li'):
+                text = li.get_text(strip=True)
+                if text:
+                    text_parts.append(f"- {text}")
+        
+        # Extract tables
+        for table in soup.find_all('table'):
+            for row in table.find_all('tr'):
+                cells = row.find_all(['td', 'th'])
+                if cells:
+                    row_text = " | ".join([cell.get_text(strip=True) for cell in cells])
+                    if row_text.strip():
+                        text_parts.append(row_text)
+        
+        return "\n\n".join(text_parts), encoding
\ No newline at end of file
@@ -1,82 +1,59 @@
-import pytesseract
-import cv2
-import numpy as np
-from PIL import Image
 import logging
 from typing import Dict, Any
+from core import config
 from .base_extractor import BaseExtractor
+from .ocr import ocr_image_with_confidence, clean_ocr_text
+from .image_preprocessing import StageTimer, prepare, binarize, denoise, to_pil
 
 logger = logging.getLogger(__name__)
 
 class ImageExtractor(BaseExtractor):
     """Extract text from images using OCR (tesseract)."""
+
+    execution_mode = 'thread'
+    version = '2'
     
-    def preprocess_image(self, image_path: str) -> str:
-        """Preprocess image for better OCR results."""
-        
-        # Read image
-        img = cv2.imread(image_path)
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply denoising
-        denoised = cv2.fastNlMeansDenoising(gray)
-        
-        # Apply thresholding to get binary image
-        _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        
-        # Save preprocessed image
-        processed_path = image_path + "_processed.png"
-        cv2.imwrite(processed_path, thresh)
-        
-        return processed_path
-    
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
-        """Extract text from image using OCR."""
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """
+        Extract text from image using OCR.
+
+        Cheap stages run first (downscaling, deskew, Otsu binarization); the
+        slow denoising pass only runs when tesseract's confidence on the
+        cheap result is below IMAGE_OCR_MIN_CONFIDENCE.
+        """
         
         try:
-            # Configure tesseract for Portuguese and English
-            custom_config = r'--oem 3 --psm 6 -l por+eng'
-            
-            # Try direct OCR first
-            try:
-                with Image.open(file_path) as img:
-                    text = pytesseract.image_to_string(img, config=custom_config)
-            except Exception as e:
-                logger.warning(f"Direct OCR failed: {e}, trying preprocessing")
-                
-                # Preprocess and try again
-                processed_path = self.preprocess_image(file_path)
-                try:
-                    with Image.open(processed_path) as img:
-                        text = pytesseract.image_to_string(img, config=custom_config)
-                finally:
-                    # Clean up processed image
-                    import os
-                    if os.path.exists(processed_path):
-                        os.unlink(processed_path)
+            timer = StageTimer()
+            gray = prepare(file_path, timer)
+            
+            binary = timer.run('binarize', binarize, gray)
+            text, confidence = timer.run('ocr', ocr_image_with_confidence, to_pil(binary))
+            timer.note(confidence=round(confidence, 1))
+            
+            # Escalate to denoising when the cheap pass looks unreliable
+            if confidence < config.IMAGE_OCR_MIN_CONFIDENCE:
+                logger.info(f"OCR confidence {confidence:.1f} below {config.IMAGE_OCR_MIN_CONFIDENCE}, denoising")
+                denoised = timer.run('denoise', denoise, gray)
+                binary = timer.run('binarize', binarize, denoised)
+                retry_text, retry_confidence = timer.run('ocr', ocr_image_with_confidence, to_pil(binary))
+                timer.note(confidence=round(retry_confidence, 1))
+                if retry_confidence > confidence:
+                    text, confidence = retry_text, retry_confidence
             
             # Clean up the text
-            lines = text.split('\n')
-            cleaned_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if line and len(line) > 2:  # Filter out noise
-                    cleaned_lines.append(line)
-            
-            full_text = '\n'.join(cleaned_lines)
+            full_text = clean_ocr_text(text)
             
             if len(full_text.strip()) < 10:
                 raise Exception("OCR extracted insufficient text from image")
             
-            logger.info(f"OCR extracted {len(full_text)} characters from image")
+            logger.info(f"OCR extracted {len(full_text)} characters from image (confidence {confidence:.1f})")
             
             return {
                 'text': full_text,
                 'method': 'tesseract-ocr',
-                'ocr_used': True
+                'ocr_used': True,
+                'ocr_confidence': round(confidence, 1),
+                'preprocessing': timer.stages
             }
             
         except Exception as e:
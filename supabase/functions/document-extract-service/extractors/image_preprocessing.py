@@ -0,0 +1,136 @@
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+# Skew angles outside this range are more likely misdetections than real skew
+MIN_SKEW_DEGREES = 0.5
+MAX_SKEW_DEGREES = 15.0
+
+# Longest side of the copy used to estimate skew
+SKEW_ESTIMATE_SIDE = 1500
+
+
+class StageTimer:
+    """Records which preprocessing stages ran, with their timings and details."""
+
+    def __init__(self):
+        self.stages: List[Dict[str, Any]] = []
+
+    def run(self, name: str, func, *args, **details):
+        started = time.perf_counter()
+        result = func(*args)
+        self.stages.append({'stage': name, 'ms': round((time.perf_counter() - started) * 1000, 1), **details})
+        return result
+
+    def note(self, **details):
+        """Attach details to the most recent stage."""
+        self.stages[-1].update(details)
+
+
+def load_grayscale(file_path: str) -> Tuple[np.ndarray, Optional[float]]:
+    """Decode an image to an 8-bit grayscale array, honouring EXIF rotation. Returns (image, dpi)."""
+    with Image.open(file_path) as img:
+        dpi = img.info.get('dpi')
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Transparent areas become white rather than black
+            img = img.convert('RGBA')
+            background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+            img = Image.alpha_composite(background, img)
+        gray = np.array(img.convert('L'))
+
+    horizontal_dpi = float(dpi[0]) if dpi and dpi[0] else None
+    return gray, horizontal_dpi
+
+
+def scale_factor(shape: Tuple[int, int], dpi: Optional[float]) -> float:
+    """
+    Factor that brings the image to IMAGE_OCR_TARGET_DPI.
+
+    When the resolution is unknown (or implausible) only the longest side is
+    capped at IMAGE_OCR_MAX_SIDE.
+    """
+    factor = 1.0
+    if dpi and 50 <= dpi <= 2400:
+        factor = config.IMAGE_OCR_TARGET_DPI / dpi
+        # Small differences are not worth a resample
+        if 0.8 <= factor <= 1.25:
+            factor = 1.0
+        factor = min(factor, 2.0)
+    longest = max(shape) * factor
+    if config.IMAGE_OCR_MAX_SIDE > 0 and longest > config.IMAGE_OCR_MAX_SIDE:
+        factor *= config.IMAGE_OCR_MAX_SIDE / longest
+    return factor
+
+
+def rescale(gray: np.ndarray, factor: float) -> np.ndarray:
+    interpolation = cv2.INTER_AREA if factor < 1 else cv2.INTER_CUBIC
+    return cv2.resize(gray, None, fx=factor, fy=factor, interpolation=interpolation)
+
+
+def estimate_skew(gray: np.ndarray) -> float:
+    """Skew of the text block in degrees, from the minimum-area rectangle around dark pixels."""
+    small = gray
+    if max(gray.shape) > SKEW_ESTIMATE_SIDE:
+        small = rescale(gray, SKEW_ESTIMATE_SIDE / max(gray.shape))
+    _, inverted = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    points = cv2.findNonZero(inverted)
+    if points is None or len(points) < 100:
+        return 0.0
+
+    angle = cv2.minAreaRect(points)[-1]
+    # OpenCV reports the angle in (0, 90] (>= 4.5) or [-90, 0) (older)
+    if angle > 45:
+        angle -= 90
+    elif angle < -45:
+        angle += 90
+    return float(angle)
+
+
+def rotate(gray: np.ndarray, angle: float) -> np.ndarray:
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def deskew(gray: np.ndarray, timer: StageTimer) -> np.ndarray:
+    angle = timer.run('deskew_estimate', estimate_skew, gray)
+    timer.note(angle=round(angle, 2))
+    if MIN_SKEW_DEGREES <= abs(angle) <= MAX_SKEW_DEGREES:
+        return timer.run('deskew_rotate', rotate, gray, angle)
+    return gray
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def denoise(gray: np.ndarray) -> np.ndarray:
+    return cv2.fastNlMeansDenoising(gray)
+
+
+def prepare(file_path: str, timer: StageTimer) -> np.ndarray:
+    """The cheap stages: decode, DPI normalization/downscaling and deskew. Returns grayscale."""
+    gray, dpi = timer.run('load', load_grayscale, file_path)
+    timer.note(width=gray.shape[1], height=gray.shape[0], dpi=dpi)
+
+    factor = scale_factor(gray.shape, dpi)
+    if factor != 1.0:
+        gray = timer.run('rescale', rescale, gray, factor, factor=round(factor, 3))
+
+    if config.IMAGE_OCR_DESKEW:
+        gray = deskew(gray, timer)
+    return gray
+
+
+def to_pil(image: np.ndarray) -> Image.Image:
+    return Image.fromarray(image)
@@ -0,0 +1,267 @@
+import io
+import subprocess
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from core import config
+
+logger = logging.getLogger(__name__)
+
+# Configure tesseract for Portuguese and English
+TESSERACT_LANG = 'por+eng'
+TESSERACT_CONFIG = rf'--oem 3 --psm 6 -l {TESSERACT_LANG}'
+
+
+class PytesseractBackend:
+    """Runs the tesseract CLI once per image (new process, models reloaded every call)."""
+
+    name = 'pytesseract'
+
+    def __init__(self):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.recognized = 0
+
+    def recognize(self, image) -> str:
+        text = self._pytesseract.image_to_string(image, config=TESSERACT_CONFIG)
+        self.recognized += 1
+        return text
+
+    def recognize_with_confidence(self, image) -> Tuple[str, float]:
+        """Text and mean word confidence (0-100) from a single tesseract run."""
+        data = self._pytesseract.image_to_data(
+            image, config=TESSERACT_CONFIG, output_type=self._pytesseract.Output.DICT
+        )
+        self.recognized += 1
+
+        lines: Dict[Tuple[int, int, int], list] = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            confidence = float(data['conf'][i])
+            if confidence < 0 or not word.strip():
+                continue
+            confidences.append(confidence)
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+
+        text = '\n'.join(' '.join(words) for words in lines.values())
+        return text, (sum(confidences) / len(confidences) if confidences else 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'backend': self.name, 'recognized': self.recognized}
+
+    def close(self):
+        pass
+
+
+class _Engine:
+    __slots__ = ('api', 'uses')
+
+    def __init__(self, api):
+        self.api = api
+        self.uses = 0
+
+
+class TesserocrPool:
+    """
+    Long-lived tesseract engines (tesserocr) that keep the language models loaded.
+
+    Engines are created on demand up to `size` and handed out one caller at a
+    time; callers beyond that wait for an idle engine or a free slot. Images
+    are passed in memory. An engine that raises is discarded, and every
+    engine is recycled after `recycle_after` images to bound memory growth;
+    either way its slot is freed, so a waiting caller creates a new engine.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, size: int = config.OCR_POOL_SIZE, recycle_after: int = config.OCR_RECYCLE_AFTER):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.size = max(1, size)
+        self.recycle_after = recycle_after
+        self._idle: List[_Engine] = []
+        # Guards _idle and _created; notified whenever an engine or a slot frees up
+        self._available = threading.Condition()
+        self._created = 0
+        self.recognized = 0
+        self.restarts = 0
+        self.failures = 0
+
+    def _new_engine(self):
+        kwargs = {'lang': TESSERACT_LANG, 'psm': self._tesserocr.PSM.SINGLE_BLOCK, 'oem': self._tesserocr.OEM.DEFAULT}
+        if config.TESSDATA_PREFIX:
+            kwargs['path'] = config.TESSDATA_PREFIX
+        return _Engine(self._tesserocr.PyTessBaseAPI(**kwargs))
+
+    def _acquire(self) -> _Engine:
+        with self._available:
+            while not self._idle and self._created >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        # Engines load their models outside the lock
+        try:
+            return self._new_engine()
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+
+    def _release(self, engine: '_Engine'):
+        with self._available:
+            self._idle.append(engine)
+            self._available.notify()
+
+    def _discard(self, engine: '_Engine', failed: bool = False):
+        try:
+            engine.api.End()
+        except Exception:
+            pass
+        with self._available:
+            self._created -= 1
+            self.restarts += 1
+            if failed:
+                self.failures += 1
+            self._available.notify()
+
+    def recognize(self, image) -> str:
+        return self.recognize_with_confidence(image)[0]
+
+    def recognize_with_confidence(self, image) -> Tuple[str, float]:
+        """Text and mean word confidence (0-100)."""
+        engine = self._acquire()
+        try:
+            engine.api.SetImage(image)
+            text = engine.api.GetUTF8Text()
+            confidence = float(engine.api.MeanTextConf())
+        except Exception:
+            # The engine may be left in a bad state; replace it
+            self._discard(engine, failed=True)
+            raise
+
+        engine.uses += 1
+        with self._available:
+            self.recognized += 1
+        if self.recycle_after > 0 and engine.uses >= self.recycle_after:
+            self._discard(engine)
+        else:
+            engine.api.Clear()
+            self._release(engine)
+        return text, confidence
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.name,
+            'pool_size': self.size,
+            'engines': self._created,
+            'idle': len(self._idle),
+            'recognized': self.recognized,
+            'failures': self.failures,
+            'restarts': self.restarts,
+        }
+
+    def close(self):
+        with self._available:
+            engines, self._idle = self._idle, []
+            self._created -= len(engines)
+        for engine in engines:
+            engine.api.End()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """
+    The OCR backend of this process, created on first use.
+
+    OCR_BACKEND selects `tesserocr`, `pytesseract` or `auto` (tesserocr when
+    it is installed, pytesseract otherwise). Worker processes each get their
+    own backend.
+    """
+    global _backend
+    if _backend is not None:
+        return _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = _create_backend(config.OCR_BACKEND)
+    return _backend
+
+
+def _create_backend(name: str):
+    if name in ('tesserocr', 'auto'):
+        try:
+            backend = TesserocrPool()
+            logger.info(f"OCR backend: tesserocr pool of {backend.size}")
+            return backend
+        except ImportError:
+            if name == 'tesserocr':
+                raise
+    elif name != 'pytesseract':
+        logger.warning(f"Unknown OCR_BACKEND {name!r}, using pytesseract")
+    logger.info("OCR backend: pytesseract")
+    return PytesseractBackend()
+
+
+def backend_stats() -> Optional[Dict[str, Any]]:
+    """Stats of this process's OCR backend, or None before the first OCR call."""
+    return _backend.stats() if _backend is not None else None
+
+
+def close_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
+
+
+def ocr_image(image) -> str:
+    """OCR a PIL image (or encoded image bytes) with the configured backend."""
+    if isinstance(image, (bytes, bytearray)):
+        from PIL import Image
+        image = Image.open(io.BytesIO(image))
+    return get_backend().recognize(image)
+
+
+def ocr_image_with_confidence(image) -> Tuple[str, float]:
+    """OCR a PIL image and return the text with tesseract's mean word confidence (0-100)."""
+    return get_backend().recognize_with_confidence(image)
+
+
+def rasterize_pdf_page(file_path: str, page_number: int, dpi: int = config.PDF_OCR_DPI):
+    """
+    Render one PDF page (1-based) to a grayscale PIL image with poppler's pdftoppm.
+
+    The PNG is read from pdftoppm's stdout, so nothing is written to disk.
+    """
+    from PIL import Image
+
+    result = subprocess.run(
+        [
+            'pdftoppm', '-f', str(page_number), '-l', str(page_number),
+            '-r', str(dpi), '-gray', '-png', '-singlefile', file_path
+        ],
+        capture_output=True,
+        timeout=config.PDF_OCR_PAGE_TIMEOUT
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise Exception(f"pdftoppm failed on page {page_number}: {result.stderr.decode(errors='ignore').strip()}")
+
+    image = Image.open(io.BytesIO(result.stdout))
+    image.load()
+    return image
+
+
+def clean_ocr_text(text: str) -> str:
+    """Drop blank lines and one- or two-character noise lines from OCR output."""
+    cleaned_lines = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and len(line) > 2:  # Filter out noise
+            cleaned_lines.append(line)
+    return '\n'.join(cleaned_lines)
@@ -1,53 +1,244 @@
 import pdfplumber
 import logging
-from typing import Dict, Any
-from .base_extractor import BaseExtractor
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from core import config
+from .base_extractor import BaseExtractor, report_progress, split_ranges
+from .ocr import ocr_image, rasterize_pdf_page, clean_ocr_text
 
 logger = logging.getLogger(__name__)
 
+# Lines and rectangles at most this thick (in points) count as a single ruling
+RULING_THICKNESS = 2.0
+
 class PDFExtractor(BaseExtractor):
-    """Extract text from PDF files using pdfplumber."""
-    
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+    """Extract text from PDF files using pdfplumber, with OCR for pages without a text layer."""
+
+    part_unit = 'pages'
+    reports_progress = True
+    version = '3'
+
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Extract text from PDF using pdfplumber."""
-        
+
         try:
-            text_content = []
-            
             with pdfplumber.open(file_path) as pdf:
                 logger.info(f"PDF has {len(pdf.pages)} pages")
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text from page
-                    page_text = page.extract_text()
-                    
-                    if page_text:
-                        text_content.append(f"--- Página {page_num} ---\n{page_text}")
-                    
-                    # Try to extract tables if text extraction was poor
-                    if not page_text or len(page_text.strip()) < 50:
-                        tables = page.extract_tables()
-                        if tables:
-                            for table in tables:
-                                table_text = "\n".join([
-                                    " | ".join([cell or "" for cell in row])
-                                    for row in table if row
-                                ])
-                                text_content.append(f"--- Tabela Página {page_num} ---\n{table_text}")
-            
-            full_text = "\n\n".join(text_content)
-            
-            if len(full_text.strip()) < 50:
+                report_progress(0, total=len(pdf.pages))
+                part = self._extract_pages(pdf, file_path, 1, len(pdf.pages))
+
+            return self._build_result([part])
+
+        except Exception as e:
+            logger.error(f"PDF extraction failed: {str(e)}")
+            raise Exception(f"PDF extraction failed: {str(e)}")
+
+    def iter_chunks(self, file_path: str, filename: str) -> Iterator[Dict[str, Any]]:
+        """One chunk per page."""
+
+        try:
+            extracted_chars = 0
+            with pdfplumber.open(file_path) as pdf:
+                for page_num in range(1, len(pdf.pages) + 1):
+                    part = self._extract_pages(pdf, file_path, page_num, page_num)
+                    page = part['pages'][0]
+                    text = "\n\n".join(part['blocks'])
+                    extracted_chars += len(text.strip())
+                    yield {
+                        'unit': 'page',
+                        'number': page_num,
+                        'text': text,
+                        'method': 'pdfplumber+tesseract' if page['ocr_used'] else 'pdfplumber',
+                        'ocr_used': page['ocr_used'],
+                        'tables': page['tables'],
+                        'table_seconds': page['table_seconds']
+                    }
+
+            if extracted_chars < 50:
                 raise Exception("Insufficient text extracted from PDF")
-            
-            logger.info(f"Extracted {len(full_text)} characters from PDF")
-            
-            return {
-                'text': full_text,
-                'method': 'pdfplumber',
-                'ocr_used': False
-            }
-            
+
+        except Exception as e:
+            logger.error(f"PDF extraction failed: {str(e)}")
+            raise Exception(f"PDF extraction failed: {str(e)}")
+
+    def plan_parts(self, file_path: str, filename: str, max_parts: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Split long PDFs into contiguous page ranges, one per worker.
+
+        Scanned PDFs are split page by page, since OCR makes every page
+        expensive enough to be worth its own worker.
+        """
+
+        if not config.PDF_PARALLEL:
+            return None
+
+        with pdfplumber.open(file_path) as pdf:
+            page_count = len(pdf.pages)
+            scanned = config.PDF_OCR and self._looks_scanned(pdf)
+
+        logger.info(f"PDF has {page_count} pages{' (scanned)' if scanned else ''}")
+
+        min_pages = 1 if scanned else config.PDF_MIN_PAGES_PER_PART
+        return split_ranges(page_count, max_parts, min_pages)
+
+    def extract_part(self, file_path: str, filename: str, part: Tuple[int, int]) -> Dict[str, Any]:
+        """Extract one page range; every worker opens the file independently."""
+
+        first_page, last_page = part
+        try:
+            with pdfplumber.open(file_path) as pdf:
+                return self._extract_pages(pdf, file_path, first_page, last_page)
+        except Exception as e:
+            logger.error(f"PDF extraction failed on pages {first_page}-{last_page}: {str(e)}")
+            raise Exception(f"PDF extraction failed: {str(e)}")
+
+    def part_size(self, part: Tuple[int, int]) -> int:
+        return part[1] - part[0] + 1
+
+    def merge_parts(self, file_path: str, filename: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Concatenate page ranges in page order."""
+
+        try:
+            return self._build_result(results)
         except Exception as e:
             logger.error(f"PDF extraction failed: {str(e)}")
-            raise Exception(f"PDF extraction failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"PDF extraction failed: {str(e)}")
+
+    def _looks_scanned(self, pdf) -> bool:
+        """Sample the first, middle and last page for a text layer."""
+        page_count = len(pdf.pages)
+        if page_count == 0:
+            return False
+        sample = sorted({0, page_count // 2, page_count - 1})
+        return all(len(pdf.pages[i].chars) < config.PDF_OCR_MIN_CHARS for i in sample)
+
+    def _ocr_page(self, file_path: str, page_num: int) -> str:
+        try:
+            return clean_ocr_text(ocr_image(rasterize_pdf_page(file_path, page_num)))
+        except Exception as e:
+            logger.warning(f"OCR failed on PDF page {page_num}: {e}")
+            return ""
+
+    def _ruling_counts(self, page) -> Tuple[int, int]:
+        """Horizontal and vertical ruling segments drawn on a page, from its already parsed objects."""
+        horizontal = vertical = 0
+        for line in page.lines:
+            if abs(line['bottom'] - line['top']) <= RULING_THICKNESS:
+                horizontal += 1
+            elif abs(line['x1'] - line['x0']) <= RULING_THICKNESS:
+                vertical += 1
+        for rect in page.rects:
+            if rect['height'] <= RULING_THICKNESS:
+                horizontal += 1
+            elif rect['width'] <= RULING_THICKNESS:
+                vertical += 1
+            else:
+                # A box: cells drawn as rectangles
+                horizontal += 2
+                vertical += 2
+        return horizontal, vertical
+
+    def _extract_tables(self, page) -> List[str]:
+        """
+        Markdown tables found on a page. Full table detection only runs on
+        pages with enough ruling lines to hold a table of two rows or more,
+        which is what pdfplumber's line-based detection needs anyway.
+        """
+        horizontal, vertical = self._ruling_counts(page)
+        if horizontal < config.PDF_TABLE_MIN_RULINGS or vertical < 2:
+            return []
+
+        tables = []
+        for table in page.find_tables():
+            markdown_table = markdown_table_from_rows(table.extract())
+            if markdown_table:
+                tables.append(markdown_table)
+        return tables
+
+    def _extract_pages(self, pdf, file_path: str, first_page: int, last_page: int) -> Dict[str, Any]:
+        """Text blocks and per-page details for pages first_page..last_page (1-based, inclusive)."""
+
+        text_content = []
+        pages = []
+
+        for page_num in range(first_page, last_page + 1):
+            page = pdf.pages[page_num - 1]
+
+            # Extract text from page
+            layer_text = page.extract_text()
+            page_text = layer_text
+            ocr_used = False
+
+            # Pages with (almost) no text layer are rasterized and OCR'd
+            if config.PDF_OCR and len((layer_text or "").strip()) < config.PDF_OCR_MIN_CHARS:
+                ocr_text = self._ocr_page(file_path, page_num)
+                if len(ocr_text.strip()) > len((layer_text or "").strip()):
+                    page_text = ocr_text
+                    ocr_used = True
+
+            if page_text:
+                text_content.append(f"--- Página {page_num} ---\n{page_text}")
+
+            # Tables on any page with ruling lines, text-heavy or not
+            table_started = time.perf_counter()
+            tables = self._extract_tables(page) if config.PDF_TABLES else []
+            table_seconds = time.perf_counter() - table_started
+            for table_text in tables:
+                text_content.append(f"--- Tabela Página {page_num} ---\n\n{table_text}")
+
+            pages.append({
+                'page': page_num,
+                'chars': len(page_text or ""),
+                'ocr_used': ocr_used,
+                'tables': len(tables),
+                'table_seconds': round(table_seconds, 4)
+            })
+            report_progress()
+
+        return {'blocks': text_content, 'pages': pages}
+
+    def _build_result(self, parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        text_content = [block for part in parts for block in part['blocks']]
+        pages = [page for part in parts for page in part['pages']]
+        full_text = "\n\n".join(text_content)
+
+        if len(full_text.strip()) < 50:
+            raise Exception("Insufficient text extracted from PDF")
+
+        ocr_pages = sum(1 for page in pages if page['ocr_used'])
+        if ocr_pages:
+            logger.info(f"OCR used on {ocr_pages} of {len(pages)} PDF pages")
+        table_count = sum(page['tables'] for page in pages)
+        table_seconds = sum(page['table_seconds'] for page in pages)
+        logger.info(f"Found {table_count} tables in {table_seconds:.3f}s of table detection")
+        logger.info(f"Extracted {len(full_text)} characters from PDF")
+
+        return {
+            'text': full_text,
+            'method': 'pdfplumber+tesseract' if ocr_pages else 'pdfplumber',
+            'ocr_used': ocr_pages > 0,
+            'pages': pages
+        }
+
+
+def _table_cell(cell) -> str:
+    return ' '.join((cell or '').split()).replace('|', '\\|')
+
+
+def markdown_table_from_rows(rows: List[List[Any]]) -> str:
+    """
+    A markdown table from extracted rows, the first row as header. Empty
+    rows are dropped and short rows padded; "" when nothing is left.
+    """
+    cleaned = [[_table_cell(cell) for cell in row] for row in rows if row]
+    cleaned = [row for row in cleaned if any(row)]
+    if not cleaned:
+        return ""
+
+    width = max(len(row) for row in cleaned)
+    lines = []
+    for index, row in enumerate(cleaned):
+        lines.append("| " + " | ".join(row + [''] * (width - len(row))) + " |")
+        if index == 0:
+            lines.append("|" + " --- |" * width)
+    return "\n".join(lines)
\ No newline at end of file
@@ -1,56 +1,126 @@
 from pptx import Presentation
 import logging
-from typing import Dict, Any
-from .base_extractor import BaseExtractor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from core import config
+from .base_extractor import BaseExtractor, split_ranges
 
 logger = logging.getLogger(__name__)
 
 class PPTXExtractor(BaseExtractor):
-    """Extract text from PPTX files using python-pptx."""
+    """Extract text from PPTX files using python-pptx, fanning long decks out by slide range."""
     
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
+    part_unit = 'slides'
+    
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
         """Extract text from PPTX slides in order."""
         
         try:
             prs = Presentation(file_path)
-            slides_content = []
+            slides_content = [
+                self._slide_text(slide_num, slide) for slide_num, slide in enumerate(prs.slides, 1)
+            ]
+            return self._build_result(slides_content)
             
-            for slide_num, slide in enumerate(prs.slides, 1):
-                slide_text = []
-                slide_text.append(f"--- Slide {slide_num} ---")
-                
-                # Extract text from all shapes
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_text.append(shape.text.strip())
-                    
-                    # Extract text from tables
-                    if shape.has_table:
-                        table = shape.table
-                        for row in table.rows:
-                            row_data = []
-                            for cell in row.cells:
-                                if cell.text.strip():
-                                    row_data.append(cell.text.strip())
-                            if row_data:
-                                slide_text.append(" | ".join(row_data))
-                
-                if len(slide_text) > 1:  # More than just the slide header
-                    slides_content.append("\n".join(slide_text))
+        except Exception as e:
+            logger.error(f"PPTX extraction failed: {str(e)}")
+            raise Exception(f"PPTX extraction failed: {str(e)}")
+    
+    def plan_parts(self, file_path: str, filename: str, max_parts: int) -> Optional[List[Tuple[int, int]]]:
+        """Split long decks into contiguous slide ranges, one per worker."""
+        
+        if not config.PPTX_PARALLEL:
+            return None
+        
+        slide_count = len(Presentation(file_path).slides)
+        return split_ranges(slide_count, max_parts, config.PPTX_MIN_SLIDES_PER_PART)
+    
+    def extract_part(self, file_path: str, filename: str, part: Tuple[int, int]) -> List[str]:
+        """Slide texts for one slide range; every worker opens the deck independently."""
+        
+        first_slide, last_slide = part
+        try:
+            slides = Presentation(file_path).slides
+            return [
+                self._slide_text(slide_num, slides[slide_num - 1])
+                for slide_num in range(first_slide, last_slide + 1)
+            ]
+        except Exception as e:
+            logger.error(f"PPTX extraction failed on slides {first_slide}-{last_slide}: {str(e)}")
+            raise Exception(f"PPTX extraction failed: {str(e)}")
+    
+    def part_size(self, part: Tuple[int, int]) -> int:
+        return part[1] - part[0] + 1
+    
+    def merge_parts(self, file_path: str, filename: str, results: List[List[str]]) -> Dict[str, Any]:
+        """Concatenate slide ranges in slide order."""
+        
+        try:
+            return self._build_result([slide_text for part in results for slide_text in part])
+        except Exception as e:
+            logger.error(f"PPTX extraction failed: {str(e)}")
+            raise Exception(f"PPTX extraction failed: {str(e)}")
+    
+    def _build_result(self, slide_texts: List[str]) -> Dict[str, Any]:
+        slides_content = [slide_text for slide_text in slide_texts if slide_text]
+        full_text = "\n\n".join(slides_content)
+        
+        if len(full_text.strip()) < 10:
+            raise Exception("No text content found in PPTX")
+        
+        logger.info(f"Extracted {len(full_text)} characters from {len(slides_content)} slides")
+        
+        return {
+            'text': full_text,
+            'method': 'python-pptx',
+            'ocr_used': False
+        }
+    
+    def iter_chunks(self, file_path: str, filename: str) -> Iterator[Dict[str, Any]]:
+        """One chunk per slide."""
+        
+        try:
+            prs = Presentation(file_path)
+            extracted_chars = 0
             
-            full_text = "\n\n".join(slides_content)
+            for slide_num, slide in enumerate(prs.slides, 1):
+                slide_text = self._slide_text(slide_num, slide)
+                extracted_chars += len(slide_text.strip())
+                yield {
+                    'unit': 'slide',
+                    'number': slide_num,
+                    'text': slide_text,
+                    'method': 'python-pptx',
+                    'ocr_used': False
+                }
             
-            if len(full_text.strip()) < 10:
+            if extracted_chars < 10:
                 raise Exception("No text content found in PPTX")
             
-            logger.info(f"Extracted {len(full_text)} characters from {len(slides_content)} slides")
-            
-            return {
-                'text': full_text,
-                'method': 'python-pptx',
-                'ocr_used': False
-            }
-            
         except Exception as e:
             logger.error(f"PPTX extraction failed: {str(e)}")
-            raise Exception(f"PPTX extraction failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"PPTX extraction failed: {str(e)}")
+    
+    def _slide_text(self, slide_num: int, slide) -> str:
+        """Text of one slide under its header, or "" when the slide has no text."""
+        slide_text = []
+        slide_text.append(f"--- Slide {slide_num} ---")
+        
+        # Extract text from all shapes
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_text.append(shape.text.strip())
+            
+            # Extract text from tables
+            if shape.has_table:
+                table = shape.table
+                for row in table.rows:
+                    row_data = []
+                    for cell in row.cells:
+                        if cell.text.strip():
+                            row_data.append(cell.text.strip())
+                    if row_data:
+                        slide_text.append(" | ".join(row_data))
+        
+        if len(slide_text) > 1:  # More than just the slide header
+            return "\n".join(slide_text)
+        return ""
\ No newline at end of file
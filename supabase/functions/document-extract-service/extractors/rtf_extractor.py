@@ -1,28 +1,37 @@
 import subprocess
-import tempfile
-import os
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Iterator
 from .base_extractor import BaseExtractor
+from .rtf_parser import rtf_text
+from core import config
 
 logger = logging.getLogger(__name__)
 
 class RTFExtractor(BaseExtractor):
-    """Extract text from RTF files using pandoc."""
+    """Extract text from RTF files in one in-process pass, or with pandoc."""
+
+    # pandoc mostly waits on its subprocess; the native parser is CPU-bound
+    execution_mode = 'thread' if config.RTF_MODE == 'pandoc' else 'process'
+    
+    # The two modes lay out the text differently, so each has its own cache entries
+    version = f"2-{config.RTF_MODE}"
     
-    async def extract(self, file_path: str, filename: str) -> Dict[str, Any]:
-        """Extract text from RTF using pandoc."""
+    def extract_sync(self, file_path: str, filename: str) -> Dict[str, Any]:
+        """Extract text from RTF."""
+        
+        method = 'rtf-parser'
+        text = None
+        if config.RTF_MODE == 'pandoc':
+            try:
+                text = self._extract_pandoc(file_path)
+                method = 'pandoc'
+            except Exception as e:
+                # Also covers pandoc not being installed
+                logger.warning(f"Pandoc RTF conversion failed, using the built-in parser: {str(e)}")
         
         try:
-            # Use pandoc to convert RTF to plain text
-            result = subprocess.run([
-                'pandoc', file_path, '-t', 'plain', '--wrap=none'
-            ], capture_output=True, text=True, encoding='utf-8')
-            
-            if result.returncode != 0:
-                raise Exception(f"Pandoc failed: {result.stderr}")
-            
-            text = result.stdout
+            if text is None:
+                text = rtf_text(self._read(file_path))
             
             # Clean up the text
             lines = text.split('\n')
@@ -42,37 +51,30 @@ class RTFExtractor(BaseExtractor):
             
             return {
                 'text': full_text,
-                'method': 'pandoc',
+                'method': method,
                 'ocr_used': False
             }
             
         except Exception as e:
             logger.error(f"RTF extraction failed: {str(e)}")
-            
-            # Fallback: try simple text extraction
-            try:
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                
-                # Simple RTF parsing (very basic)
-                text = content.decode('latin-1', errors='ignore')
-                
-                # Remove RTF control words
-                import re
-                text = re.sub(r'\\[a-z]+\d*\s?', ' ', text)
-                text = re.sub(r'[{}]', ' ', text)
-                text = re.sub(r'\s+', ' ', text)
-                
-                if len(text.strip()) < 10:
-                    raise Exception("Fallback RTF extraction also failed")
-                
-                logger.info(f"Extracted {len(text)} characters from RTF using fallback")
-                
-                return {
-                    'text': text,
-                    'method': 'rtf-fallback',
-                    'ocr_used': False
-                }
-                
-            except Exception as fallback_error:
-                raise Exception(f"RTF extraction failed: {str(e)}, Fallback also failed: {str(fallback_error)}")
\ No newline at end of file
+            raise Exception(f"RTF extraction failed: {str(e)}")
+    
+    def _extract_pandoc(self, file_path: str) -> str:
+        """Plain text from pandoc, the high-fidelity mode."""
+        result = subprocess.run([
+            'pandoc', file_path, '-f', 'rtf', '-t', 'plain', '--wrap=none'
+        ], capture_output=True, text=True, encoding='utf-8')
+        
+        if result.returncode != 0:
+            raise Exception(f"Pandoc failed: {result.stderr}")
+        
+        return result.stdout
+    
+    def _read(self, file_path: str) -> Iterator[bytes]:
+        """The raw file, RTF_FEED_BYTES at a time."""
+        with open(file_path, 'rb') as f:
+            while True:
+                data = f.read(config.RTF_FEED_BYTES)
+                if not data:
+                    return
+                yield data
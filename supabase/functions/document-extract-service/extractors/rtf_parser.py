@@ -0,0 +1,254 @@
+"""
+Single-pass RTF to text conversion.
+
+RTFReader is a tokenizer and state machine fed consecutive pieces of the
+raw file. It tracks groups, skips destinations that hold no body text
+(font and style tables, document info, pictures, field instructions,
+headers and footers, any ignorable {\\* ...} group), decodes \\'hh bytes with
+the code page of the document or of the current font, and decodes \\uN
+escapes, skipping their \\ucN fallback characters.
+"""
+import codecs
+import re
+from typing import Iterable, List, Optional
+
+# A control word with its optional parameter and delimiting space, a hex
+# escape, a control symbol, a brace, line breaks (not text in RTF) or text
+TOKEN = re.compile(
+    rb"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?"
+    rb"|\\'([0-9a-fA-F]{2})"
+    rb"|\\([^a-zA-Z'])"
+    rb"|([{}])"
+    rb"|([\r\n]+)"
+    rb"|[^\\{}\r\n]+"
+)
+
+# Destinations without body text; their groups are skipped entirely
+SKIP_DESTINATIONS = frozenset((
+    'author', 'buptim', 'colortbl', 'comment', 'company', 'creatim', 'datastore',
+    'doccomm', 'docvar', 'falt', 'fldinst', 'filetbl', 'footer', 'footerf',
+    'footerl', 'footerr', 'generator', 'header', 'headerf', 'headerl', 'headerr',
+    'info', 'keywords', 'latentstyles', 'listoverridetable', 'listtable',
+    'nonshppict', 'object', 'operator', 'pgdsctbl', 'pict', 'printim',
+    'revtbl', 'revtim', 'rsidtbl', 'stylesheet', 'subject', 'template',
+    'themedata', 'title', 'userprops', 'xmlnstbl', 'colorschememapping',
+))
+
+# Control words that stand for text
+CONTROL_TEXT = {
+    'par': '\n', 'line': '\n', 'sect': '\n', 'page': '\n', 'row': '\n',
+    'tab': '\t', 'cell': '\t',
+    'emdash': '\u2014', 'endash': '\u2013', 'bullet': '\u2022',
+    'lquote': '\u2018', 'rquote': '\u2019', 'ldblquote': '\u201c', 'rdblquote': '\u201d',
+    'emspace': ' ', 'enspace': ' ', 'qmspace': ' ',
+}
+
+# Control symbols that stand for text; other symbols are dropped
+SYMBOL_TEXT = {
+    b'\\': '\\', b'{': '{', b'}': '}', b'~': '\u00a0', b'_': '\u2011',
+    b'\n': '\n', b'\r': '\n', b'\t': '\t',
+}
+
+# Code pages of \fcharsetN font character sets; ANSI (0) and default (1)
+# fonts use the document code page
+CHARSET_CODEPAGES = {
+    77: 10000, 128: 932, 129: 949, 130: 1361, 134: 936, 136: 950,
+    161: 1253, 162: 1254, 163: 1258, 177: 1255, 178: 1256, 186: 1257,
+    204: 1251, 222: 874, 238: 1250, 254: 437, 255: 850,
+}
+
+# Longest control word or escape that can be cut by a piece boundary
+MAX_TOKEN_BYTES = 48
+
+
+def _codec(codepage: int) -> str:
+    """Python codec of a Windows / Mac code page, cp1252 when unknown."""
+    name = 'mac_roman' if codepage == 10000 else f'cp{codepage}'
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return 'cp1252'
+
+
+class RTFReader:
+    """
+    Incremental RTF to text conversion.
+
+    feed() takes consecutive pieces of the file; close() finishes and
+    returns the text, with a newline for each paragraph, line, row or page
+    break and a tab for each tab or table cell.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._binary = 0
+        self._output: List[str] = []
+        self._pending = bytearray()
+        self._high_surrogate: Optional[int] = None
+        # Group state: skipping, \uc fallback count, codec, in font table
+        self._skip = False
+        self._uc = 1
+        self._codec = 'cp1252'
+        self._in_fonttbl = False
+        self._stack = []
+        self._fallback = 0
+        self._ignorable = False
+        self._document_codec = 'cp1252'
+        self._font_codecs = {}
+        self._font: Optional[int] = None
+        self._group_start = False
+
+    def feed(self, data: bytes):
+        self._buffer += data
+        self._tokenize(final=False)
+
+    def close(self) -> str:
+        self._tokenize(final=True)
+        self._flush()
+        return "".join(self._output)
+
+    def _tokenize(self, final: bool):
+        data = self._buffer
+        position = 0
+        end = len(data)
+        while position < end:
+            if self._binary:
+                # \binN data is raw bytes, never text
+                taken = min(self._binary, end - position)
+                self._binary -= taken
+                position += taken
+                continue
+            match = TOKEN.match(data, position)
+            if match is None or (
+                not final and match.end() >= end - 1 and match.lastindex in (1, 2, 3, 4)
+                and end - match.start() < MAX_TOKEN_BYTES
+            ):
+                # A lone backslash, or a control word or escape that may go on
+                # in the next piece (a parameter can follow as "-" + digits)
+                if final:
+                    break
+                self._buffer = data[position:]
+                return
+            position = match.end()
+            self._token(match)
+        self._buffer = b""
+
+    def _token(self, match):
+        word, parameter, hex_byte, symbol, brace, newlines = match.groups()
+        if newlines is not None:
+            return
+        if brace is not None:
+            self._brace(brace)
+            return
+        group_start, self._group_start = self._group_start, False
+
+        if word is not None:
+            self._control_word(word.decode('ascii'), None if parameter is None else int(parameter))
+        elif hex_byte is not None:
+            if self._fallback:
+                self._fallback -= 1
+            elif not self._skip:
+                self._pending.append(int(hex_byte, 16))
+        elif symbol is not None:
+            if symbol == b'*':
+                self._ignorable = group_start
+            elif self._fallback:
+                self._fallback -= 1
+            elif not self._skip and symbol in SYMBOL_TEXT:
+                self._text(SYMBOL_TEXT[symbol])
+        else:
+            self._text_bytes(match.group(0))
+
+    def _brace(self, brace: bytes):
+        self._fallback = 0
+        self._ignorable = False
+        if brace == b'{':
+            self._flush()
+            self._stack.append((self._skip, self._uc, self._codec, self._in_fonttbl))
+            self._group_start = True
+        elif self._stack:
+            self._flush()
+            self._skip, self._uc, self._codec, self._in_fonttbl = self._stack.pop()
+            self._group_start = False
+
+    def _control_word(self, word: str, parameter: Optional[int]):
+        ignorable, self._ignorable = self._ignorable, False
+        if word == 'bin':
+            self._binary = max(0, parameter or 0)
+            return
+        if word == 'u' and parameter is not None:
+            if self._fallback:
+                self._fallback -= 1
+                return
+            if not self._skip:
+                self._unicode(parameter)
+            self._fallback = self._uc
+            return
+        if self._fallback:
+            self._fallback -= 1
+            return
+
+        if word == 'uc':
+            self._uc = max(0, parameter or 0)
+        elif word == 'fonttbl':
+            self._in_fonttbl = True
+            self._skip = True
+        elif self._in_fonttbl:
+            if word == 'f':
+                self._font = parameter
+            elif word in ('fcharset', 'cpg') and self._font is not None and parameter is not None:
+                codepage = parameter if word == 'cpg' else CHARSET_CODEPAGES.get(parameter)
+                if codepage:
+                    self._font_codecs[self._font] = _codec(codepage)
+        elif word in SKIP_DESTINATIONS or ignorable:
+            self._skip = True
+        elif self._skip:
+            return
+        elif word in CONTROL_TEXT:
+            self._text(CONTROL_TEXT[word])
+        elif word == 'ansicpg' and parameter:
+            self._document_codec = self._codec = _codec(parameter)
+        elif word in ('mac', 'pc', 'pca'):
+            self._document_codec = self._codec = _codec({'mac': 10000, 'pc': 437, 'pca': 850}[word])
+        elif word == 'f':
+            self._flush()
+            self._codec = self._font_codecs.get(parameter, self._document_codec)
+
+    def _text_bytes(self, data: bytes):
+        if self._fallback:
+            skipped = min(self._fallback, len(data))
+            self._fallback -= skipped
+            data = data[skipped:]
+        if data and not self._skip:
+            self._pending += data
+
+    def _unicode(self, value: int):
+        if value < 0:
+            value += 65536
+        self._flush()
+        if 0xD800 <= value < 0xDC00:
+            self._high_surrogate = value
+            return
+        if 0xDC00 <= value < 0xE000 and self._high_surrogate is not None:
+            value = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (value - 0xDC00)
+        self._high_surrogate = None
+        if not 0xD800 <= value < 0xE000:
+            self._output.append(chr(value))
+
+    def _text(self, text: str):
+        self._flush()
+        self._output.append(text)
+
+    def _flush(self):
+        """Decode the bytes collected since the last control word."""
+        if self._pending:
+            self._output.append(self._pending.decode(self._codec, errors='replace'))
+            self._pending.clear()
+
+
+def rtf_text(pieces: Iterable[bytes]) -> str:
+    """Text of an RTF document arriving in pieces."""
+    reader = RTFReader()
+    for piece in pieces:
+        reader.feed(piece)
+    return reader.close()
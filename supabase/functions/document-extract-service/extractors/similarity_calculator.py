@@ -1,22 +1,76 @@
+import math
+import os
+import random
 import re
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
-import numpy as np
 import logging
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict, deque
+from typing import Dict, Any, List, Optional
+from core import config
+from .edit_distance import aligned_chunks, levenshtein, estimate_levenshtein
 
 logger = logging.getLogger(__name__)
 
+# Cheapest first: no check, token/line structure, sampled Levenshtein, full score
+VERIFICATION_LEVELS = ('off', 'structural', 'sampled', 'full')
+
+# Characters normalize_text strips
+MARKDOWN_SYNTAX = re.compile(r'[#*`\-_]+')
+
+
+def verification_level(mime_type: str, requested: Optional[str] = None) -> str:
+    """The level requested, else the one configured for the MIME type, else the default."""
+    for level in (requested, config.SIMILARITY_VERIFICATION_BY_TYPE.get(mime_type), config.SIMILARITY_VERIFICATION):
+        if level in VERIFICATION_LEVELS:
+            return level
+        if level:
+            logger.warning(f"Unknown verification level {level!r}, ignoring")
+    return 'full'
+
+
+def _longest_increasing_run(positions: List[int]) -> int:
+    """Length of the longest strictly increasing subsequence (patience sorting)."""
+    tails: List[int] = []
+    for position in positions:
+        index = bisect_left(tails, position)
+        if index == len(tails):
+            tails.append(position)
+        else:
+            tails[index] = position
+    return len(tails)
+
 class SimilarityCalculator:
     """Calculate similarity between original text and markdown conversion."""
     
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            stop_words=None,  # Keep all words for medical documents
-            ngram_range=(1, 2),
-            max_features=5000
-        )
+        self.cosine_mode = config.SIMILARITY_COSINE_MODE
+        # Built on the first cosine score, so importing this module does not import numpy
+        self.tfidf = None
+        self._tfidf_lock = threading.Lock()
+        if self.cosine_mode == 'reference':
+            if not (config.SIMILARITY_IDF_PATH and os.path.exists(config.SIMILARITY_IDF_PATH)):
+                logger.warning(f"Reference IDF {config.SIMILARITY_IDF_PATH!r} not found, using hashing mode")
+                self.cosine_mode = 'hashing'
+        elif self.cosine_mode not in ('hashing', 'fit'):
+            logger.warning(f"Unknown SIMILARITY_COSINE_MODE {self.cosine_mode!r}, using hashing mode")
+            self.cosine_mode = 'hashing'
     
-    def normalize_text(self, text: str) -> str:
+    def _hashed_tfidf(self):
+        if self.tfidf is None:
+            with self._tfidf_lock:
+                if self.tfidf is None:
+                    from .tfidf import HashedTfidf
+                    
+                    if self.cosine_mode == 'reference':
+                        self.tfidf = HashedTfidf.load(config.SIMILARITY_IDF_PATH)
+                        logger.info(f"Loaded reference IDF from {config.SIMILARITY_IDF_PATH}")
+                    else:
+                        self.tfidf = HashedTfidf(config.SIMILARITY_HASH_FEATURES)
+        return self.tfidf
+    
+    @staticmethod
+    def normalize_text(text: str) -> str:
         """Normalize text for comparison."""
         # Convert to lowercase
         text = text.lower()
@@ -34,45 +88,210 @@ class SimilarityCalculator:
     
     def levenshtein_distance(self, s1: str, s2: str) -> int:
         """Calculate Levenshtein distance between two strings."""
-        if len(s1) > len(s2):
-            s1, s2 = s2, s1
+        return levenshtein(s1, s2)
+    
+    def levenshtein_similarity(self, s1: str, s2: str) -> Dict[str, Any]:
+        """
+        Normalized Levenshtein similarity (1 - distance / max length).
+        
+        Exact for normal documents; large ones fall back to a chunked or
+        sampled estimate whose 'error_bound' is given in similarity units.
+        """
+        max_len = max(len(s1), len(s2))
+        if max_len == 0:
+            return {'similarity': 1.0, 'method': 'exact', 'error_bound': 0.0}
         
-        distances = range(len(s1) + 1)
-        for i2, c2 in enumerate(s2):
-            distances_ = [i2 + 1]
-            for i1, c1 in enumerate(s1):
-                if c1 == c2:
-                    distances_.append(distances[i1])
-                else:
-                    distances_.append(1 + min((distances[i1], distances[i1 + 1], distances_[-1])))
-            distances = distances_
-        return distances[-1]
+        estimate = estimate_levenshtein(
+            s1,
+            s2,
+            exact_max_chars=config.SIMILARITY_EXACT_MAX_CHARS,
+            chunk_size=config.SIMILARITY_CHUNK_CHARS,
+            sample_above_chars=config.SIMILARITY_SAMPLE_ABOVE_CHARS,
+            sample_chunks=config.SIMILARITY_SAMPLE_CHUNKS
+        )
+        return {
+            'similarity': 1 - (estimate['distance'] / max_len),
+            'method': estimate['method'],
+            'error_bound': estimate['error_bound'] / max_len
+        }
+    
+    def cosine_similarity(self, s1: str, s2: str) -> float:
+        """TF-IDF cosine similarity of two normalized texts. Safe to call concurrently."""
+        if self.cosine_mode != 'fit':
+            return self._hashed_tfidf().cosine(s1, s2)
+        
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+        
+        # Original behaviour: a vocabulary fitted on the pair itself
+        vectorizer = TfidfVectorizer(
+            stop_words=None,  # Keep all words for medical documents
+            ngram_range=(1, 2),
+            max_features=5000
+        )
+        vectors = vectorizer.fit_transform([s1, s2])
+        return float(cosine_similarity(vectors[0:1], vectors[1:2])[0][0])
+    
+    def warm_up(self):
+        """Load the scoring dependencies (sklearn) ahead of the first request."""
+        self.cosine_similarity('warm up', 'warm up')
     
     def calculate_similarity(self, original_text: str, markdown_text: str) -> float:
         """
         Calculate similarity between original and markdown text.
         Returns a score between 0 and 1, where 1 is perfect similarity.
         """
+        return self.calculate_similarity_details(original_text, markdown_text)['similarity']
+    
+    def verify(self, original_text: str, markdown_text: str, level: str = 'full') -> Dict[str, Any]:
+        """
+        Similarity details at a verification level (see VERIFICATION_LEVELS),
+        with the level that ran under 'verification':
+        
+        - off: no check, similarity is None
+        - structural: structural_similarity, linear time
+        - sampled: sampled_similarity, with a 95% 'confidence_interval'
+        - full: calculate_similarity_details
+        """
+        if level == 'off':
+            details = {'similarity': None, 'levenshtein_method': 'none', 'error_bound': None}
+        elif level == 'structural':
+            details = self.structural_similarity(original_text, markdown_text)
+        elif level == 'sampled':
+            details = self.sampled_similarity(original_text, markdown_text)
+        else:
+            level = 'full'
+            details = self.calculate_similarity_details(original_text, markdown_text)
+        details['verification'] = level
+        return details
+    
+    def sampled_similarity(self, original_text: str, markdown_text: str, seed: int = 0) -> Dict[str, Any]:
+        """
+        The full score (0.6 Levenshtein + 0.4 cosine) with the Levenshtein
+        distance extrapolated from SIMILARITY_VERIFY_SAMPLE_CHUNKS randomly
+        chosen pairs of aligned chunks. The cosine part is linear and taken
+        on the whole texts; on short chunks it would be biased low.
+        'error_bound' is the half-width of the 95% 'confidence_interval'.
+        Documents with no more chunks than the sample get
+        calculate_similarity_details.
+        """
+        sample_size = max(2, config.SIMILARITY_VERIFY_SAMPLE_CHUNKS)
+        try:
+            norm_original = self.normalize_text(original_text)
+            norm_markdown = self.normalize_text(markdown_text)
+            chunks = aligned_chunks(norm_original, norm_markdown, config.SIMILARITY_CHUNK_CHARS)
+            if len(chunks) <= sample_size or not norm_markdown:
+                details = self.calculate_similarity_details(original_text, markdown_text)
+                similarity, error_bound = details['similarity'], details['error_bound']
+                details['confidence_interval'] = [max(0.0, similarity - error_bound), min(1.0, similarity + error_bound)]
+                return details
+            
+            distances = [levenshtein(a, b) for a, b in random.Random(seed).sample(chunks, sample_size)]
+            mean = sum(distances) / len(distances)
+            variance = sum((d - mean) ** 2 for d in distances) / (len(distances) - 1)
+            max_len = max(len(norm_original), len(norm_markdown))
+            # Total distance and its 95% interval, with finite population correction
+            lev_similarity = max(0.0, 1 - mean * len(chunks) / max_len)
+            lev_margin = (
+                1.96 * math.sqrt(variance / len(distances)) * math.sqrt(1 - len(distances) / len(chunks))
+                * len(chunks) / max_len
+            )
+            try:
+                cosine_sim = self.cosine_similarity(norm_original, norm_markdown)
+            except Exception as e:
+                logger.warning(f"TF-IDF similarity calculation failed: {e}")
+                cosine_sim = lev_similarity
+            
+            score = 0.6 * lev_similarity + 0.4 * cosine_sim
+            similarity = max(0.0, min(1.0, score))
+            margin = 0.6 * lev_margin
+            
+            logger.info(f"Sampled similarity - {len(distances)}/{len(chunks)} chunks: {similarity:.4f} ± {margin:.4f}")
+            
+            return {
+                'similarity': similarity,
+                'levenshtein': lev_similarity,
+                'cosine': float(cosine_sim),
+                'cosine_method': self.cosine_mode,
+                'levenshtein_method': 'sampled',
+                'error_bound': margin,
+                'confidence_interval': [max(0.0, score - margin), min(1.0, score + margin)],
+                'sampled_chunks': len(distances),
+                'total_chunks': len(chunks)
+            }
+            
+        except Exception as e:
+            logger.error(f"Sampled similarity failed: {e}")
+            return {'similarity': 0.5, 'levenshtein_method': 'failed', 'error_bound': 0.5}
+    
+    def structural_similarity(self, original_text: str, markdown_text: str) -> Dict[str, Any]:
+        """
+        Fast check that the markdown keeps the text and its order: the share
+        of normalized lines that appear in the same order in both texts
+        (weighted 0.6, like Levenshtein in the full score) and the overlap of
+        their word multisets (0.4). Linear in the text length, up to a log
+        factor; no error bound.
+        """
+        try:
+            original_lines = self._structure_lines(original_text)
+            markdown_lines = self._structure_lines(markdown_text)
+            if not original_lines or not markdown_lines:
+                return {'similarity': 0.0, 'levenshtein_method': 'structural', 'error_bound': None}
+            
+            # Match every original line to its next unused copy in the markdown;
+            # the longest run of increasing positions is what stayed in order
+            occurrences = defaultdict(deque)
+            for position, line in enumerate(markdown_lines):
+                occurrences[line].append(position)
+            positions = [occurrences[line].popleft() for line in original_lines if occurrences.get(line)]
+            line_alignment = _longest_increasing_run(positions) / max(len(original_lines), len(markdown_lines))
+            
+            original_tokens = Counter(' '.join(original_lines).split())
+            markdown_tokens = Counter(' '.join(markdown_lines).split())
+            shared = sum((original_tokens & markdown_tokens).values())
+            token_overlap = shared / max(1, sum(original_tokens.values()), sum(markdown_tokens.values()))
+            
+            similarity = max(0.0, min(1.0, 0.6 * line_alignment + 0.4 * token_overlap))
+            logger.info(f"Structural similarity - lines: {line_alignment:.4f}, tokens: {token_overlap:.4f}, Final: {similarity:.4f}")
+            
+            return {
+                'similarity': similarity,
+                'line_alignment': line_alignment,
+                'token_overlap': token_overlap,
+                'levenshtein_method': 'structural',
+                'error_bound': None
+            }
+            
+        except Exception as e:
+            logger.error(f"Structural similarity failed: {e}")
+            return {'similarity': 0.5, 'levenshtein_method': 'failed', 'error_bound': 0.5}
+    
+    @staticmethod
+    def _structure_lines(text: str) -> List[str]:
+        """Non-empty lines normalized like normalize_text, in one pass over the text."""
+        text = MARKDOWN_SYNTAX.sub('', text.lower())
+        return [line for line in (' '.join(line.split()) for line in text.split('\n')) if line]
+    
+    def calculate_similarity_details(self, original_text: str, markdown_text: str) -> Dict[str, Any]:
+        """
+        Same as calculate_similarity, but also reports the component scores
+        and how the Levenshtein part was computed.
+        """
         try:
             # Normalize both texts
             norm_original = self.normalize_text(original_text)
             norm_markdown = self.normalize_text(markdown_text)
             
             if not norm_original or not norm_markdown:
-                return 0.0
+                return {'similarity': 0.0, 'levenshtein_method': 'none', 'error_bound': 0.0}
             
             # Calculate Levenshtein similarity
-            max_len = max(len(norm_original), len(norm_markdown))
-            if max_len == 0:
-                return 1.0
-            
-            lev_distance = self.levenshtein_distance(norm_original, norm_markdown)
-            lev_similarity = 1 - (lev_distance / max_len)
+            lev = self.levenshtein_similarity(norm_original, norm_markdown)
+            lev_similarity = lev['similarity']
             
             # Calculate TF-IDF cosine similarity
             try:
-                vectors = self.vectorizer.fit_transform([norm_original, norm_markdown])
-                cosine_sim = cosine_similarity(vectors[0:1], vectors[1:2])[0][0]
+                cosine_sim = self.cosine_similarity(norm_original, norm_markdown)
             except Exception as e:
                 logger.warning(f"TF-IDF similarity calculation failed: {e}")
                 cosine_sim = lev_similarity  # Fallback to Levenshtein
@@ -83,11 +302,19 @@ class SimilarityCalculator:
             # Ensure the score is between 0 and 1
             final_similarity = max(0.0, min(1.0, final_similarity))
             
-            logger.info(f"Similarity scores - Levenshtein: {lev_similarity:.4f}, Cosine: {cosine_sim:.4f}, Final: {final_similarity:.4f}")
+            logger.info(f"Similarity scores - Levenshtein: {lev_similarity:.4f} ({lev['method']}), Cosine: {cosine_sim:.4f}, Final: {final_similarity:.4f}")
             
-            return final_similarity
+            return {
+                'similarity': final_similarity,
+                'levenshtein': lev_similarity,
+                'cosine': float(cosine_sim),
+                'cosine_method': self.cosine_mode,
+                'levenshtein_method': lev['method'],
+                # Only the Levenshtein part is estimated, and it carries 60% of the weight
+                'error_bound': 0.6 * lev['error_bound']
+            }
             
         except Exception as e:
             logger.error(f"Similarity calculation failed: {e}")
             # Return a conservative similarity score
-            return 0.5
\ No newline at end of file
+            return {'similarity': 0.5, 'levenshtein_method': 'failed', 'error_bound': 0.5}
\ No newline at end of file
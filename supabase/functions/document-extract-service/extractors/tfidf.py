@@ -0,0 +1,150 @@
+"""
+TF-IDF cosine similarity over hashed 1-2-grams, with no per-call fitting.
+
+HashingVectorizer maps n-grams straight to feature indices, so there is no
+vocabulary to build and nothing to mutate: one HashedTfidf can be shared by
+every request thread. IDF weights come from either
+
+- the pair itself: the same smoothed IDF TfidfVectorizer.fit_transform
+  would compute over the two documents, evaluated directly on the sparse
+  vectors; or
+- a reference corpus, fitted once offline and loaded at startup:
+
+    python -m extractors.tfidf reference_idf.npz corpus_dir/ [more files or dirs]
+"""
+import argparse
+import logging
+import math
+import os
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEATURES = 2 ** 20
+
+# Smoothed IDF (as in TfidfVectorizer) for a two-document corpus
+PAIR_IDF_SHARED = 1.0
+PAIR_IDF_SINGLE = math.log(3 / 2) + 1
+
+
+class HashedTfidf:
+    """Thread-safe TF-IDF cosine scorer; the hashing vectorizer is never fitted."""
+
+    def __init__(self, n_features: int = DEFAULT_FEATURES, idf: Optional[np.ndarray] = None):
+        self.n_features = n_features
+        self.idf = idf
+        self._hashing_vectorizer = None
+
+    @property
+    def _vectorizer(self):
+        # Created on first use so that importing this module does not load sklearn.
+        # HashingVectorizer is stateless, so a duplicate from a concurrent first call is harmless.
+        if self._hashing_vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._hashing_vectorizer = HashingVectorizer(
+                n_features=self.n_features,
+                ngram_range=(1, 2),
+                alternate_sign=False,
+                norm=None
+            )
+        return self._hashing_vectorizer
+
+    @property
+    def mode(self) -> str:
+        return 'reference' if self.idf is not None else 'hashing'
+
+    def cosine(self, text1: str, text2: str) -> float:
+        counts = self._vectorizer.transform([text1, text2]).tocsr()
+        counts.sort_indices()
+        row1, row2 = counts[0], counts[1]
+        if row1.nnz == 0 or row2.nnz == 0:
+            return 0.0
+
+        weights1 = row1.data.astype(np.float64)
+        weights2 = row2.data.astype(np.float64)
+        _, shared1, shared2 = np.intersect1d(row1.indices, row2.indices, assume_unique=True, return_indices=True)
+
+        if self.idf is not None:
+            weights1 *= self.idf[row1.indices]
+            weights2 *= self.idf[row2.indices]
+        else:
+            weights1 *= PAIR_IDF_SINGLE
+            weights2 *= PAIR_IDF_SINGLE
+            weights1[shared1] *= PAIR_IDF_SHARED / PAIR_IDF_SINGLE
+            weights2[shared2] *= PAIR_IDF_SHARED / PAIR_IDF_SINGLE
+
+        dot = float(np.dot(weights1[shared1], weights2[shared2]))
+        norm = float(np.linalg.norm(weights1) * np.linalg.norm(weights2))
+        return dot / norm if norm else 0.0
+
+    @classmethod
+    def fit_reference(cls, documents: Iterable[str], n_features: int = DEFAULT_FEATURES) -> 'HashedTfidf':
+        """Fit smoothed IDF weights on a reference corpus."""
+        scorer = cls(n_features)
+        document_frequency = np.zeros(n_features, dtype=np.int64)
+        count = 0
+        for document in documents:
+            indices = scorer._vectorizer.transform([document]).indices
+            document_frequency[np.unique(indices)] += 1
+            count += 1
+        scorer.idf = (np.log((1 + count) / (1 + document_frequency)) + 1).astype(np.float32)
+        return scorer
+
+    def save(self, path: str):
+        if self.idf is None:
+            raise ValueError("Only a fitted reference IDF can be saved")
+        # Unseen n-grams share the highest IDF, so only the others are stored
+        unseen = float(self.idf.max())
+        indices = np.flatnonzero(self.idf != unseen)
+        np.savez_compressed(
+            path,
+            n_features=self.n_features,
+            unseen_idf=unseen,
+            indices=indices,
+            values=self.idf[indices]
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'HashedTfidf':
+        with np.load(path) as data:
+            n_features = int(data['n_features'])
+            idf = np.full(n_features, float(data['unseen_idf']), dtype=np.float32)
+            idf[data['indices']] = data['values']
+        return cls(n_features, idf)
+
+
+def _iter_files(paths: Iterable[str]):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit a reference IDF for similarity scoring")
+    parser.add_argument("output", help="Destination .npz file")
+    parser.add_argument("inputs", nargs="+", help="Text/markdown files or directories (one document per file)")
+    parser.add_argument("--features", type=int, default=DEFAULT_FEATURES)
+    args = parser.parse_args()
+
+    # Reference documents are normalized the same way as the compared texts
+    from .similarity_calculator import SimilarityCalculator
+    normalize = SimilarityCalculator.normalize_text
+
+    def documents():
+        for path in _iter_files(args.inputs):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                yield normalize(f.read())
+
+    scorer = HashedTfidf.fit_reference(documents(), args.features)
+    scorer.save(args.output)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
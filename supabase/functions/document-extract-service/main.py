@@ -1,24 +1,30 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-import aiofiles
-import tempfile
-import os
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from contextlib import asynccontextmanager
 import logging
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 import time
+import json
 
-# Import all extractors
-from extractors.pdf_extractor import PDFExtractor
-from extractors.docx_extractor import DOCXExtractor
-from extractors.pptx_extractor import PPTXExtractor
-from extractors.html_extractor import HTMLExtractor
-from extractors.text_extractor import TextExtractor
-from extractors.image_extractor import ImageExtractor
-from extractors.epub_extractor import EPUBExtractor
-from extractors.rtf_extractor import RTFExtractor
-from extractors.similarity_calculator import SimilarityCalculator
+# Extractors are imported lazily by the registry
+from extractors.similarity_calculator import VERIFICATION_LEVELS, SimilarityCalculator, verification_level
+from extractors import ocr
+from core.execution import ExtractionExecutor, ExecutorSaturatedError, ProgressCallback
+from core.cache import ResultCache, make_cache_key
+from core.upload import (
+    MULTIPART_OVERHEAD_BYTES, InvalidUploadError, SpooledUpload, UploadTooLargeError,
+    is_archive, iter_archive, spool_multipart
+)
+from core.jobs import JobManager
+from core.registry import ExtractorRegistry
+from core.markdown import convert_to_markdown, MarkdownConverter
+from core.segments import Segmenter, segment_markdown
+from core.fileaccess import detect_mime_type
+from core.metrics import StageTimings
+from core import config, metrics, profiling
 
 # Configure structured logging
 logging.basicConfig(
@@ -27,10 +33,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+SERVICE_VERSION = "2.0.0"
+
+# Optional extractor result keys passed through to the response metadata
+EXTRACTION_DETAIL_KEYS = ('pages', 'ocr_confidence', 'preprocessing', 'encoding')
+
+# Worker pools that keep blocking extractors off the event loop
+executor = ExtractionExecutor()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the extraction worker pools and shut them down cleanly on exit."""
+    executor.start()
+    if config.EXTRACTOR_WARMUP:
+        await asyncio.to_thread(extractors.warm_up, config.EXTRACTOR_WARMUP)
+    if config.SIMILARITY_WARMUP:
+        await asyncio.to_thread(similarity_calc.warm_up)
+    await job_manager.start()
+    try:
+        yield
+    finally:
+        await job_manager.shutdown()
+        await executor.shutdown()
+        result_cache.close()
+        if near_duplicates is not None:
+            near_duplicates.close()
+        ocr.close_backend()
+
 app = FastAPI(
     title="Universal Document Extractor",
-    version="2.0.0",
-    description="High-fidelity text extraction service for Knowledge Base pipeline"
+    version=SERVICE_VERSION,
+    description="High-fidelity text extraction service for Knowledge Base pipeline",
+    lifespan=lifespan
 )
 
 # Enhanced CORS middleware
@@ -42,155 +76,393 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize extractors with enhanced configuration
-extractors = {
-    'application/pdf': PDFExtractor(),
-    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': DOCXExtractor(),
-    'application/vnd.openxmlformats-officedocument.presentationml.presentation': PPTXExtractor(),
-    'text/html': HTMLExtractor(),
-    'text/plain': TextExtractor(),
-    'image/jpeg': ImageExtractor(),
-    'image/png': ImageExtractor(),
-    'image/tiff': ImageExtractor(),
-    'image/bmp': ImageExtractor(),
-    'application/epub+zip': EPUBExtractor(),
-    'application/rtf': RTFExtractor(),
-}
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Refuse uploads whose declared size is over the limit before reading the
+    body. Bodies without a Content-Length are counted while they stream in
+    (see spool_multipart).
+    """
+    content_length = request.headers.get('content-length', '')
+    max_bytes = config.MAX_BATCH_BYTES if request.url.path == '/extract/batch' else config.MAX_UPLOAD_BYTES
+    if (
+        max_bytes > 0
+        and content_length.isdigit()
+        and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES
+    ):
+        logger.error(f"[EXTRACT] Rejected request of {content_length} bytes")
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Upload exceeds the maximum size of {max_bytes} bytes"}
+        )
+    return await call_next(request)
+
+# MIME type -> extractor; modules are imported on first use (see EXTRACTORS / EXTRACTOR_WARMUP)
+extractors = ExtractorRegistry.from_config()
 
 similarity_calc = SimilarityCalculator()
 
-def detect_mime_type(file_content: bytes, filename: str) -> str:
-    """Enhanced MIME type detection with better accuracy."""
-    try:
-        # Magic number detection with enhanced patterns
-        if file_content[:4] == b'%PDF':
-            return 'application/pdf'
-        elif file_content[:2] == b'PK':  # ZIP-based formats
-            if filename.lower().endswith('.docx'):
-                return 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-            elif filename.lower().endswith('.pptx'):
-                return 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
-            elif filename.lower().endswith('.epub'):
-                return 'application/epub+zip'
-        elif file_content[:3] == b'\xff\xd8\xff':
-            return 'image/jpeg'
-        elif file_content[:8] == b'\x89PNG\r\n\x1a\n':
-            return 'image/png'
-        elif file_content[:2] == b'BM':
-            return 'image/bmp'
-        elif file_content[:4] in [b'II*\x00', b'MM\x00*']:
-            return 'image/tiff'
-        elif file_content[:5] == b'{\\rtf':
-            return 'application/rtf'
-        elif b'<html' in file_content[:2000].lower() or b'<!doctype' in file_content[:2000].lower():
-            return 'text/html'
-        
-        # Enhanced extension fallback
-        ext = filename.lower().split('.')[-1] if '.' in filename else ''
-        ext_map = {
-            'pdf': 'application/pdf',
-            'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-            'pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
-            'txt': 'text/plain',
-            'html': 'text/html',
-            'htm': 'text/html',
-            'rtf': 'application/rtf',
-            'epub': 'application/epub+zip',
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'tiff': 'image/tiff',
-            'tif': 'image/tiff',
-            'bmp': 'image/bmp'
-        }
-        
-        return ext_map.get(ext, 'application/octet-stream')
-    except Exception as e:
-        logger.warning(f"MIME detection error: {e}")
-        return 'application/octet-stream'
-
-def convert_to_markdown(text: str, filename: str) -> str:
-    """Enhanced markdown conversion with better structure preservation."""
-    if not text.strip():
-        return ""
-    
-    lines = text.split('\n')
-    markdown_lines = []
-    
-    # Add document title from filename
-    title = filename.replace('_', ' ').replace('-', ' ')
-    if '.' in title:
-        title = title.rsplit('.', 1)[0]
-    markdown_lines.append(f"# {title}\n")
-    
-    # Process lines with enhanced patterns
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            markdown_lines.append("")
-            continue
-            
-        # Enhanced header detection
-        if len(line) < 150 and (
-            line.isupper() or 
-            line.endswith(':') or
-            any(word in line.lower() for word in [
-                'capítulo', 'seção', 'item', 'artigo', 'anexo', 'apêndice',
-                'introdução', 'conclusão', 'resumo', 'abstract', 'título'
-            ]) or
-            # Check if line looks like a numbered section
-            (len(line.split()) <= 8 and any(char.isdigit() for char in line[:5]))
-        ):
-            # Determine header level
-            if any(word in line.lower() for word in ['capítulo', 'chapter']):
-                markdown_lines.append(f"# {line}")
-            elif any(word in line.lower() for word in ['seção', 'section']):
-                markdown_lines.append(f"## {line}")
-            else:
-                markdown_lines.append(f"### {line}")
-        
-        # Enhanced list detection
-        elif (line.startswith(('•', '-', '*', '◦', '▪', '▫')) or 
-              (len(line) > 2 and line[1] in '.)' and line[0].isdigit()) or
-              (len(line) > 3 and line[2] in '.)' and line[:2].isdigit())):
-            # Clean list marker and add markdown format
-            cleaned = line.lstrip('•-*◦▪▫ ')
-            if line[0].isdigit():
-                # Numbered list
-                number = ''.join(filter(str.isdigit, line.split()[0]))
-                content = line.split(')', 1)[-1].split('.', 1)[-1].strip()
-                markdown_lines.append(f"{number}. {content}")
-            else:
-                # Bulleted list
-                markdown_lines.append(f"- {cleaned}")
-        
-        # Regular paragraph
-        else:
-            markdown_lines.append(line)
+# Extraction responses keyed by upload hash, so re-submitted documents skip all work
+result_cache = ResultCache()
+
+# MinHash LSH index of extracted texts, reporting near-identical earlier uploads;
+# only imported (with numpy) when configured
+near_duplicates = None
+if config.NEAR_DUPLICATE_INDEX_PATH:
+    from core.near_duplicates import NearDuplicateIndex
+    near_duplicates = NearDuplicateIndex()
+
+def _extraction_cache_key(upload: SpooledUpload, extractor, verification: str) -> str:
+    """
+    Result cache key. The filename is part of it because it becomes the
+    markdown title, the verification level because it decides the similarity.
+    """
+    return make_cache_key(
+        upload.sha256,
+        f"{SERVICE_VERSION}:{extractor.__class__.__name__}:{extractor.version}",
+        {'filename': upload.filename, 'verification': verification}
+    )
+
+def _check_verification(verification: Optional[str]):
+    """Reject an unknown `verification` query parameter with 400."""
+    if verification is not None and verification not in VERIFICATION_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"verification must be one of {list(VERIFICATION_LEVELS)}"
+        )
+
+def _similarity_label(similarity: Optional[float]) -> str:
+    return "unverified" if similarity is None else f"{similarity:.4f}"
+
+def _upload_body(field: str, many: bool = False) -> Dict[str, Any]:
+    """OpenAPI request body of an endpoint that parses its own multipart upload."""
+    schema = {'type': 'string', 'format': 'binary'}
+    if many:
+        schema = {'type': 'array', 'items': schema}
+    return {'requestBody': {'required': True, 'content': {'multipart/form-data': {'schema': {
+        'type': 'object', 'required': [field], 'properties': {field: schema}
+    }}}}}
+
+async def _spool_request_file(request: Request, log_prefix: str) -> SpooledUpload:
+    """
+    Spool the `file` part of a multipart request while it streams in.
     
-    return '\n'.join(markdown_lines)
+    Raises HTTPException for a body without a named file (400) and a file
+    over MAX_UPLOAD_BYTES (413).
+    """
+    try:
+        results = await spool_multipart(request.stream(), request.headers.get('content-type', ''), 'file')
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        logger.error(f"{log_prefix} Rejected upload: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    if not results or not results[0][0]:
+        for _, upload, _ in results:
+            upload.cleanup()
+        raise HTTPException(status_code=400, detail="Filename is required")
+    return results[0][1]
+
+def _cache_counters() -> Dict[str, int]:
+    """Service-wide cache counters reported in response metadata."""
+    stats = result_cache.stats()
+    return {'hits': stats['hits'], 'misses': stats['misses']}
 
 @app.get("/health")
 async def health_check():
     """Enhanced health check with extractor status."""
     extractor_status = {}
-    for mime_type, extractor in extractors.items():
-        try:
-            extractor_status[mime_type] = "ready"
-        except Exception as e:
-            extractor_status[mime_type] = f"error: {str(e)}"
+    for mime_type, stats in extractors.stats().items():
+        if 'error' in stats:
+            extractor_status[mime_type] = f"error: {stats['error']}"
+        else:
+            extractor_status[mime_type] = "ready" if stats['loaded'] else "not loaded"
     
     return {
         "status": "healthy",
         "service": "universal-document-extractor",
-        "version": "2.0.0",
+        "version": SERVICE_VERSION,
         "supported_formats": list(extractors.keys()),
         "extractor_status": extractor_status,
+        "extractors": extractors.stats(),
+        "executor": executor.stats(),
+        "cache": result_cache.stats(),
+        "near_duplicates": near_duplicates.stats() if near_duplicates is not None else {'enabled': False},
+        "jobs": job_manager.stats(),
+        "ocr": ocr.backend_stats(),
         "timestamp": datetime.utcnow().isoformat()
     }
 
-@app.post("/extract")
-async def extract_document(file: UploadFile = File(...)) -> Dict[str, Any]:
+def _cache_lookups() -> Dict[tuple, int]:
+    stats = result_cache.stats()
+    return {
+        ('hit', 'memory'): stats['memory_hits'],
+        ('hit', 'disk'): stats['disk_hits'],
+        ('miss', ''): stats['misses'],
+    }
+
+def _cache_hit_ratio() -> Dict[tuple, float]:
+    stats = result_cache.stats()
+    lookups = stats['hits'] + stats['misses']
+    return {(): stats['hits'] / lookups if lookups else 0.0}
+
+# Service state read at scrape time, next to the per-document metrics in core.metrics
+metrics.REGISTRY.gauge(
+    'document_extract_queue_depth', 'Extractions waiting or running.',
+    callback=lambda: {(): executor.queue_depth}
+)
+metrics.REGISTRY.gauge(
+    'document_extract_queue_capacity', 'Extractions accepted before new ones are rejected.',
+    callback=lambda: {(): executor.max_queue_depth}
+)
+metrics.REGISTRY.gauge(
+    'document_extract_cache_lookups_total', 'Result cache lookups by result and tier.',
+    ('result', 'tier'), callback=_cache_lookups, kind='counter'
+)
+metrics.REGISTRY.gauge(
+    'document_extract_cache_hit_ratio', 'Share of result cache lookups that were hits.',
+    callback=_cache_hit_ratio
+)
+metrics.REGISTRY.gauge(
+    'document_extract_jobs', 'Asynchronous jobs by status.',
+    ('status',), callback=lambda: {(status,): n for status, n in job_manager.stats()['counts'].items()}
+)
+metrics.REGISTRY.gauge(
+    'document_extract_extractor_loaded', 'Whether the extractor of a format has been imported.',
+    ('mime_type',), callback=lambda: {(mime_type,): int(stats['loaded']) for mime_type, stats in extractors.stats().items()}
+)
+
+@app.get("/metrics")
+async def get_metrics() -> PlainTextResponse:
+    """
+    Prometheus metrics of this process: stage latency histograms per MIME
+    type, documents by outcome, bytes, pages, OCR usage, queue depth and
+    cache lookups.
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+async def process_document(
+    upload: SpooledUpload,
+    start_time: float,
+    progress: Optional[ProgressCallback] = None,
+    profile_header: Optional[str] = None,
+    verification: Optional[str] = None,
+    segments: bool = False,
+    wait_for_room: bool = False
+) -> Dict[str, Any]:
+    """
+    Detect, extract, convert and verify one spooled upload.
+    
+    `progress` receives extraction progress (see ExtractionExecutor.run).
+    `profile_header` is the X-Profile value of the request, if any (see
+    core.profiling). `verification` is the similarity verification level
+    asked for; without one the level configured for the MIME type is used.
+    `segments` adds the embedding segments of the markdown (see
+    core.segments); they are cut from the markdown on every request, so
+    cached results serve both. Raises HTTPException for unsupported
+    formats (415) and a full extraction queue (503); extraction errors
+    propagate as regular exceptions. With `wait_for_room`, a full queue is
+    waited out instead, counted as queue_wait.
+    """
+    filename = upload.filename
+    timings = StageTimings()
+    timings.add('spool', upload.spool_seconds)
+    
+    # Enhanced MIME type detection
+    with timings.stage('mime_detect'):
+        mime_type = detect_mime_type(upload.head, filename, upload.path)
+    logger.info(f"[EXTRACT] Detected MIME type: {mime_type}")
+    
+    # Validate supported format
+    if mime_type not in extractors:
+        logger.error(f"[EXTRACT] Unsupported format: {mime_type}")
+        metrics.record_document(mime_type, 'unsupported', timings)
+        raise HTTPException(
+            status_code=415, 
+            detail=f"Unsupported file type: {mime_type}. Supported: {list(extractors.keys())}"
+        )
+    
+    try:
+        level = verification_level(mime_type, verification)
+        response = await _extract_and_convert(
+            upload, mime_type, start_time, timings, progress, profile_header, level, wait_for_room
+        )
+        if segments:
+            with timings.stage('segments'):
+                response['segments'] = await executor.run_blocking(segment_markdown, response['markdown'])
+            response['metadata']['segment_count'] = len(response['segments'])
+        # Checked on every request, cache hits included, as the index keeps growing
+        if near_duplicates is not None and near_duplicates.enabled:
+            with timings.stage('near_duplicates'):
+                try:
+                    response['metadata']['near_duplicates'] = await executor.run_blocking(
+                        near_duplicates.check, upload.sha256, filename, response['original_text']
+                    )
+                except Exception as e:
+                    # The index is advisory; a locked or broken index must not fail the extraction
+                    logger.warning(f"[EXTRACT] Near-duplicate check failed for {filename}: {e}")
+    except HTTPException as e:
+        metrics.record_document(mime_type, 'rejected' if e.status_code == 503 else 'error', timings)
+        raise
+    except Exception:
+        metrics.record_document(mime_type, 'error', timings)
+        raise
+    
+    response['metadata']['timings'] = timings.rounded()
+    return response
+
+async def _extract_and_convert(
+    upload: SpooledUpload,
+    mime_type: str,
+    start_time: float,
+    timings: StageTimings,
+    progress: Optional[ProgressCallback],
+    profile_header: Optional[str],
+    verification: str,
+    wait_for_room: bool
+) -> Dict[str, Any]:
+    """The stages of process_document after format detection, each timed into `timings`."""
+    filename = upload.filename
+    file_size = upload.size
+    
+    # First use of a format imports its extractor, which can take a moment
+    with timings.stage('load_extractor'):
+        extractor = await executor.run_blocking(extractors.get, mime_type)
+    
+    # Serve repeated uploads from the result cache
+    cache_key = _extraction_cache_key(upload, extractor, verification)
+    cached = None
+    if result_cache.enabled:
+        with timings.stage('cache_lookup'):
+            cached = await executor.run_blocking(result_cache.get, cache_key)
+    if cached is not None:
+        response = cached['value']
+        response['processing_time'] = time.time() - start_time
+        response['metadata']['cache'] = {'hit': True, 'tier': cached['tier'], **_cache_counters()}
+        timings.add('total', response['processing_time'])
+        metrics.record_document(mime_type, 'cache_hit', timings)
+        logger.info(f"[EXTRACT] CACHE HIT ({cached['tier']}): {filename}")
+        return response
+    
+    logger.info(f"[EXTRACT] Using extractor: {extractor.__class__.__name__}")
+    
+    # Extract text in the worker pool matching the extractor
+    profile = profiling.start_session(profile_header)
+    while True:
+        try:
+            extraction_result = await executor.run(mime_type, extractor, upload.path, filename, progress, timings, profile)
+            break
+        except ExecutorSaturatedError as e:
+            if not wait_for_room:
+                logger.warning(f"[EXTRACT] Rejected {filename}: {e}")
+                raise HTTPException(
+                    status_code=503,
+                    detail=str(e),
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            # Retried here, after the one cache lookup, so waiting is not counted as misses or rejections
+            with timings.stage('queue_wait'):
+                await asyncio.sleep(e.retry_after)
+    profile_summary = None
+    if profile is not None and profiling.should_keep(profile, timings.timings.get('extract', 0.0)):
+        profile_summary = await executor.run_blocking(
+            profile.write,
+            f"{datetime.utcnow():%Y%m%dT%H%M%S}_{upload.sha256[:12]}",
+            {
+                'filename': filename,
+                'mime_type': mime_type,
+                'file_size': file_size,
+                'extract_seconds': round(timings.timings.get('extract', 0.0), 4),
+            }
+        )
+    
+    original_text = extraction_result['text']
+    extraction_method = extraction_result['method']
+    ocr_used = extraction_result.get('ocr_used', False)
+    
+    logger.info(f"[EXTRACT] Extracted {len(original_text)} characters using {extraction_method}")
+    
+    if ocr_used:
+        logger.info(f"[EXTRACT] OCR was used for text extraction")
+    
+    # Enhanced markdown conversion
+    with timings.stage('markdown'):
+        markdown_content = await executor.run_blocking(
+            convert_to_markdown, original_text, filename
+        )
+    
+    # Check the markdown against the text at the requested verification level
+    with timings.stage('similarity'):
+        similarity_details = await executor.run_blocking(
+            similarity_calc.verify,
+            original_text, 
+            markdown_content,
+            verification
+        )
+    similarity_score = similarity_details['similarity']
+    
+    processing_time = time.time() - start_time
+    
+    logger.info(f"[EXTRACT] Processing complete: similarity={_similarity_label(similarity_score)} ({verification}), time={processing_time:.2f}s")
+    
+    # Prepare comprehensive response
+    response = {
+        'success': True,
+        'original_text': original_text,
+        'markdown': markdown_content,
+        'similarity': similarity_score,
+        'extraction_method': extraction_method,
+        'ocr_used': ocr_used,
+        'mime_type': mime_type,
+        'processing_time': processing_time,
+        'metadata': {
+            'filename': filename,
+            'file_size': file_size,
+            'text_length': len(original_text),
+            'markdown_length': len(markdown_content),
+            'extractor_class': extractor.__class__.__name__,
+            'similarity_method': similarity_details['levenshtein_method'],
+            'similarity_error_bound': similarity_details['error_bound'],
+            'similarity_cosine_method': similarity_details.get('cosine_method'),
+            'verification': similarity_details['verification'],
+            'extraction_timestamp': datetime.utcnow().isoformat()
+        }
+    }
+    if 'confidence_interval' in similarity_details:
+        response['metadata']['similarity_confidence_interval'] = similarity_details['confidence_interval']
+    # Extractor-specific details (per-page OCR, preprocessing stages, ...)
+    for key in EXTRACTION_DETAIL_KEYS:
+        if key in extraction_result:
+            response['metadata'][key] = extraction_result[key]
+    
+    if result_cache.enabled:
+        with timings.stage('cache_store'):
+            await executor.run_blocking(result_cache.put, cache_key, response)
+        response['metadata']['cache'] = {'hit': False, 'tier': None, **_cache_counters()}
+    if profile_summary is not None:
+        response['metadata']['profile'] = profile_summary
+    
+    timings.add('total', time.time() - start_time)
+    pages = extraction_result.get('pages') or []
+    metrics.record_document(
+        mime_type, 'success', timings,
+        size=file_size,
+        pages=len(pages),
+        ocr_used=ocr_used,
+        ocr_pages=sum(1 for page in pages if page.get('ocr_used'))
+    )
+    
+    # Log success metrics
+    logger.info(f"[EXTRACT] SUCCESS: {filename} -> {len(original_text)} chars, {_similarity_label(similarity_score)} similarity")
+    
+    return response
+
+@app.post("/extract", openapi_extra=_upload_body('file'))
+async def extract_document(
+    request: Request,
+    verification: Optional[str] = None,
+    segments: bool = False
+) -> Dict[str, Any]:
     """
     Universal document extraction with high fidelity and structured logging.
     
@@ -198,110 +470,52 @@ async def extract_document(file: UploadFile = File(...)) -> Dict[str, Any]:
     - success: bool
     - original_text: str
     - markdown: str
-    - similarity: float (0.0-1.0)
+    - similarity: float (0.0-1.0), null with verification=off
     - extraction_method: str
     - ocr_used: bool
     - mime_type: str
     - processing_time: float (seconds)
     - metadata: dict
+    - segments: list, only with segments=true
+    
+    `verification` (off, structural, sampled, full) picks how the markdown
+    is checked against the text; the default comes from
+    SIMILARITY_VERIFICATION_BY_TYPE / SIMILARITY_VERIFICATION, and the level
+    that ran is reported in metadata.verification.
+    
+    `segments=true` also returns the markdown split for embeddings: heading
+    aware segments of at most SEGMENT_MAX_TOKENS estimated tokens, each with
+    index, text, start/end character offsets in the markdown, tokens, the
+    heading path and the pages/slides/chapters it spans (see core.segments).
+    
+    With PROFILE_HEADER_ENABLED, `X-Profile: 1` profiles the extraction and
+    reports where the profile was saved in metadata.profile.
     """
     
     start_time = time.time()
     
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Filename is required")
+    _check_verification(verification)
     
-    logger.info(f"[EXTRACT] Starting extraction for: {file.filename}")
+    # Stream the upload to a spool file, hashing and sniffing it on the way
+    upload = await _spool_request_file(request, "[EXTRACT]")
+    logger.info(f"[EXTRACT] Starting extraction for: {upload.filename}")
+    logger.info(f"[EXTRACT] File size: {upload.size} bytes")
     
     try:
-        # Read file content
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        logger.info(f"[EXTRACT] File size: {file_size} bytes")
-        
-        # Enhanced MIME type detection
-        mime_type = detect_mime_type(file_content, file.filename)
-        logger.info(f"[EXTRACT] Detected MIME type: {mime_type}")
-        
-        # Validate supported format
-        if mime_type not in extractors:
-            logger.error(f"[EXTRACT] Unsupported format: {mime_type}")
-            raise HTTPException(
-                status_code=415, 
-                detail=f"Unsupported file type: {mime_type}. Supported: {list(extractors.keys())}"
-            )
-        
-        # Save to temporary file with proper naming
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{file.filename}") as tmp_file:
-            tmp_file.write(file_content)
-            tmp_file_path = tmp_file.name
+        return await process_document(
+            upload,
+            start_time,
+            profile_header=request.headers.get(profiling.PROFILE_HEADER),
+            verification=verification,
+            segments=segments
+        )
         
-        try:
-            logger.info(f"[EXTRACT] Using extractor: {extractors[mime_type].__class__.__name__}")
-            
-            # Extract text using appropriate extractor
-            extractor = extractors[mime_type]
-            extraction_result = await extractor.extract(tmp_file_path, file.filename)
-            
-            original_text = extraction_result['text']
-            extraction_method = extraction_result['method']
-            ocr_used = extraction_result.get('ocr_used', False)
-            
-            logger.info(f"[EXTRACT] Extracted {len(original_text)} characters using {extraction_method}")
-            
-            if ocr_used:
-                logger.info(f"[EXTRACT] OCR was used for text extraction")
-            
-            # Enhanced markdown conversion
-            markdown_content = convert_to_markdown(original_text, file.filename)
-            
-            # Calculate high-precision similarity
-            similarity_score = similarity_calc.calculate_similarity(
-                original_text, 
-                markdown_content
-            )
-            
-            processing_time = time.time() - start_time
-            
-            logger.info(f"[EXTRACT] Processing complete: similarity={similarity_score:.4f}, time={processing_time:.2f}s")
-            
-            # Prepare comprehensive response
-            response = {
-                'success': True,
-                'original_text': original_text,
-                'markdown': markdown_content,
-                'similarity': similarity_score,
-                'extraction_method': extraction_method,
-                'ocr_used': ocr_used,
-                'mime_type': mime_type,
-                'processing_time': processing_time,
-                'metadata': {
-                    'filename': file.filename,
-                    'file_size': file_size,
-                    'text_length': len(original_text),
-                    'markdown_length': len(markdown_content),
-                    'extractor_class': extractor.__class__.__name__,
-                    'extraction_timestamp': datetime.utcnow().isoformat()
-                }
-            }
-            
-            # Log success metrics
-            logger.info(f"[EXTRACT] SUCCESS: {file.filename} -> {len(original_text)} chars, {similarity_score:.4f} similarity")
-            
-            return response
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
-                
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
         processing_time = time.time() - start_time
-        error_msg = f"Extraction failed for {file.filename}: {str(e)}"
+        error_msg = f"Extraction failed for {upload.filename}: {str(e)}"
         
         logger.error(f"[EXTRACT] ERROR: {error_msg} (time: {processing_time:.2f}s)")
         logger.exception("Full error traceback:")
@@ -311,19 +525,528 @@ async def extract_document(file: UploadFile = File(...)) -> Dict[str, Any]:
             detail={
                 "error": error_msg,
                 "processing_time": processing_time,
-                "file_size": len(file_content) if 'file_content' in locals() else 0
+                "file_size": upload.size
             }
         )
+    finally:
+        # Clean up spooled upload
+        upload.cleanup()
+
+def _stream_record(record: Dict[str, Any], stream_format: str) -> str:
+    """One streamed record as an NDJSON line or a server-sent event."""
+    data = json.dumps(record, ensure_ascii=False)
+    if stream_format == 'sse':
+        return f"event: {record['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+async def _stream_cached(cached: Dict[str, Any], start_time: float, timings: StageTimings, segments: bool):
+    """Stream records for a cached /extract response: the whole document as one chunk."""
+    response = cached['value']
+    metadata = response['metadata']
+    segment_records = []
+    if segments:
+        with timings.stage('segments'):
+            segment_records = await executor.run_blocking(segment_markdown, response['markdown'])
+    timings.add('total', time.time() - start_time)
+    metrics.record_document(response['mime_type'], 'cache_hit', timings)
+    yield {
+        'type': 'chunk',
+        'index': 0,
+        'unit': 'document',
+        'number': 1,
+        'text': response['original_text'],
+        'markdown': response['markdown'],
+        'similarity': response['similarity'],
+        'metadata': {'text_length': metadata['text_length'], 'markdown_length': metadata['markdown_length']}
+    }
+    for segment in segment_records:
+        yield {'type': 'segment', **segment}
+    yield {
+        'type': 'summary',
+        'success': True,
+        'chunks': 1,
+        'similarity': response['similarity'],
+        'extraction_method': response['extraction_method'],
+        'ocr_used': response['ocr_used'],
+        'mime_type': response['mime_type'],
+        'processing_time': time.time() - start_time,
+        'metadata': {
+            **metadata,
+            **({'segment_count': len(segment_records)} if segments else {}),
+            'cache': {'hit': True, 'tier': cached['tier'], **_cache_counters()},
+            'timings': timings.rounded()
+        }
+    }
+
+async def _stream_chunks(
+    chunks,
+    upload: SpooledUpload,
+    mime_type: str,
+    extractor,
+    start_time: float,
+    timings: StageTimings,
+    verification: str,
+    segments: bool
+):
+    """Convert and verify extractor chunks one at a time, then summarize."""
+    filename = upload.filename
+    converter = MarkdownConverter(filename)
+    segmenter = Segmenter() if segments else None
+    segment_count = 0
+    index = 0
+    text_length = markdown_length = 0
+    weighted_similarity = 0.0
+    verified_length = 0
+    extraction_method = None
+    ocr_used = False
+    pages = ocr_pages = 0
+    
+    # Time spent waiting for the extractor, which includes any backpressure from a slow client
+    waiting = time.perf_counter()
+    async for chunk in chunks:
+        timings.add('extract', time.perf_counter() - waiting)
+        text = chunk.pop('text', '') or ''
+        markdown = ''
+        similarity = None
+        completed = []
+        if text:
+            # Chunks are separated by a blank line, as in the /extract text. The
+            # newline after each chunk completes its last line, so only the
+            # blank line itself is left to feed before the next one.
+            separator = "\n\n" if text_length else ""
+            with timings.stage('markdown'):
+                lines = await executor.run_blocking(converter.feed, separator[1:] + text + "\n")
+            markdown = "\n".join(lines)
+            if segmenter is not None:
+                with timings.stage('segments'):
+                    completed = await executor.run_blocking(segmenter.feed, lines)
+            with timings.stage('similarity'):
+                details = await executor.run_blocking(
+                    similarity_calc.verify, text, markdown, verification
+                )
+            similarity = details['similarity']
+            if similarity is not None:
+                weighted_similarity += similarity * len(text)
+                verified_length += len(text)
+            text_length += len(text) + len(separator)
+            markdown_length += len(markdown) + (1 if markdown_length and markdown else 0)
+        
+        # An OCR'd chunk decides the method, as in the whole-document result
+        if chunk.get('ocr_used'):
+            ocr_used = True
+            extraction_method = chunk.get('method', extraction_method)
+        elif not ocr_used:
+            extraction_method = chunk.get('method', extraction_method)
+        if chunk.get('unit') == 'page':
+            pages += 1
+            ocr_pages += 1 if chunk.get('ocr_used') else 0
+        
+        yield {
+            'type': 'chunk',
+            'index': index,
+            'unit': chunk.pop('unit', 'document'),
+            'number': chunk.pop('number', index + 1),
+            'text': text,
+            'markdown': markdown,
+            'similarity': similarity,
+            'metadata': {**chunk, 'text_length': len(text), 'markdown_length': len(markdown)}
+        }
+        # Segments completed by this chunk follow it
+        for segment in completed:
+            yield {'type': 'segment', **segment}
+        segment_count += len(completed)
+        index += 1
+        waiting = time.perf_counter()
+    timings.add('extract', time.perf_counter() - waiting)
+    if segmenter is not None:
+        for segment in segmenter.close():
+            yield {'type': 'segment', **segment}
+            segment_count += 1
+    
+    similarity_score = weighted_similarity / verified_length if verified_length else None
+    if similarity_score is None and verification != 'off':
+        similarity_score = 0.0
+    processing_time = time.time() - start_time
+    timings.add('total', processing_time)
+    metrics.record_document(
+        mime_type, 'success', timings,
+        size=upload.size, pages=pages, ocr_used=ocr_used, ocr_pages=ocr_pages
+    )
+    logger.info(f"[STREAM] SUCCESS: {filename} -> {index} chunks, {text_length} chars, {_similarity_label(similarity_score)} similarity, time={processing_time:.2f}s")
+    yield {
+        'type': 'summary',
+        'success': True,
+        'chunks': index,
+        'similarity': similarity_score,
+        'extraction_method': extraction_method,
+        'ocr_used': ocr_used,
+        'mime_type': mime_type,
+        'processing_time': processing_time,
+        'metadata': {
+            'filename': filename,
+            'file_size': upload.size,
+            'text_length': text_length,
+            'markdown_length': markdown_length,
+            'extractor_class': extractor.__class__.__name__,
+            'similarity_method': 'per-chunk',
+            'verification': verification,
+            **({'segment_count': segment_count} if segments else {}),
+            'extraction_timestamp': datetime.utcnow().isoformat(),
+            'timings': timings.rounded()
+        }
+    }
+
+async def _stream_extraction(
+    records,
+    chunks,
+    upload: SpooledUpload,
+    mime_type: str,
+    stream_format: str,
+    start_time: float,
+    timings: StageTimings
+):
+    """Serialize stream records; a failure mid-stream becomes a final error record."""
+    sent = 0
+    try:
+        async for record in records:
+            if record['type'] == 'chunk':
+                sent += 1
+            yield _stream_record(record, stream_format)
+    except Exception as e:
+        logger.error(f"[STREAM] ERROR: Extraction failed for {upload.filename}: {str(e)}")
+        metrics.record_document(mime_type, 'error', timings)
+        yield _stream_record({
+            'type': 'error',
+            'success': False,
+            'error': f"Extraction failed for {upload.filename}: {str(e)}",
+            'chunks': sent,
+            'processing_time': time.time() - start_time
+        }, stream_format)
+    finally:
+        if chunks is not None:
+            await chunks.aclose()
+        upload.cleanup()
+
+@app.post("/extract/stream", openapi_extra=_upload_body('file'))
+async def extract_stream(
+    request: Request,
+    format: str = 'ndjson',
+    verification: Optional[str] = None,
+    segments: bool = False
+) -> StreamingResponse:
+    """
+    Streaming variant of /extract.
+    
+    Text is sent as the extractor produces it, one record per chunk (PDF
+    page, PPTX slide, EPUB chapter; other formats are a single chunk), so
+    neither side holds the whole document. `format` selects NDJSON (default)
+    or server-sent events (`sse`), `verification` the level each chunk is
+    checked at (see /extract). Records:
+    - type: "chunk", index, unit, number, text, markdown, similarity, metadata
+    - with segments=true, type: "segment" records (the /extract segments,
+      offsets in the concatenated markdown) after the chunk completing them
+    - a final type: "summary" record with the overall similarity (weighted
+      by chunk length), extraction_method, ocr_used and metadata,
+      or type: "error" if extraction fails part-way
+    """
+    start_time = time.time()
+    
+    if format not in ('ndjson', 'sse'):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
+    _check_verification(verification)
+    
+    upload = await _spool_request_file(request, "[STREAM]")
+    logger.info(f"[STREAM] Starting extraction for: {upload.filename}")
+    
+    chunks = None
+    timings = StageTimings()
+    timings.add('spool', upload.spool_seconds)
+    try:
+        with timings.stage('mime_detect'):
+            mime_type = detect_mime_type(upload.head, upload.filename, upload.path)
+        if mime_type not in extractors:
+            metrics.record_document(mime_type, 'unsupported', timings)
+            raise HTTPException(
+                status_code=415,
+                detail=f"Unsupported file type: {mime_type}. Supported: {list(extractors.keys())}"
+            )
+        with timings.stage('load_extractor'):
+            extractor = await executor.run_blocking(extractors.get, mime_type)
+        level = verification_level(mime_type, verification)
+        
+        cached = None
+        if result_cache.enabled:
+            with timings.stage('cache_lookup'):
+                cached = await executor.run_blocking(result_cache.get, _extraction_cache_key(upload, extractor, level))
+        if cached is not None:
+            logger.info(f"[STREAM] CACHE HIT ({cached['tier']}): {upload.filename}")
+            records = _stream_cached(cached, start_time, timings, segments)
+        else:
+            try:
+                chunks = executor.stream(mime_type, extractor, upload.path, upload.filename)
+            except ExecutorSaturatedError as e:
+                logger.warning(f"[STREAM] Rejected {upload.filename}: {e}")
+                metrics.record_document(mime_type, 'rejected', timings)
+                raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+            records = _stream_chunks(chunks, upload, mime_type, extractor, start_time, timings, level, segments)
+    except BaseException:
+        upload.cleanup()
+        raise
+    
+    return StreamingResponse(
+        _stream_extraction(records, chunks, upload, mime_type, format, start_time, timings),
+        media_type="text/event-stream" if format == 'sse' else "application/x-ndjson"
+    )
+
+async def process_document_when_ready(
+    upload: SpooledUpload,
+    start_time: float,
+    progress: Optional[ProgressCallback] = None,
+    verification: Optional[str] = None
+) -> Dict[str, Any]:
+    """process_document for background work: wait for room in the extraction queue instead of failing."""
+    return await process_document(upload, start_time, progress, verification=verification, wait_for_room=True)
+
+# Long-running extractions that outlive the HTTP request
+job_manager = JobManager(processor=process_document_when_ready)
+
+async def _extract_batch_item(index: int, upload: SpooledUpload, verification: Optional[str]) -> Dict[str, Any]:
+    """Process one batch document into an NDJSON record; failures become error records."""
+    start_time = time.time()
+    try:
+        response = await process_document_when_ready(upload, start_time, verification=verification)
+        return {'type': 'result', 'index': index, 'filename': upload.filename, **response}
+    except HTTPException as e:
+        return _batch_error(index, upload.filename, e.status_code, e.detail)
+    except Exception as e:
+        logger.error(f"[BATCH] ERROR: Extraction failed for {upload.filename}: {str(e)}")
+        return _batch_error(index, upload.filename, 500, f"Extraction failed for {upload.filename}: {str(e)}")
+
+def _batch_error(index: int, filename: str, status_code: int, error: Any) -> Dict[str, Any]:
+    return {
+        'type': 'result',
+        'index': index,
+        'filename': filename,
+        'success': False,
+        'status_code': status_code,
+        'error': error
+    }
+
+async def _stream_batch(
+    uploads: List[SpooledUpload],
+    errors: List[Dict[str, Any]],
+    concurrency: int,
+    verification: Optional[str] = None
+):
+    """
+    Schedule batch documents with at most `concurrency` in flight and yield
+    NDJSON records in completion order, followed by a summary record.
+    
+    Archives are expanded lazily, one member per free slot, so a large
+    archive never sits fully unpacked on disk.
+    """
+    start_time = time.time()
+    results: asyncio.Queue = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    next_index = len(errors)
+    
+    async def run_one(index: int, upload: SpooledUpload):
+        try:
+            await results.put(await _extract_batch_item(index, upload, verification))
+        finally:
+            upload.cleanup()
+            slots.release()
+    
+    def start(upload: SpooledUpload):
+        nonlocal next_index
+        task = asyncio.create_task(run_one(next_index, upload))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        next_index += 1
+    
+    async def schedule():
+        try:
+            await schedule_all()
+            while tasks:
+                await asyncio.gather(*list(tasks), return_exceptions=True)
+        finally:
+            results.put_nowait(None)
+    
+    async def schedule_all():
+        nonlocal next_index
+        for upload in uploads:
+            if not await executor.run_blocking(is_archive, upload):
+                await slots.acquire()
+                start(upload)
+                continue
+            
+            members = iter_archive(upload)
+            try:
+                while True:
+                    await slots.acquire()
+                    try:
+                        item = await executor.run_blocking(next, members, None)
+                    except BaseException:
+                        slots.release()
+                        raise
+                    if item is None:
+                        slots.release()
+                        break
+                    name, member, error = item
+                    if member is None:
+                        slots.release()
+                        await results.put(_batch_error(next_index, name, 413, error))
+                        next_index += 1
+                    else:
+                        start(member)
+            except Exception as e:
+                logger.error(f"[BATCH] Could not read archive {upload.filename}: {e}")
+                await results.put(_batch_error(next_index, upload.filename, 400, f"Invalid archive: {str(e)}"))
+                next_index += 1
+            finally:
+                members.close()
+                upload.cleanup()
+    
+    scheduler = asyncio.create_task(schedule())
+    succeeded = failed = 0
+    try:
+        for record in errors:
+            failed += 1
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+        
+        while True:
+            record = await results.get()
+            if record is None:
+                break
+            if record.get('success'):
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+        
+        await scheduler
+        processing_time = time.time() - start_time
+        logger.info(f"[BATCH] Complete: {succeeded} succeeded, {failed} failed, time={processing_time:.2f}s")
+        yield json.dumps({
+            'type': 'summary',
+            'total': succeeded + failed,
+            'succeeded': succeeded,
+            'failed': failed,
+            'processing_time': processing_time
+        }) + "\n"
+    finally:
+        # Client went away or something failed: stop scheduling and drop spool files
+        scheduler.cancel()
+        for task in list(tasks):
+            task.cancel()
+        for upload in uploads:
+            upload.cleanup()
+
+@app.post("/extract/batch", openapi_extra=_upload_body('files', many=True))
+async def extract_batch(
+    request: Request,
+    concurrency: Optional[int] = None,
+    verification: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Extract many documents in one request.
+    
+    Accepts any number of files, including ZIP/tar archives of documents.
+    Documents are scheduled across the extractor pools with at most
+    `concurrency` in flight (capped by BATCH_CONCURRENCY), and one NDJSON
+    record is streamed per document as soon as it finishes:
+    - type: "result", index, filename, plus the /extract response fields,
+      or success: false with status_code and error
+    - a final type: "summary" record with total/succeeded/failed counts
+    
+    `verification` applies to every document (see /extract).
+    """
+    _check_verification(verification)
+    limit = max(1, min(concurrency or config.BATCH_CONCURRENCY, config.BATCH_CONCURRENCY))
+    
+    # Files over MAX_UPLOAD_BYTES become error records; the body is capped at MAX_BATCH_BYTES
+    try:
+        parts = await spool_multipart(
+            request.stream(),
+            request.headers.get('content-type', ''),
+            'files',
+            max_total_bytes=config.MAX_BATCH_BYTES,
+            single=False
+        )
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        logger.error(f"[BATCH] Rejected batch: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    if not parts:
+        raise HTTPException(status_code=400, detail="At least one file is required")
+    logger.info(f"[BATCH] Starting batch of {len(parts)} uploads, concurrency={limit}")
+    
+    uploads: List[SpooledUpload] = []
+    errors: List[Dict[str, Any]] = []
+    for filename, upload, error in parts:
+        if upload is not None:
+            uploads.append(upload)
+        else:
+            errors.append(_batch_error(len(errors), filename, 413, error))
+    
+    return StreamingResponse(
+        _stream_batch(uploads, errors, limit, verification),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/jobs", status_code=202, openapi_extra=_upload_body('file'))
+async def create_job(request: Request) -> Dict[str, Any]:
+    """
+    Queue an extraction and return immediately.
+    
+    The document is processed in the background whether or not the client
+    stays connected; poll GET /jobs/{job_id} for progress and the result.
+    """
+    upload = await _spool_request_file(request, "[JOBS]")
+    
+    mime_type = detect_mime_type(upload.head, upload.filename, upload.path)
+    if mime_type not in extractors:
+        upload.cleanup()
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type: {mime_type}. Supported: {list(extractors.keys())}"
+        )
+    
+    try:
+        job_id = await job_manager.submit(upload)
+    except BaseException:
+        upload.cleanup()
+        raise
+    
+    return {
+        "job_id": job_id,
+        "status": "queued",
+        "mime_type": mime_type,
+        "status_url": f"/jobs/{job_id}"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, include_result: bool = True) -> Dict[str, Any]:
+    """Job status, progress (done/total in pages or documents) and, once finished, the /extract result."""
+    job = await job_manager.get(job_id, include_result=include_result)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a queued or running job. Finished jobs are left as they are."""
+    status = await job_manager.cancel(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return {"job_id": job_id, "status": status, "cancel_requested": True}
 
 @app.get("/formats")
 async def list_supported_formats():
     """List all supported file formats with their extractors."""
-    formats = {}
-    for mime_type, extractor in extractors.items():
-        formats[mime_type] = {
-            "extractor": extractor.__class__.__name__,
-            "description": getattr(extractor, 'description', 'No description available')
-        }
+    formats = extractors.supported()
     
     return {
         "supported_formats": formats,
@@ -0,0 +1,130 @@
+"""
+Result cache: the memory tier is an LRU bounded by compressed bytes, the
+SQLite tier expires entries after the TTL and evicts the least recently
+used ones over its byte budget, and disk hits are promoted to memory.
+"""
+import os
+import types
+
+import pytest
+
+from core import cache
+from core.cache import ResultCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', types.SimpleNamespace(time=clock))
+    return clock
+
+
+def response(seed: int) -> dict:
+    # Random text barely compresses, so every entry has about the same size
+    return {'markdown': os.urandom(600).hex() + str(seed), 'metadata': {'seed': seed}}
+
+
+def size(value: dict) -> int:
+    return len(cache._encode(value))
+
+
+def test_memory_lru_is_sized_by_compressed_bytes(clock):
+    a, b, c = response(1), response(2), response(3)
+    store = ResultCache(memory_bytes=size(a) + size(b) + 10, disk_path="", ttl_seconds=0)
+    store.put("a", a)
+    store.put("b", b)
+    assert store.stats()['memory_bytes'] == size(a) + size(b)
+
+    # Reading "a" makes "b" the least recently used entry
+    assert store.get("a") == {'value': a, 'tier': 'memory'}
+    store.put("c", c)
+    assert store.get("b") is None
+    assert store.get("a")['value'] == a
+    assert store.get("c")['value'] == c
+    assert store.stats()['memory_bytes'] == size(a) + size(c)
+
+    # Highly compressible responses are charged for their compressed size only
+    store.put("big", {'markdown': "x" * 100_000})
+    assert store.get("big") is not None
+
+    # An entry over the whole budget is not kept, and evicts nothing
+    store.put("huge", {'markdown': os.urandom(5000).hex()})
+    assert store.get("huge") is None
+    assert store.stats()['memory_entries'] == 2
+
+
+def test_memory_ttl(clock):
+    store = ResultCache(memory_bytes=1_000_000, disk_path="", ttl_seconds=60)
+    store.put("a", response(1))
+    clock.now += 59
+    assert store.get("a") is not None
+    clock.now += 2
+    assert store.get("a") is None
+    assert store.stats()['memory_bytes'] == 0
+
+
+def test_disk_ttl_expiry(tmp_path, clock):
+    store = ResultCache(memory_bytes=0, disk_path=str(tmp_path / "cache.db"), ttl_seconds=60)
+    store.put("a", response(1))
+    clock.now += 30
+    store.put("b", response(2))
+
+    clock.now += 31
+    assert store.get("a") is None
+    assert store.get("b")['tier'] == 'disk'
+
+    # Writes sweep expired rows too
+    clock.now += 30
+    store.put("c", response(3))
+    rows = store._disk._conn.execute("SELECT key FROM results").fetchall()
+    assert rows == [("c",)]
+    store.close()
+
+
+def test_disk_lru_eviction(tmp_path, clock):
+    a, b, c = response(1), response(2), response(3)
+    store = ResultCache(
+        memory_bytes=0, disk_path=str(tmp_path / "cache.db"), disk_bytes=size(a) + size(b) + 10, ttl_seconds=0
+    )
+    store.put("a", a)
+    clock.now += 1
+    store.put("b", b)
+    clock.now += 1
+    # Reading "a" makes "b" the least recently used row
+    assert store.get("a")['value'] == a
+    clock.now += 1
+    store.put("c", c)
+
+    assert store.get("b") is None
+    assert store.get("a")['value'] == a
+    assert store.get("c")['value'] == c
+    total = store._disk._conn.execute("SELECT SUM(size) FROM results").fetchone()[0]
+    assert total == size(a) + size(c)
+    store.close()
+
+
+def test_disk_hits_are_promoted_to_memory(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    value = response(1)
+    writer = ResultCache(memory_bytes=1_000_000, disk_path=path, ttl_seconds=0)
+    writer.put("a", value)
+    writer.close()
+
+    # A fresh process only has the disk tier to go on
+    reader = ResultCache(memory_bytes=1_000_000, disk_path=path, ttl_seconds=0)
+    assert reader.get("a") == {'value': value, 'tier': 'disk'}
+    assert reader.get("a") == {'value': value, 'tier': 'memory'}
+    assert reader.get("missing") is None
+
+    stats = reader.stats()
+    assert (stats['hits'], stats['misses'], stats['disk_hits'], stats['memory_hits']) == (2, 1, 1, 1)
+    assert stats['memory_bytes'] == size(value)
+    reader.close()
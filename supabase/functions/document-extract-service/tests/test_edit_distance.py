@@ -0,0 +1,121 @@
+"""
+Edit distance: the bit-parallel Levenshtein matches a plain dynamic
+programming reference (single and multi-word bit vectors, with and without
+a cutoff), the frequency bound never exceeds the true distance, and the
+chunked and sampled estimates bracket the exact distance as documented.
+"""
+import random
+
+from extractors.edit_distance import (
+    aligned_chunks, estimate_levenshtein, frequency_lower_bound, levenshtein
+)
+
+
+def reference(s1: str, s2: str) -> int:
+    previous = list(range(len(s2) + 1))
+    for i, a in enumerate(s1, 1):
+        current = [i]
+        for j, b in enumerate(s2, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b)))
+        previous = current
+    return previous[-1]
+
+
+def random_pairs(count: int, max_length: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        alphabet = "abcd" if rng.random() < 0.5 else "abcdefghijklmnopqrstuvwxyz "
+        s1 = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        # Half the pairs are light edits of each other, with shared affixes to strip
+        if rng.random() < 0.5:
+            s2 = list(s1)
+            for _ in range(rng.randint(0, 10)):
+                position = rng.randint(0, len(s2))
+                operation = rng.random()
+                if operation < 0.33 and position < len(s2):
+                    del s2[position]
+                elif operation < 0.66 and position < len(s2):
+                    s2[position] = rng.choice(alphabet)
+                else:
+                    s2.insert(position, rng.choice(alphabet))
+            s2 = "".join(s2)
+        else:
+            s2 = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+        yield s1, s2
+
+
+def edited(text: str, every: int, seed: int, offset: int = 0) -> str:
+    rng = random.Random(seed)
+    chars = list(text)
+    for position in range(offset, len(chars), every):
+        chars[position] = rng.choice("xyz")
+    return "".join(chars)
+
+
+def test_levenshtein_matches_reference():
+    for s1, s2 in random_pairs(300, 40, seed=1):
+        assert levenshtein(s1, s2) == reference(s1, s2), (s1, s2)
+
+
+def test_levenshtein_multi_word_vectors():
+    # Both strings well over 64 characters after affix stripping
+    for s1, s2 in random_pairs(60, 300, seed=2):
+        assert levenshtein(s1, s2) == reference(s1, s2)
+    assert levenshtein("a" * 200, "b" * 130) == 200
+
+
+def test_levenshtein_cutoff():
+    for s1, s2 in random_pairs(300, 150, seed=3):
+        distance = reference(s1, s2)
+        for max_distance in (0, 1, 5, distance - 1, distance, distance + 3):
+            if max_distance < 0:
+                continue
+            # The exact distance when within the cutoff, otherwise max_distance + 1
+            assert levenshtein(s1, s2, max_distance) == min(distance, max_distance + 1)
+
+
+def test_frequency_lower_bound():
+    for s1, s2 in random_pairs(300, 150, seed=4):
+        assert frequency_lower_bound(s1, s2) <= reference(s1, s2)
+    assert frequency_lower_bound("abc", "abc") == 0
+    assert frequency_lower_bound("aaaa", "b") == 4
+
+
+def test_aligned_chunks_cover_both_strings():
+    rng = random.Random(5)
+    original = "".join(rng.choice("abcdefghij ") for _ in range(10000))
+    # Substitutions clear of the chunk boundaries, plus shifts within the anchor search window
+    revised = edited(original, 250, seed=6, offset=50)
+    revised = revised[:3000] + "inserted text " * 8 + revised[3000:7000] + revised[7150:]
+
+    chunks = aligned_chunks(original, revised, 1000)
+    assert len(chunks) == 10
+    assert "".join(a for a, _ in chunks) == original
+    assert "".join(b for _, b in chunks) == revised
+    # Anchored boundaries keep the chunk distances close to the true distance
+    exact = levenshtein(original, revised)
+    chunked = sum(levenshtein(a, b) for a, b in chunks)
+    assert exact <= chunked <= exact * 1.5
+
+
+def test_estimate_methods_bracket_the_exact_distance():
+    rng = random.Random(7)
+    original = "".join(rng.choice("abcdefghij ") for _ in range(20000))
+    revised = edited(original, 50, seed=8)
+    exact = levenshtein(original, revised)
+
+    estimate = estimate_levenshtein(original, revised)
+    assert estimate == {'distance': exact, 'method': 'exact', 'error_bound': 0.0}
+
+    # Chunked: an upper bound, within error_bound of the exact distance
+    estimate = estimate_levenshtein(original, revised, exact_max_chars=5000, chunk_size=1000)
+    assert estimate['method'] == 'chunked'
+    assert estimate['distance'] - estimate['error_bound'] <= exact <= estimate['distance']
+
+    # Sampled: the interval holds the exact distance
+    estimate = estimate_levenshtein(
+        original, revised, exact_max_chars=5000, chunk_size=200, sample_above_chars=10000, sample_chunks=40
+    )
+    assert estimate['method'] == 'sampled'
+    assert abs(estimate['distance'] - exact) <= estimate['error_bound']
+    assert estimate['distance'] >= frequency_lower_bound(original, revised)
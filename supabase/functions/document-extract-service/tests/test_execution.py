@@ -0,0 +1,104 @@
+"""
+Executor slots: closing a stream early (a client disconnect) or cancelling
+a run (a cancelled job) keeps its queue slot and format concurrency slot
+until the worker doing the extraction has actually stopped.
+"""
+import asyncio
+import threading
+
+from core.execution import ExtractionExecutor
+from extractors.base_extractor import BaseExtractor
+
+
+class GatedExtractor(BaseExtractor):
+    """Yields one chunk, then blocks until released."""
+
+    execution_mode = 'thread'
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def extract_sync(self, file_path, filename):
+        raise NotImplementedError
+
+    def iter_chunks(self, file_path, filename):
+        yield {'text': 'first', 'unit': 'page', 'number': 1}
+        self.gate.wait(5)
+        yield {'text': 'second', 'unit': 'page', 'number': 2}
+
+
+def test_closed_stream_keeps_its_slot_until_the_worker_stops():
+    extractor = GatedExtractor()
+
+    async def run():
+        executor = ExtractionExecutor(process_workers=0, thread_workers=2, format_limits={'text/test': 1})
+        executor.start()
+        try:
+            stream = executor.stream('text/test', extractor, '/dev/null', 'doc')
+            assert (await stream.__anext__())['text'] == 'first'
+            await stream.aclose()
+
+            # The worker is still inside iter_chunks
+            assert executor.queue_depth == 1
+            assert executor._semaphore('text/test').locked()
+
+            extractor.gate.set()
+            for _ in range(100):
+                if executor.queue_depth == 0:
+                    break
+                await asyncio.sleep(0.02)
+            assert executor.queue_depth == 0
+            assert not executor._semaphore('text/test').locked()
+        finally:
+            extractor.gate.set()
+            await executor.shutdown()
+
+    asyncio.run(run())
+
+
+class GatedDocumentExtractor(GatedExtractor):
+    """Blocks inside extract_sync until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+
+    def extract_sync(self, file_path, filename):
+        self.started.set()
+        self.gate.wait(5)
+        return {'text': 'done', 'method': 'gated'}
+
+
+def test_cancelled_run_keeps_its_slot_until_the_worker_stops():
+    extractor = GatedDocumentExtractor()
+
+    async def run():
+        executor = ExtractionExecutor(process_workers=0, thread_workers=2, format_limits={'text/test': 1})
+        executor.start()
+        try:
+            # A cancelled job cancels the task awaiting executor.run
+            task = asyncio.create_task(executor.run('text/test', extractor, '/dev/null', 'doc'))
+            while not extractor.started.is_set():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+            # The worker is still inside extract_sync
+            assert executor.queue_depth == 1
+            assert executor._semaphore('text/test').locked()
+
+            extractor.gate.set()
+            for _ in range(100):
+                if executor.queue_depth == 0:
+                    break
+                await asyncio.sleep(0.02)
+            assert executor.queue_depth == 0
+            assert not executor._semaphore('text/test').locked()
+        finally:
+            extractor.gate.set()
+            await executor.shutdown()
+
+    asyncio.run(run())
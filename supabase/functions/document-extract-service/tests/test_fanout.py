@@ -0,0 +1,122 @@
+"""
+Fan-out tests: documents split by plan_parts and extracted part by part must
+come back exactly as the serial extract_sync output, whatever order the parts
+finish in.
+"""
+import asyncio
+import time
+
+import pytest
+
+from benchmarks import corpus
+from core import config
+from core.execution import ExtractionExecutor
+from extractors import base_extractor
+from extractors.base_extractor import split_ranges
+from extractors.epub_extractor import EPUBExtractor
+from extractors.pdf_extractor import PDFExtractor
+from extractors.pptx_extractor import PPTXExtractor
+
+EXTRACTORS = {
+    'pdf': PDFExtractor,
+    'pptx': PPTXExtractor,
+    'epub': EPUBExtractor,
+}
+
+
+class SlowFirstPartsPPTX(PPTXExtractor):
+    """Earlier slide ranges finish last."""
+
+    def extract_part(self, file_path, filename, part):
+        time.sleep(0.05 / part[0])
+        return super().extract_part(file_path, filename, part)
+
+
+@pytest.fixture(autouse=True)
+def one_unit_per_part(monkeypatch):
+    monkeypatch.setattr(config, 'PDF_MIN_PAGES_PER_PART', 1)
+    monkeypatch.setattr(config, 'PPTX_MIN_SLIDES_PER_PART', 1)
+    monkeypatch.setattr(config, 'EPUB_MIN_CHAPTERS_PER_PART', 1)
+
+
+def document(tmp_path, name: str, size: int) -> str:
+    return corpus.generate(str(tmp_path), [name], size, seed=3)[name]
+
+
+def test_split_ranges():
+    assert split_ranges(10, 3, 1) == [(1, 4), (5, 8), (9, 10)]
+    assert split_ranges(10, 8, 4) == [(1, 5), (6, 10)]
+    assert split_ranges(7, 8, 4) is None
+    assert split_ranges(1, 8, 1) is None
+
+
+@pytest.mark.parametrize('name', sorted(EXTRACTORS))
+def test_parts_merge_to_serial_output(tmp_path, name):
+    extractor = EXTRACTORS[name]()
+    path = document(tmp_path, name, 10)
+    expected = extractor.extract_sync(path, 'doc')
+
+    parts = extractor.plan_parts(path, 'doc', 4)
+    assert len(parts) == 4
+    assert parts[0][0] == 1
+    assert all(part[0] == previous[1] + 1 for previous, part in zip(parts, parts[1:]))
+
+    # Extract back to front, merge in plan order
+    results = {part: extractor.extract_part(path, 'doc', part) for part in reversed(parts)}
+    merged = extractor.merge_parts(path, 'doc', [results[part] for part in parts])
+    assert merged == expected
+
+
+@pytest.mark.parametrize('name', ['pptx', 'epub'])
+def test_parallel_switch(tmp_path, monkeypatch, name):
+    extractor = EXTRACTORS[name]()
+    monkeypatch.setattr(config, f'{name.upper()}_PARALLEL', False)
+    assert extractor.plan_parts(document(tmp_path, name, 9), 'doc', 4) is None
+
+
+def test_executor_keeps_slide_order(tmp_path):
+    path = document(tmp_path, 'pptx', 12)
+    extractor = SlowFirstPartsPPTX()
+    expected = extractor.extract_sync(path, 'deck.pptx')
+    progress = []
+
+    async def run():
+        executor = ExtractionExecutor(process_workers=2, mp_start_method='fork')
+        executor.start()
+        try:
+            return await executor.run(
+                corpus.FORMATS['pptx'][1], extractor, path, 'deck.pptx',
+                lambda done, total, unit: progress.append((done, total, unit))
+            )
+        finally:
+            await executor.shutdown()
+
+    assert asyncio.run(run()) == expected
+    assert progress[0] == (0, 12, 'slides')
+    assert progress[-1] == (12, 12, 'slides')
+    assert len(progress) == 5
+
+
+@pytest.mark.parametrize('process_workers', [0, 2])
+def test_executor_reports_pdf_pages(tmp_path, monkeypatch, process_workers):
+    monkeypatch.setattr(base_extractor, 'PROGRESS_INTERVAL', 0)
+    path = document(tmp_path, 'pdf', 10)
+    progress = []
+
+    async def run():
+        executor = ExtractionExecutor(process_workers=process_workers, mp_start_method='fork')
+        executor.start()
+        try:
+            return await executor.run(
+                corpus.FORMATS['pdf'][1], PDFExtractor(), path, 'doc.pdf',
+                lambda done, total, unit: progress.append((done, total, unit))
+            )
+        finally:
+            await executor.shutdown()
+
+    asyncio.run(run())
+    pages = [done for done, total, unit in progress if unit == 'pages']
+    # Every page is reported as it completes, not just whole parts or the document
+    assert set(pages) == set(range(11))
+    assert pages == sorted(pages)
+    assert progress[-1] == (10, 10, 'pages')
@@ -0,0 +1,23 @@
+"""
+MIME sniffing: PDF headers are recognized at the start of a file or after
+a binary preamble, while text that merely mentions "%PDF" keeps its own
+type.
+"""
+from core.fileaccess import detect_mime_type, is_pdf_header
+
+
+def test_pdf_header():
+    assert is_pdf_header(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+    assert is_pdf_header(b"\r\n  %PDF-1.4\n")
+    assert is_pdf_header(b"\x00\x11MacBinary\x00" + b"\x00" * 100 + b"%PDF-1.3\n")
+    assert not is_pdf_header(b"%PDF")
+    assert not is_pdf_header(b"Files starting with %PDF-1.4 are PDFs")
+    assert not is_pdf_header(b"\x00" * 2000 + b"%PDF-1.4")
+
+
+def test_text_mentioning_pdf_keeps_its_type():
+    assert detect_mime_type(b"%PDF-1.5\n1 0 obj", "scan.bin") == 'application/pdf'
+    assert detect_mime_type(b"{\\rtf1\\ansi The header is %PDF-1.4.}", "notes.rtf") == 'application/rtf'
+    assert detect_mime_type(b"<!DOCTYPE html><p>%PDF-1.4 header</p>", "page") == 'text/html'
+    assert detect_mime_type(b"Every PDF starts with %PDF-1.x", "notes.txt") == 'text/plain'
+    assert detect_mime_type(b"Every PDF starts with %PDF-1.x", "notes") == 'application/octet-stream'
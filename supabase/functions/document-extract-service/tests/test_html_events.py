@@ -0,0 +1,74 @@
+"""
+HTML event extraction: the lxml target parser yields the same blocks as the
+BeautifulSoup tree extraction (which orders lists and tables last and drops
+the spaces around inline tags) for headings, paragraphs with nested inline
+tags, lists and tables, skips script and style content, and does not depend
+on where the feed chunks are cut.
+"""
+import re
+from collections import Counter
+
+from extractors.html_events import html_blocks
+from extractors.html_extractor import HTMLExtractor
+
+DOCUMENT = """<!DOCTYPE html>
+<html><head>
+<title>Protocolo de Sepse</title>
+<meta charset="utf-8">
+<style>p { color: red; } .hidden { display: none }</style>
+<script>var dose = "não deve aparecer";</script>
+</head>
+<body>
+<h1>Avaliação inicial</h1>
+<p>Coletar <b>hemograma</b> e <i>lactato <span>sérico</span></i> na primeira hora.</p>
+<h2>Conduta</h2>
+<p>Iniciar antibiótico<script>document.write("oculto")</script> após culturas.</p>
+<ul>
+<li>Ceftriaxona <em>2 g</em> IV</li>
+<li>Cristaloide 30 ml/kg</li>
+</ul>
+<ol><li>Reavaliar em 6 horas</li></ol>
+<table>
+<tr><th>Exame</th><th>Alvo</th></tr>
+<tr><td>Lactato</td><td><b>&lt; 2</b> mmol/L</td></tr>
+</table>
+<h3>Observações</h3>
+<p>Registrar <a href="#">horário</a> da primeira dose.</p>
+</body></html>
+"""
+
+
+def squashed(blocks):
+    return Counter(re.sub(r'\s+', '', block) for block in blocks)
+
+
+def test_events_and_tree_give_the_same_blocks(tmp_path):
+    path = tmp_path / "protocolo.html"
+    path.write_text(DOCUMENT, encoding="utf-8")
+    extractor = HTMLExtractor()
+
+    events, _ = extractor._extract_events(str(path))
+    tree, _ = extractor._extract_tree(str(path))
+    assert squashed(events.split("\n\n")) == squashed(tree.split("\n\n"))
+
+    blocks = events.split("\n\n")
+    assert blocks[:3] == [
+        "# Protocolo de Sepse",
+        "## Avaliação inicial",
+        "Coletar hemograma e lactato sérico na primeira hora.",
+    ]
+    assert "- Ceftriaxona 2 g IV" in blocks
+    assert "- Reavaliar em 6 horas" in blocks
+    assert "Exame | Alvo" in blocks
+    assert "Lactato | < 2 mmol/L" in blocks
+    assert "#### Observações" in blocks
+    assert "Iniciar antibiótico após culturas." in blocks
+    assert "não deve aparecer" not in events and "oculto" not in events and "color" not in events
+
+
+def test_blocks_do_not_depend_on_chunking():
+    whole = html_blocks([DOCUMENT])
+    for size in (1, 7, 64):
+        pieces = html_blocks(DOCUMENT[start:start + size] for start in range(0, len(DOCUMENT), size))
+        assert pieces.blocks == whole.blocks
+        assert pieces.title == whole.title == "Protocolo de Sepse"
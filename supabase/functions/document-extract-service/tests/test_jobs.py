@@ -0,0 +1,128 @@
+"""
+Job lifecycle: submitted jobs run and keep their progress and result,
+queued and running jobs can be cancelled, claims never hand one job to two
+stores sharing the database, and only jobs whose owner stopped
+heartbeating are requeued.
+"""
+import asyncio
+import threading
+import time
+
+from core import jobs
+from core.jobs import JobManager, JobStore
+from core.upload import SpooledUpload
+
+
+def upload(tmp_path, name: str = "doc.pdf") -> SpooledUpload:
+    path = tmp_path / f"spool_{name}"
+    path.write_bytes(b"%PDF-1.4 test")
+    return SpooledUpload(str(path), name, 13, "0" * 64, b"%PDF-1.4")
+
+
+async def wait_for(manager: JobManager, job_id: str, status: str, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await manager.get(job_id)
+        if job['status'] == status or time.monotonic() > deadline:
+            return job
+        await asyncio.sleep(0.02)
+
+
+def test_job_runs_with_progress_and_result(tmp_path):
+    async def processor(spooled, start_time, progress):
+        for page in range(1, 4):
+            progress(page, 3, 'pages')
+            await asyncio.sleep(0.01)
+        return {'markdown': f"# {spooled.filename}"}
+
+    async def run():
+        manager = JobManager(processor, jobs_dir=str(tmp_path / "jobs"), workers=1)
+        await manager.start()
+        try:
+            job_id = await manager.submit(upload(tmp_path))
+            return await wait_for(manager, job_id, jobs.SUCCEEDED)
+        finally:
+            await manager.shutdown()
+
+    job = asyncio.run(run())
+    assert job['status'] == jobs.SUCCEEDED
+    assert job['progress'] == {'done': 3, 'total': 3, 'unit': 'pages'}
+    assert job['result'] == {'markdown': "# doc.pdf"}
+
+
+def test_cancel_running_and_queued_jobs(tmp_path):
+    started = asyncio.Event()
+
+    async def processor(spooled, start_time, progress):
+        started.set()
+        await asyncio.sleep(30)
+
+    async def run():
+        manager = JobManager(processor, jobs_dir=str(tmp_path / "jobs"), workers=1)
+        await manager.start()
+        try:
+            running = await manager.submit(upload(tmp_path, "a.pdf"))
+            await asyncio.wait_for(started.wait(), 5)
+            queued = await manager.submit(upload(tmp_path, "b.pdf"))
+            assert await manager.cancel(queued) == jobs.CANCELLED
+            await manager.cancel(running)
+            return await wait_for(manager, running, jobs.CANCELLED), await manager.get(queued)
+        finally:
+            await manager.shutdown()
+
+    running, queued = asyncio.run(run())
+    assert running['status'] == jobs.CANCELLED
+    assert queued['status'] == jobs.CANCELLED
+
+
+def test_claims_are_exclusive_across_stores(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    seed = JobStore(path)
+    for index in range(200):
+        seed.add(f"job{index}", upload(tmp_path, f"{index}.pdf"))
+
+    claimed = []
+
+    def claim(owner: str):
+        store = JobStore(path)
+        while True:
+            row = store.claim_next(owner)
+            if row is None:
+                break
+            claimed.append(row['id'])
+            assert row['status'] == jobs.RUNNING and row['owner'] == owner
+        store.close()
+
+    threads = [threading.Thread(target=claim, args=(f"worker{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(f"job{index}" for index in range(200))
+    seed.close()
+
+
+def test_only_stale_jobs_are_requeued(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    live, other = JobStore(path), JobStore(path)
+    live.add("alive", upload(tmp_path, "a.pdf"))
+    live.add("dead", upload(tmp_path, "b.pdf"))
+    assert live.claim_next("live")['id'] == "alive"
+    assert live.claim_next("crashed")['id'] == "dead"
+
+    # Another process starting up leaves the job of a heartbeating owner alone
+    time.sleep(0.2)
+    live.heartbeat("live")
+    assert other.requeue_stale(0.1) == 1
+    assert other.get("alive")['status'] == jobs.RUNNING
+    assert other.get("dead")['status'] == jobs.QUEUED
+
+    # A requeued and reclaimed job cannot be finished by its previous owner
+    assert other.claim_next("other")['id'] == "dead"
+    assert not live.finish("dead", "crashed", jobs.SUCCEEDED, {'markdown': ''})
+    assert other.finish("dead", "other", jobs.SUCCEEDED, {'markdown': ''})
+
+    assert live.release("live") == 1
+    assert other.get("alive")['status'] == jobs.QUEUED
+    live.close()
+    other.close()
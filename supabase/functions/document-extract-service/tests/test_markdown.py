@@ -0,0 +1,74 @@
+"""
+Golden-file tests for core.markdown.
+
+Each tests/golden/<name>.txt is converted with its file name as the document
+name and compared with <name>.md, which was produced by the converter
+main.py shipped before the single-pass rewrite.
+"""
+import glob
+import os
+import random
+
+import pytest
+
+from core.markdown import MarkdownConverter, convert_line, convert_to_markdown, iter_markdown
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden')
+SAMPLES = sorted(glob.glob(os.path.join(GOLDEN_DIR, '*.txt')))
+
+
+def read(path: str) -> str:
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+@pytest.fixture(params=SAMPLES, ids=os.path.basename)
+def sample(request):
+    path = request.param
+    return os.path.basename(path), read(path), read(path[:-4] + '.md')
+
+
+def test_matches_golden(sample):
+    filename, text, expected = sample
+    assert convert_to_markdown(text, filename) == expected
+
+
+def test_incremental_matches_golden(sample):
+    filename, text, expected = sample
+    rng = random.Random(filename)
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(len(text) + 1), min(5, len(text) + 1)))
+        chunks = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert '\n'.join(iter_markdown(chunks, filename)) == expected
+
+
+def test_incremental_by_line(sample):
+    filename, text, expected = sample
+    converter = MarkdownConverter(filename)
+    lines = []
+    for line in text.splitlines(keepends=True):
+        lines.extend(converter.feed(line))
+    lines.extend(converter.close())
+    assert '\n'.join(lines) == expected
+
+
+@pytest.mark.parametrize('text', ['', '   ', '\n\n', ' \t\r\n  \n'])
+def test_blank_text(text):
+    assert convert_to_markdown(text, 'blank.txt') == ''
+    assert list(iter_markdown(text, 'blank.txt')) == []
+
+
+@pytest.mark.parametrize('line, expected', [
+    ('CAPÍTULO 2', '# CAPÍTULO 2'),
+    ('Seção de exames', '## Seção de exames'),
+    ('Conduta:', '### Conduta:'),
+    ('• Hemograma', '- Hemograma'),
+    ('1) Iniciar o tratamento com antibiótico de amplo espectro por via endovenosa', '1. Iniciar o tratamento com antibiótico de amplo espectro por via endovenosa'),
+    ('Texto corrido sem marcação', 'Texto corrido sem marcação'),
+    ('| EXAME | RESULTADO |', '| EXAME | RESULTADO |'),
+    ('| 1 | 2 |', '| 1 | 2 |'),
+    ('## 01-capitulo.xhtml', '## 01-capitulo.xhtml'),
+    ('## Text/capítulo-2.html', '## Text/capítulo-2.html'),
+])
+def test_convert_line(line, expected):
+    assert convert_line(line) == expected
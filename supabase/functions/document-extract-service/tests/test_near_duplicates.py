@@ -0,0 +1,83 @@
+"""
+Near-duplicate index: MinHash estimates track the true shingle Jaccard
+similarity, revisions of indexed documents are found, unrelated ones are
+not, the index survives reopening, and workers sharing it can index the
+same document at once.
+"""
+import threading
+
+import numpy as np
+
+from benchmarks import corpus
+from core.near_duplicates import MinHasher, NearDuplicateIndex, estimated_jaccard
+
+ORIGINAL = "\n".join(corpus.sentences(300, seed=1))
+
+
+def revision(text: str, every: int) -> str:
+    lines = text.split("\n")
+    for index in range(0, len(lines), every):
+        lines[index] = "revisado " + lines[index]
+    return "\n".join(lines)
+
+
+def test_signature_estimates_jaccard():
+    hasher = MinHasher(256, 5)
+    revised = revision(ORIGINAL, 4)
+    a, b = set(hasher.shingle_hashes(ORIGINAL).tolist()), set(hasher.shingle_hashes(revised).tolist())
+    jaccard = len(a & b) / len(a | b)
+
+    estimate = estimated_jaccard(hasher.signature(ORIGINAL), hasher.signature(revised))
+    assert abs(estimate - jaccard) < 0.1
+    # Case, spacing and markdown syntax do not matter
+    assert np.array_equal(hasher.signature(ORIGINAL), hasher.signature("# " + ORIGINAL.upper().replace(" ", "  ")))
+    assert hasher.signature("  \n") is None
+
+
+def test_index_finds_revisions(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    index = NearDuplicateIndex(path, threshold=0.7)
+    assert index.check("original", "protocolo.pdf", ORIGINAL) == []
+    assert index.check("other", "outro.pdf", "\n".join(corpus.sentences(300, seed=2))) == []
+
+    matches = index.check("revision", "protocolo_v2.pdf", revision(ORIGINAL, 10))
+    assert [(match["sha256"], match["filename"]) for match in matches] == [("original", "protocolo.pdf")]
+    assert 0.7 <= matches[0]["similarity"] < 1.0
+    # A document never matches itself
+    assert index.check("original", "protocolo.pdf", ORIGINAL)[0]["sha256"] == "revision"
+    index.close()
+
+    reopened = NearDuplicateIndex(path, threshold=0.7)
+    assert reopened.stats()["documents"] == 3
+    assert {match["sha256"] for match in reopened.check("copy", "copia.pdf", ORIGINAL)} == {"original", "revision"}
+    reopened.close()
+
+    # Signatures from another layout are not comparable
+    assert not NearDuplicateIndex(path, bands=8).enabled
+    assert not NearDuplicateIndex("").enabled
+
+
+def test_workers_index_the_same_document(tmp_path):
+    path = str(tmp_path / "index.sqlite")
+    indexes = [NearDuplicateIndex(path) for _ in range(4)]
+    barrier = threading.Barrier(len(indexes))
+    errors = []
+
+    def check(index):
+        barrier.wait()
+        try:
+            index.check("same", "protocolo.pdf", ORIGINAL)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=check, args=(index,)) for index in indexes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert indexes[0].stats()["documents"] == 1
+    bands = indexes[0]._conn.execute("SELECT COUNT(*) FROM bands").fetchone()[0]
+    assert bands == indexes[0].bands
+    for index in indexes:
+        index.close()
@@ -0,0 +1,89 @@
+"""
+tesserocr engine pool with a stub engine: callers beyond the pool size
+wait, and engines that fail or are recycled free their slot for a waiter.
+"""
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from extractors.ocr import TesserocrPool
+
+
+class StubAPI:
+    """Stands in for tesserocr.PyTessBaseAPI; 'fail' images raise."""
+
+    created = 0
+
+    def __init__(self, **kwargs):
+        StubAPI.created += 1
+        self.image = None
+
+    def SetImage(self, image):
+        self.image = image
+
+    def GetUTF8Text(self):
+        time.sleep(0.02)
+        if self.image == 'fail':
+            raise RuntimeError("engine failed")
+        return f"text of {self.image}"
+
+    def MeanTextConf(self):
+        return 90
+
+    def Clear(self):
+        self.image = None
+
+    def End(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def stub_tesserocr(monkeypatch):
+    module = types.SimpleNamespace(
+        PyTessBaseAPI=StubAPI,
+        PSM=types.SimpleNamespace(SINGLE_BLOCK=6),
+        OEM=types.SimpleNamespace(DEFAULT=3),
+    )
+    monkeypatch.setitem(sys.modules, 'tesserocr', module)
+    StubAPI.created = 0
+
+
+def run_concurrently(pool, images):
+    results = [None] * len(images)
+
+    def recognize(index, image):
+        try:
+            results[index] = pool.recognize(image)
+        except RuntimeError as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=recognize, args=item, daemon=True) for item in enumerate(images)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads), "callers hung waiting for an engine"
+    return results
+
+
+def test_failed_engines_free_their_slot():
+    pool = TesserocrPool(size=2, recycle_after=0)
+    results = run_concurrently(pool, ['fail', 'fail', 'a', 'b', 'c', 'd'])
+
+    assert all(isinstance(result, RuntimeError) for result in results[:2])
+    assert results[2:] == ['text of a', 'text of b', 'text of c', 'text of d']
+    stats = pool.stats()
+    assert stats['failures'] == 2
+    assert stats['engines'] <= 2 and stats['idle'] == stats['engines']
+
+
+def test_recycled_engines_free_their_slot():
+    pool = TesserocrPool(size=2, recycle_after=1)
+    images = [str(number) for number in range(8)]
+    assert run_concurrently(pool, images) == [f"text of {image}" for image in images]
+    stats = pool.stats()
+    assert stats['restarts'] == 8 and stats['engines'] == 0
+    assert StubAPI.created == 8
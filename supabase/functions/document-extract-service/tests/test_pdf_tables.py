@@ -0,0 +1,36 @@
+"""
+PDF table pass: ruled tables on text-heavy pages come out as markdown tables,
+and only pages with ruling lines go through table detection.
+"""
+from benchmarks import corpus
+from core.markdown import convert_to_markdown
+from extractors.pdf_extractor import PDFExtractor, markdown_table_from_rows
+
+LAB_MARKDOWN = """| Exame | Resultado | Referência |
+| --- | --- | --- |
+| Hemoglobina | 13,2 g/dL | 12,0 - 16,0 |
+| Leucócitos | 7.400 /mm3 | 4.000 - 11.000 |
+| Glicemia | 98 mg/dL | 70 - 99 |
+| Creatinina | 0,9 mg/dL | 0,6 - 1,2 |"""
+
+
+def test_markdown_table_from_rows():
+    rows = [['A', 'B\nC', None], None, [None, None, None], ['1', 'x|y']]
+    assert markdown_table_from_rows(rows) == "| A | B C |  |\n| --- | --- | --- |\n| 1 | x\\|y |  |"
+    assert markdown_table_from_rows([[None, '']]) == ""
+
+
+def test_tables_on_text_pages(tmp_path):
+    path = str(tmp_path / 'laudo.pdf')
+    corpus.make_pdf(path, 4, table_every=2)
+
+    result = PDFExtractor().extract_sync(path, 'laudo.pdf')
+
+    assert [page['tables'] for page in result['pages']] == [0, 1, 0, 1]
+    assert all(page['table_seconds'] >= 0 for page in result['pages'])
+    assert f"--- Tabela Página 2 ---\n\n{LAB_MARKDOWN}" in result['text']
+    assert f"--- Tabela Página 4 ---\n\n{LAB_MARKDOWN}" in result['text']
+    assert "--- Tabela Página 1 ---" not in result['text']
+
+    # Table rows go through the markdown conversion untouched
+    assert LAB_MARKDOWN in convert_to_markdown(result['text'], 'laudo.pdf')
@@ -0,0 +1,32 @@
+"""
+Extractor registry: /formats comes from the registered extractors without
+importing them, and starting the service does not import numpy.
+"""
+import os
+import subprocess
+import sys
+
+from core.registry import DEFAULT_EXTRACTORS, ExtractorRegistry
+
+
+def test_supported_lists_registered_formats_without_importing():
+    registry = ExtractorRegistry()
+    registry.register('application/x-test', 'tests.missing_module:TestExtractor')
+    registry.unregister('image/bmp')
+
+    formats = registry.supported()
+    assert set(formats) == set(DEFAULT_EXTRACTORS) - {'image/bmp'} | {'application/x-test'}
+    assert formats['application/pdf']['extractor'] == 'PDFExtractor'
+    assert formats['application/pdf']['description'] != 'No description available'
+    assert formats['application/x-test'] == {'extractor': 'TestExtractor', 'description': 'No description available'}
+    assert not any(stats['loaded'] for stats in registry.stats().values())
+
+
+def test_service_import_does_not_import_numpy():
+    code = "import sys, main; assert 'numpy' not in sys.modules, 'numpy imported'"
+    service_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=service_dir,
+        env={**os.environ, 'PYTHONPATH': service_dir, 'NEAR_DUPLICATE_INDEX_PATH': ''}
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,52 @@
+"""
+RTF parser: destinations, code pages and escapes come out as text in one
+pass, whatever the piece boundaries, and pandoc mode falls back to it.
+"""
+import pytest
+
+from benchmarks import corpus
+from core import config
+from extractors.rtf_extractor import RTFExtractor
+from extractors.rtf_parser import rtf_text
+
+DOCUMENT = (
+    b"{\\rtf1\\ansi\\ansicpg1252\\deff0"
+    b"{\\fonttbl{\\f0\\fswiss\\fcharset0 Arial;}{\\f1\\fcharset204 Times Cyr;}{\\f2\\fcharset128 MS Mincho;}}"
+    b"{\\colortbl;\\red255\\green0\\blue0;}{\\*\\generator Riched20;}{\\info{\\title Segredo}{\\author X}}"
+    b"{\\header Cabe\\'e7alho}\\uc1\\pard\\f0\\fs20 Paciente Jos\\'e9 dor tor\\u225\\'e1cica\\par\r\n"
+    b"{\\f1 \\'cf\\'f0\\'e8\\'e2\\'e5\\'f2}\\par\n"
+    b"{\\f2 \\'93\\'fa\\'96\\'7b}\\par"
+    b"{\\field{\\*\\fldinst HYPERLINK \"http://x\"}{\\fldrslt link}}\\par"
+    b"{\\*\\unknowndest ignored}{\\uc2\\u-10179??\\u-8704??fim}\\par"
+    b"{\\pict\\pngblip 89504e47}antes\\bin4 {}\\\\depois \\{x\\}\\tab a\\line b\\~c\\emdash d\\par}"
+)
+
+EXPECTED = (
+    "Paciente José dor torácica\nПривет\n日本\nlink\n\U0001F600fim\n"
+    "antesdepois {x}\ta\nb c—d\n"
+)
+
+
+def test_rtf_text():
+    assert rtf_text([DOCUMENT]) == EXPECTED
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 8])
+def test_piece_boundaries(size):
+    pieces = [DOCUMENT[start:start + size] for start in range(0, len(DOCUMENT), size)]
+    assert rtf_text(pieces) == EXPECTED
+
+
+@pytest.mark.parametrize('mode', ['native', 'pandoc'])
+def test_extractor(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(config, 'RTF_MODE', mode)
+    monkeypatch.setattr(config, 'RTF_FEED_BYTES', 1000)
+    path = corpus.generate(str(tmp_path), ['rtf'], 3, seed=3)['rtf']
+    result = RTFExtractor().extract_sync(path, 'nota.rtf')
+
+    lines = result['text'].split('\n')
+    assert lines[0] == 'Seção 1'
+    assert lines.count('Seção 3') == 1
+    assert len(lines) == 3 * 41
+    if mode == 'native':
+        assert result['method'] == 'rtf-parser'
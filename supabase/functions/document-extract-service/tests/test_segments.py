@@ -0,0 +1,108 @@
+"""
+Embedding segments: offsets slice the markdown exactly, headings start new
+segments, size limits and overlap hold, and feeding the markdown piece by
+piece gives the same segments as the whole document.
+"""
+from benchmarks import corpus
+from core.markdown import MarkdownConverter, convert_to_markdown
+from core.segments import Segmenter, count_tokens, segment_markdown
+from extractors.pdf_extractor import PDFExtractor
+from extractors.pptx_extractor import PPTXExtractor
+
+MARKDOWN = """# Laudo
+
+### RESULTADOS:
+Hemoglobina 13,2 g/dL dentro da referência.
+Leucócitos 7.400 /mm3 sem alterações.
+
+### CONCLUSÃO:
+Exames sem alterações relevantes."""
+
+
+def check_offsets(markdown, segments):
+    assert [segment['index'] for segment in segments] == list(range(len(segments)))
+    for segment in segments:
+        assert markdown[segment['start']:segment['end']] == segment['text']
+        assert segment['tokens'] == count_tokens(segment['text'])
+
+
+def test_headings_start_segments():
+    segments = segment_markdown(MARKDOWN, 100, 10)
+    check_offsets(MARKDOWN, segments)
+
+    assert [segment['headings'] for segment in segments] == [
+        ['Laudo', 'RESULTADOS:'],
+        ['Laudo', 'CONCLUSÃO:'],
+    ]
+    assert segments[0]['text'].startswith('# Laudo\n\n### RESULTADOS:')
+    assert segments[1]['text'] == "### CONCLUSÃO:\nExames sem alterações relevantes."
+    assert all(segment['unit'] == 'document' and segment['locations'] == [] for segment in segments)
+    assert segment_markdown("", 100, 10) == []
+
+
+def test_size_limit_and_overlap():
+    sentence = "Paciente estável em uso de antibiótico."
+    markdown = "\n".join([sentence] * 40 + [" ".join([sentence] * 30), "x " * 300])
+    segments = segment_markdown(markdown, 50, 12)
+    check_offsets(markdown, segments)
+
+    assert all(segment['tokens'] <= 50 for segment in segments)
+    for previous, segment in zip(segments, segments[1:]):
+        # Each segment repeats the end of the previous one
+        assert segment['start'] < previous['end']
+        assert previous['end'] - segment['start'] <= len(sentence) * 2
+
+
+def test_incremental_matches_whole_document(tmp_path):
+    path = corpus.generate(str(tmp_path), ['pptx'], 6, seed=3)['pptx']
+    chunks = list(PPTXExtractor().iter_chunks(path, 'deck.pptx'))
+    markdown = convert_to_markdown("\n\n".join(chunk['text'] for chunk in chunks), 'deck.pptx')
+    expected = segment_markdown(markdown, 40, 8)
+    check_offsets(markdown, expected)
+
+    # Fed the way /extract/stream converts chunks
+    converter = MarkdownConverter('deck.pptx')
+    segmenter = Segmenter(40, 8)
+    segments = []
+    for number, chunk in enumerate(chunks):
+        segments += segmenter.feed(converter.feed(("\n" if number else "") + chunk['text'] + "\n"))
+    segments += segmenter.feed(converter.close())
+    segments += segmenter.close()
+
+    assert segments == expected
+    assert {segment['unit'] for segment in segments} == {'slide'}
+    assert sorted({number for segment in segments for number in segment['locations']}) == list(range(1, 7))
+
+
+def test_page_locations(tmp_path):
+    path = str(tmp_path / 'laudo.pdf')
+    corpus.make_pdf(path, 3, table_every=2)
+    markdown = convert_to_markdown(PDFExtractor().extract_sync(path, 'laudo.pdf')['text'], 'laudo.pdf')
+    segments = segment_markdown(markdown, 200, 20)
+    check_offsets(markdown, segments)
+
+    pages = [segment['locations'] for segment in segments]
+    assert all(segment['unit'] == 'page' for segment in segments)
+    assert pages[0][0] == 1 and pages[-1][-1] == 3
+    assert all(a == sorted(a) for a in pages)
+    # The table of page 2 is located on page 2
+    table = next(segment for segment in segments if '| Hemoglobina |' in segment['text'])
+    assert 2 in table['locations']
+
+
+def test_chapter_locations():
+    # EPUB chapter texts as EpubExtractor joins them; the names look like numbered headings and lists
+    chapters = ['01-capitulo.xhtml', '2.conduta.xhtml', 'Text/anexo-3.html']
+    text = "\n\n".join(
+        f"## {name}\n\n" + "\n".join(corpus.sentences(6, seed=index)) for index, name in enumerate(chapters)
+    )
+    markdown = convert_to_markdown(text, 'livro.epub')
+    for name in chapters:
+        assert f"\n## {name}\n" in markdown
+    segments = segment_markdown(markdown, 60, 0)
+    check_offsets(markdown, segments)
+
+    assert all(segment['unit'] == 'chapter' for segment in segments)
+    assert segments[0]['locations'][0] == chapters[0]
+    located = [name for segment in segments for name in segment['locations']]
+    assert list(dict.fromkeys(located)) == chapters
@@ -0,0 +1,110 @@
+"""
+Similarity verification: each level (and the per-MIME configuration that
+picks it) runs the intended method, the sampled estimate's confidence
+interval holds the full score, and the structural check scores reordered
+and duplicated lines by what stayed in order.
+"""
+import random
+
+import pytest
+
+from benchmarks import corpus
+from core import config
+from extractors.similarity_calculator import SimilarityCalculator, verification_level
+
+PDF = 'application/pdf'
+TEXT = 'text/plain'
+
+
+def revised(lines, every: int, seed: int) -> str:
+    """The lines as markdown, with a word replaced in every `every`-th line."""
+    rng = random.Random(seed)
+    out = []
+    for index, line in enumerate(lines):
+        if index % every == 0:
+            words = line.split()
+            words[rng.randrange(len(words))] = "alterado"
+            line = " ".join(words)
+        out.append(line)
+    return "# Documento\n\n" + "\n\n".join(out)
+
+
+@pytest.fixture
+def calculator():
+    return SimilarityCalculator()
+
+
+def test_verification_level_choice(monkeypatch):
+    monkeypatch.setattr(config, 'SIMILARITY_VERIFICATION', 'sampled')
+    monkeypatch.setattr(config, 'SIMILARITY_VERIFICATION_BY_TYPE', {PDF: 'structural', TEXT: 'bogus'})
+
+    assert verification_level(PDF) == 'structural'
+    assert verification_level(PDF, 'off') == 'off'
+    # Unknown levels fall through to the next source
+    assert verification_level(TEXT) == 'sampled'
+    assert verification_level('image/png', 'bogus') == 'sampled'
+    monkeypatch.setattr(config, 'SIMILARITY_VERIFICATION', 'bogus')
+    assert verification_level('image/png') == 'full'
+
+
+def test_each_level_runs_its_method(calculator, monkeypatch):
+    monkeypatch.setattr(config, 'SIMILARITY_CHUNK_CHARS', 500)
+    monkeypatch.setattr(config, 'SIMILARITY_VERIFY_SAMPLE_CHUNKS', 8)
+    lines = corpus.sentences(400, seed=1)
+    original, markdown = "\n".join(lines), revised(lines, 5, seed=2)
+
+    methods = {}
+    for level in ('off', 'structural', 'sampled', 'full'):
+        details = calculator.verify(original, markdown, level)
+        assert details['verification'] == level
+        methods[level] = details['levenshtein_method']
+    assert methods == {'off': 'none', 'structural': 'structural', 'sampled': 'sampled', 'full': 'chunked'}
+
+    assert calculator.verify(original, markdown, 'off')['similarity'] is None
+    assert 'confidence_interval' in calculator.verify(original, markdown, 'sampled')
+    # Anything else is a full check
+    assert calculator.verify(original, markdown, 'bogus')['verification'] == 'full'
+
+
+def test_sampled_interval_holds_the_full_score(calculator, monkeypatch):
+    monkeypatch.setattr(config, 'SIMILARITY_CHUNK_CHARS', 500)
+    monkeypatch.setattr(config, 'SIMILARITY_VERIFY_SAMPLE_CHUNKS', 24)
+    lines = corpus.sentences(600, seed=3)
+    original, markdown = "\n".join(lines), revised(lines, 3, seed=4)
+
+    full = calculator.calculate_similarity_details(original, markdown)['similarity']
+    sampled = calculator.sampled_similarity(original, markdown)
+    low, high = sampled['confidence_interval']
+    assert sampled['sampled_chunks'] == 24 and sampled['total_chunks'] > 24
+    assert low <= full <= high
+    assert high - low == pytest.approx(2 * sampled['error_bound'])
+
+
+def test_sampled_small_documents_get_the_full_score(calculator):
+    original = "\n".join(corpus.sentences(5, seed=5))
+    details = calculator.sampled_similarity(original, original)
+    assert details['levenshtein_method'] == 'exact'
+    assert details['confidence_interval'] == [details['similarity'], details['similarity']]
+
+
+def test_structural_similarity(calculator):
+    lines = corpus.sentences(10, seed=6)
+    original = "\n".join(lines)
+
+    assert calculator.structural_similarity(original, "# " + "\n\n".join(lines))['similarity'] == pytest.approx(1.0)
+
+    # Reversed: every word survives, only one line stays in order
+    reordered = calculator.structural_similarity(original, "\n".join(reversed(lines)))
+    assert reordered['token_overlap'] == pytest.approx(1.0)
+    assert reordered['line_alignment'] == pytest.approx(0.1)
+
+    # Two blocks swapped: the longer block stays in order
+    swapped = calculator.structural_similarity(original, "\n".join(lines[7:] + lines[:7]))
+    assert swapped['line_alignment'] == pytest.approx(0.7)
+
+    # Every line twice: all lines in order, but half the markdown is extra
+    duplicated = calculator.structural_similarity(original, "\n".join(line for line in lines for _ in range(2)))
+    assert duplicated['line_alignment'] == pytest.approx(0.5)
+    assert duplicated['token_overlap'] == pytest.approx(0.5)
+
+    assert calculator.structural_similarity(original, "")['similarity'] == 0.0
@@ -0,0 +1,95 @@
+"""
+Multipart spooling: files are written and hashed straight from the request
+body however it is chunked, oversized files are stopped while streaming
+(for a single upload) or reported per file (for a batch), and nothing is
+left in the spool directory on failure.
+"""
+import asyncio
+import hashlib
+import os
+
+import pytest
+
+from core.upload import InvalidUploadError, UploadTooLargeError, spool_multipart
+
+BOUNDARY = "test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def body(*parts) -> bytes:
+    out = b""
+    for name, filename, data in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        out += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunked(data: bytes, size: int, seen: list = None):
+    for start in range(0, len(data), size):
+        if seen is not None:
+            seen.append(start)
+        yield data[start:start + size]
+
+
+def spool(data: bytes, size: int = 7, **kwargs):
+    return asyncio.run(spool_multipart(chunked(data, size), CONTENT_TYPE, **kwargs))
+
+
+def test_file_is_spooled_with_hash_and_head(tmp_path):
+    payload = os.urandom(100_000)
+    results = spool(body(("note", None, b"ignored"), ("file", "a.pdf", payload)), field="file", spool_dir=str(tmp_path))
+
+    [(filename, upload, error)] = results
+    assert (filename, error) == ("a.pdf", None)
+    assert upload.size == len(payload)
+    assert upload.sha256 == hashlib.sha256(payload).hexdigest()
+    assert upload.head == payload[:len(upload.head)]
+    with open(upload.path, "rb") as f:
+        assert f.read() == payload
+    upload.cleanup()
+    assert os.listdir(tmp_path) == []
+
+
+def test_oversized_single_upload_stops_mid_stream(tmp_path):
+    data = body(("file", "big.pdf", b"x" * 50_000))
+    seen = []
+
+    async def run():
+        return await spool_multipart(chunked(data, 1000, seen), CONTENT_TYPE, "file", max_bytes=10_000, spool_dir=str(tmp_path))
+
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(run())
+    # No Content-Length involved: reading stopped soon after the limit
+    assert len(seen) < 15
+    assert os.listdir(tmp_path) == []
+
+
+def test_batch_reports_oversized_files_and_keeps_the_rest(tmp_path):
+    data = body(("files", "a.txt", b"a" * 100), ("files", "big.txt", b"b" * 5000), ("files", "c.txt", b"c" * 100))
+    results = spool(data, field="files", max_bytes=1000, single=False, spool_dir=str(tmp_path))
+
+    assert [(filename, upload is not None, error is not None) for filename, upload, error in results] == [
+        ("a.txt", True, False), ("big.txt", False, True), ("c.txt", True, False)
+    ]
+    for _, upload, _ in results:
+        if upload is not None:
+            upload.cleanup()
+    assert os.listdir(tmp_path) == []
+
+
+def test_batch_body_limit(tmp_path):
+    data = body(*[("files", f"{index}.txt", b"z" * 40_000) for index in range(4)])
+    with pytest.raises(UploadTooLargeError):
+        spool(data, size=4096, field="files", max_total_bytes=10_000, single=False, spool_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_invalid_bodies(tmp_path):
+    with pytest.raises(InvalidUploadError):
+        asyncio.run(spool_multipart(chunked(b"{}", 10), "application/json", "file"))
+    truncated = body(("file", "a.pdf", b"p" * 1000))[:-100]
+    with pytest.raises(InvalidUploadError):
+        spool(truncated, field="file", spool_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []